@@ -1,15 +1,35 @@
 import time
 import os
-import pandas as pd
 import shutil
+import weakref
+import socket
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import TimeoutException, WebDriverException
 from webdriver_manager.chrome import ChromeDriverManager
 from database import DatabaseManager, TestRun
+from job_signals import JobSignalListener
+from url_source import is_valid_url, resolve_metadata_columns
+from upload_cache import open_url_source
+from thumbnails import ThumbnailWriter
+from phase_timing import PhaseTimer
+from metrics import WorkerMetrics, MetricsServer
+from page_detection import FAIL_CRITERIA, evaluate_alert, evaluate_http_status, match_fail_criteria
+from page_snapshots import SnapshotWriter, capture_snapshot
+from circuit_breaker import CircuitBreaker, CANARY_ATTEMPTS, CANARY_WAIT_SECONDS
+from retry_queue import RetryQueue, TransientNavigationError, is_transient_error, is_browser_lost
+from scheduler import (RunContext, FairShareScheduler, CHUNK_SIZE, MAX_ACTIVE_RUNS, PRIORITY_WEIGHTS,
+                       SHARD_LEASE_SECONDS, SHARDS_PER_WORKER, shard_rows)
+from session_store import (SessionStore, SessionKeepAlive, SessionExpired, WarmBrowserPool, domain_for_url,
+                           is_login_redirect, looks_like_login, probe_session)
+from http_capture import DocumentResponses, HTTP_STATUS_CAPTURE, enable_performance_log
+from resource_governor import ResourceGovernor, MB
+from browser_tabs import (BrowserTabs, TABS_PER_BROWSER, TAB_POLL_SECONDS, BACKGROUND_TAB_ARGUMENTS, NAVIGATE_SCRIPT,
+                          LOAD_STATE_SCRIPT)
 from datetime import datetime
 import logging
 import json
@@ -57,16 +77,88 @@ class HybridBackgroundWorker:
 
         # Essential settings only
         self.HYBRID_DETECTION_ENABLED = HYBRID_DETECTION_AVAILABLE
+        self.HEADLESS_BROWSER = False  # Set by the benchmark (--headless) to run Chrome without a display
         self.PAGE_LOAD_TIMEOUT = 10
         self.BATCH_DB_OPERATIONS = True
         self.DB_BATCH_SIZE = 5
         self.pending_results = []
+        self.pending_progress = {}  # run id -> counters written with the next results batch
         self.last_db_batch_time = time.time()
+        self.FAIL_CHECK_INTERVALS = [0.5, 2, 4]  # Seconds into detection when fail criteria are checked
+
+        # Job/auth signalling - block on sessions/ events, poll slowly only as a fallback
+        self.job_signals = JobSignalListener(self.sessions_dir)
+        self.POLL_INTERVAL = 3  # Used when the sessions watcher is unavailable
+        self.FALLBACK_POLL_INTERVAL = 30  # Safety net while the watcher is running
+
+        # Gallery thumbnails are written in the background after each screenshot
+        self.thumbnail_writer = ThumbnailWriter()
+
+        # Page source/text snapshots are compressed and appended off the URL loop
+        self.CAPTURE_SNAPSHOTS = False  # Snapshot every run, not only runs that asked for it
+        self.snapshot_writer = SnapshotWriter(self.db_manager)
+
+        # Sessions and warm browsers are shared by jobs on the same tenant domain
+        self.session_store = SessionStore()
+        self.browser_pool = WarmBrowserPool()
+        self.BROWSER_POOL_LIMIT = self.browser_pool.max_size  # The memory governor sizes the pool below this
+        self._run_first_urls = {}
+        self.SESSION_REFRESH_EVERY = 50  # URLs between copying the browser's cookies back to the store
+
+        # Page loads of a chunk are spread over several tabs of the run's browser when TABS_PER_BROWSER > 1
+        self._tabs = weakref.WeakKeyDictionary()  # driver -> BrowserTabs
+
+        # Each page's HTTP status is read from the browser's performance log
+        self._responses = weakref.WeakKeyDictionary()  # driver -> DocumentResponses
+
+        # Authenticated runs are interleaved chunk by chunk with weighted fair share between users
+        self.scheduler = FairShareScheduler()
+        self.active_runs = {}  # (test run id, shard index or None) -> RunContext
+
+        # Identifies this process's shard claims - several workers may share the database
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+
+        # Browsers are kept within WORKER_MEMORY_BUDGET_MB - sampled, refused and recycled by the governor
+        self.governor = ResourceGovernor()
+
+        # Prometheus-style metrics, scraped from a local endpoint
+        self._browsers = weakref.WeakSet()
+        self.metrics = WorkerMetrics(queue_depth=self._queue_depth_metric,
+                                     active_browsers=self._active_browser_count,
+                                     browser_memory=lambda: self.governor.total)
+        self.metrics_server = MetricsServer(self.metrics.registry)
+        self.keepalive = SessionKeepAlive(self.session_store, on_ping=self._on_keepalive)
 
         logger.info("AGGRESSIVE Error Detection Worker initialized")
 
+    def _on_keepalive(self, domain, alive):
+        self.metrics.session_keepalives.inc(result='alive' if alive else 'expired')
+        if not alive:
+            # Jobs on the tenant wait for a new login instead of being admitted on a dead session
+            self.session_store.mark_logged_out(domain)
+
+    def _queue_depth_metric(self):
+        return {(status,): count for status, count in self.db_manager.get_run_status_counts().items()}
+
+    def _active_browser_count(self):
+        """Browsers whose chromedriver process is still running"""
+        count = 0
+        for driver in list(self._browsers):
+            try:
+                if driver.service.process.poll() is None:
+                    count += 1
+            except Exception:
+                pass
+        return count
+
     def create_ultra_fast_browser(self):
         """Create browser optimized for SPEED"""
+        # Make room by closing idle warm browsers before refusing outright
+        if not self.governor.can_spawn() and not self.free_browser_memory():
+            self.governor.refuse("memory budget is full")
+            self.metrics.governor_actions.inc(action='refused')
+            return None
+
         try:
             logger.info("Creating FAST browser...")
 
@@ -83,6 +175,17 @@ class HybridBackgroundWorker:
 
             # Smaller window for faster rendering
             chrome_options.add_argument("--window-size=1024,768")
+            if self.HEADLESS_BROWSER:
+                chrome_options.add_argument("--headless=new")
+
+            # Record network events so each page's HTTP status and redirects can be read back
+            if HTTP_STATUS_CAPTURE:
+                enable_performance_log(chrome_options)
+
+            # Pages loading in background tabs would otherwise be throttled
+            if TABS_PER_BROWSER > 1:
+                for argument in BACKGROUND_TAB_ARGUMENTS:
+                    chrome_options.add_argument(argument)
 
             service = Service(ChromeDriverManager().install())
             driver = webdriver.Chrome(service=service, options=chrome_options)
@@ -91,6 +194,8 @@ class HybridBackgroundWorker:
             driver.set_page_load_timeout(8)  # Reduced from 10
             driver.implicitly_wait(1)  # Reduced from 3
 
+            self._browsers.add(driver)
+            self.metrics.browsers_started.inc()
             logger.info("FAST browser created successfully")
             return driver
 
@@ -108,43 +213,84 @@ class HybridBackgroundWorker:
             return []
 
     def flush_pending_results(self, force=False):
-        if not self.pending_results:
+        if not self.pending_results and not self.pending_progress:
             return
 
-        if force or len(self.pending_results) >= self.DB_BATCH_SIZE:
+        # Queued progress goes out straight away - it is only queued every few URLs
+        if force or self.pending_progress or len(self.pending_results) >= self.DB_BATCH_SIZE:
+            results, progress = list(self.pending_results), dict(self.pending_progress)
+            self.pending_results.clear()
+            self.pending_progress.clear()
+            try:
+                flush_start = time.perf_counter()
+                # Results, run progress and the run_version bump that invalidates cached pages - one transaction
+                rows = self.db_manager.add_test_results(results, progress)
+                flush_ms = (time.perf_counter() - flush_start) * 1000
+            except Exception as e:
+                logger.error(f"Batch operation failed: {e} - storing {len(results)} results one at a time")
+                self.store_results_singly(results, progress)
+                return
+
+            try:
+                # Each result carries its share of the batch write
+                if rows:
+                    self.db_manager.record_db_flush_time([row.id for row in rows], round(flush_ms / len(rows), 1))
+                    self.metrics.record_flush(flush_ms / 1000, len(rows))
+                logger.debug(f"📦 Batched {len(results)} database operations")
+            except Exception as e:
+                logger.warning(f"⚠️ Could not record batch flush time: {e}")
+
+    def store_results_singly(self, results, progress):
+        """Fallback after a failed batch - one bad result loses only itself"""
+        for result in results:
+            try:
+                self.db_manager.add_test_results([result])
+            except Exception as e:
+                logger.error(f"💥 Dropped result for test {result.get('test_run_id')} "
+                             f"row {result.get('row_number')}: {e}")
+        if progress:
             try:
-                for result_data in self.pending_results:
-                    self.db_manager.add_test_result(**result_data)
-                self.db_manager.session.commit()
-                logger.debug(f"📦 Batched {len(self.pending_results)} database operations")
-                self.pending_results.clear()
+                self.db_manager.add_test_results([], progress)
             except Exception as e:
-                logger.error(f"Batch operation failed: {e}")
-                self.pending_results.clear()
+                logger.error(f"💥 Could not store run progress: {e}")
+
+    def queue_progress(self, ctx):
+        """Have the next results batch carry the run's progress"""
+        self.pending_progress[ctx.test_run.id] = {'progress': ctx.progress, 'processed': ctx.processed,
+                                                  'passed': ctx.passed, 'failed': ctx.failed,
+                                                  'skipped': ctx.skipped}
 
     def add_result_to_batch(self, **kwargs):
         self.pending_results.append(kwargs)
 
     def load_urls_from_file(self, test_run):
+        """Open a streaming URL source for the run's upload - rows are read lazily"""
         try:
-            file_path = f"uploads/{test_run.uploaded_filename}"
-            if not os.path.exists(file_path):
-                logger.error(f"Uploaded file not found: {file_path}")
+            source = open_url_source(test_run)
+            if not source.exists():
+                logger.error(f"Uploaded file not found: {source.file_path}")
                 return None
 
-            if test_run.uploaded_filename.endswith('.csv'):
-                df = pd.read_csv(file_path)
-            else:
-                df = pd.read_excel(file_path)
-
-            # Filter out rows with empty URLs
-            df = df.dropna(subset=[test_run.url_column])
-            logger.info(f"Loaded {len(df)} rows from file")
-            return df
+            logger.info(f"Streaming URLs from {source.file_path} (column: {test_run.url_column})")
+            return source
         except Exception as e:
-            logger.error(f"Error reading file: {e}")
+            logger.error(f"Error opening file: {e}")
             return None
 
+    def get_metadata_columns(self, test_run, source):
+        """Result field -> upload column mapping, resolved once per run"""
+        if test_run.metadata_columns:
+            try:
+                return json.loads(test_run.metadata_columns)
+            except ValueError:
+                logger.warning(f"⚠️ Invalid metadata mapping stored for test {test_run.id} - resolving again")
+
+        # Runs created before the mapping was stored at submission
+        mapping = resolve_metadata_columns(source.columns(), exclude=test_run.url_column)
+        test_run.metadata_columns = json.dumps(mapping)
+        self.db_manager.session.commit()
+        return mapping
+
     def simple_fail_detection(self, driver, url, max_wait_time=5):
         """Enhanced logic: Check for alerts and fail criteria"""
         logger.debug(f"🔍 Checking fail criteria for: {url}")
@@ -152,7 +298,7 @@ class HybridBackgroundWorker:
         start_time = time.time()
 
         # Check immediately and then at 2 and 4 seconds to catch delayed alerts/modals
-        check_intervals = [0.5, 2, 4]
+        check_intervals = self.FAIL_CHECK_INTERVALS
 
         for wait_seconds in check_intervals:
             if time.time() - start_time > max_wait_time:
@@ -253,18 +399,6 @@ class HybridBackgroundWorker:
 
     def check_fail_criteria(self, driver):
         """Enhanced fail criteria checker with alert detection"""
-
-        # FAIL CRITERIA LIST
-        fail_criteria = [
-            'invalid select file',
-            'page does not exist',
-            'an exception has occurred',
-            'access denied',
-            'your request did not complete',
-            'exception messages:',
-            'please try your request again',
-        ]
-
         try:
             # Method 1: Check for JavaScript alerts FIRST (highest priority)
             try:
@@ -272,30 +406,13 @@ class HybridBackgroundWorker:
                 alert_text = alert.text.strip()
                 logger.info(f"🚨 JavaScript alert detected: '{alert_text}'")
 
-                # Check if alert contains any fail criteria (especially "Access denied")
-                alert_lower = alert_text.lower()
-                for criteria in fail_criteria:
-                    if criteria in alert_lower:
-                        logger.info(f"🎯 ALERT FAIL criteria '{criteria}' found in alert: '{alert_text}'")
-                        alert.accept()  # Accept the alert to close it
-                        return {
-                            'is_fail': True,
-                            'reason': f"Alert: {alert_text}",
-                            'criteria': criteria
-                        }
-
-                # Even if no specific criteria match, "access denied" in alert should fail
-                if 'access denied' in alert_lower or 'denied' in alert_lower:
-                    logger.info(f"🎯 ACCESS DENIED alert detected: '{alert_text}'")
-                    alert.accept()
-                    return {
-                        'is_fail': True,
-                        'reason': f"Access denied alert: {alert_text}",
-                        'criteria': 'access denied'
-                    }
+                verdict = evaluate_alert(alert_text)
+                alert.accept()  # Accept the alert to close it either way
+                if verdict:
+                    logger.info(f"🎯 ALERT FAIL criteria '{verdict['criteria']}' found in alert: '{alert_text}'")
+                    return verdict
 
-                # Alert exists but no fail criteria - accept it and continue
-                alert.accept()
+                # Alert exists but no fail criteria - continue
                 logger.info(f"ℹ️ Alert accepted (no fail criteria): '{alert_text}'")
 
             except:
@@ -303,33 +420,23 @@ class HybridBackgroundWorker:
                 pass
 
             # Method 2: Check page source
-            page_source = driver.page_source.lower()
-            logger.info(f"🔍 DEBUG: Checking {len(fail_criteria)} fail criteria in page source")
+            page_source = driver.page_source
+            logger.info(f"🔍 DEBUG: Checking {len(FAIL_CRITERIA)} fail criteria in page source")
             logger.info(f"🔍 DEBUG: Page source length: {len(page_source)}")
 
-            for criteria in fail_criteria:
-                if criteria in page_source:
-                    logger.info(f"🎯 FAIL criteria '{criteria}' found in page source")
-                    return {
-                        'is_fail': True,
-                        'reason': f"Found in page: {criteria}",
-                        'criteria': criteria
-                    }
+            criteria = match_fail_criteria(page_source)
+            if criteria:
+                logger.info(f"🎯 FAIL criteria '{criteria}' found in page source")
+                return {'is_fail': True, 'reason': f"Found in page: {criteria}", 'criteria': criteria}
 
             # Method 3: Check body text
-            body = driver.find_element(By.TAG_NAME, "body")
-            body_text = body.text.lower()
-
+            body_text = driver.find_element(By.TAG_NAME, "body").text
             logger.info(f"🔍 DEBUG: Body text length: {len(body_text)}")
 
-            for criteria in fail_criteria:
-                if criteria in body_text:
-                    logger.info(f"🎯 FAIL criteria '{criteria}' found in body text")
-                    return {
-                        'is_fail': True,
-                        'reason': f"Found in body: {criteria}",
-                        'criteria': criteria
-                    }
+            criteria = match_fail_criteria(body_text)
+            if criteria:
+                logger.info(f"🎯 FAIL criteria '{criteria}' found in body text")
+                return {'is_fail': True, 'reason': f"Found in body: {criteria}", 'criteria': criteria}
 
             # Method 4: Check for specific modal/dialog elements that might contain errors
             modal_selectors = [
@@ -344,19 +451,13 @@ class HybridBackgroundWorker:
 
             for selector in modal_selectors:
                 try:
-                    elements = driver.find_elements(By.CSS_SELECTOR, selector)
-                    for element in elements:
+                    for element in driver.find_elements(By.CSS_SELECTOR, selector):
                         if element.is_displayed():
-                            element_text = element.text.lower()
-                            if element_text:
-                                for criteria in fail_criteria:
-                                    if criteria in element_text:
-                                        logger.info(f"🎯 FAIL criteria '{criteria}' found in modal: {selector}")
-                                        return {
-                                            'is_fail': True,
-                                            'reason': f"Found in modal: {criteria}",
-                                            'criteria': criteria
-                                        }
+                            criteria = match_fail_criteria(element.text)
+                            if criteria:
+                                logger.info(f"🎯 FAIL criteria '{criteria}' found in modal: {selector}")
+                                return {'is_fail': True, 'reason': f"Found in modal: {criteria}",
+                                        'criteria': criteria}
                 except:
                     continue
 
@@ -366,19 +467,39 @@ class HybridBackgroundWorker:
         logger.info("🔍 DEBUG: No fail criteria found - returning PASS")
         return {'is_fail': False, 'reason': None, 'criteria': None}
 
-    def process_url_fast(self, driver, url, row_idx, test_run_id, test_screenshot_dir):
-        """Fast URL processing: FAIL if criteria found, otherwise PASS"""
-        start_time = time.time()
+    def process_url_fast(self, driver, url, row_idx, test_run_id, test_screenshot_dir, timer=None, snapshot=False):
+        """Fast URL processing: FAIL on an error response or if criteria found, otherwise PASS"""
+        timer = timer or PhaseTimer()
+        responses = self.responses_for(driver)
+        response = None
 
         try:
             logger.debug(f"🔍 Processing: {url}")
 
             # Navigate to URL
-            driver.get(url)
-            time.sleep(1)  # Minimal wait
-
-            # Check for fail criteria
-            is_fail, reason, confidence = self.simple_fail_detection(driver, url)
+            with timer.phase('navigation'):
+                if responses:
+                    responses.begin()
+                driver.get(url)
+                if responses:
+                    response = responses.response()
+            http_verdict = evaluate_http_status(response and response['status'])
+
+            with timer.phase('readiness'):
+                if not http_verdict:
+                    time.sleep(1)  # Minimal wait
+
+                # A login page instead of the requested one means the session ran out
+                if is_login_redirect(url, driver.current_url, driver.title):
+                    raise SessionExpired(driver.current_url)
+
+            # Check for fail criteria - a 4xx/5xx response is a FAIL without looking at the page
+            with timer.phase('detection'):
+                if http_verdict:
+                    logger.info(f"❌ FAIL from response: {http_verdict['reason']}")
+                    is_fail, reason, confidence = True, http_verdict['reason'], 99
+                else:
+                    is_fail, reason, confidence = self.simple_fail_detection(driver, url)
 
             if is_fail:
                 status = 'FAIL'
@@ -389,17 +510,49 @@ class HybridBackgroundWorker:
                 error_message = None
                 logger.debug(f"✅ PASS")
 
-            # Take screenshot
-            screenshot_filename = self.take_screenshot_fast(
-                driver, test_run_id, row_idx, status, test_screenshot_dir
-            )
-
-            execution_time = int((time.time() - start_time) * 1000)
-            return status, screenshot_filename, error_message, confidence
+            screenshot_filename = self.capture_evidence(driver, url, row_idx, test_run_id, status,
+                                                        test_screenshot_dir, timer, snapshot)
+            return status, screenshot_filename, error_message, confidence, response
 
+        except SessionExpired:
+            raise
         except Exception as e:
-            logger.error(f"❌ Navigation failed for {url}: {e}")
-            return 'FAIL', None, f"Navigation error: {str(e)[:50]}", 30
+            outcome = self.navigation_error_outcome(url, e)
+            if isinstance(outcome, TransientNavigationError):
+                raise outcome from e
+            return outcome
+
+    def navigation_error_outcome(self, url, error):
+        """A TransientNavigationError for errors worth another attempt, else the FAIL result to record"""
+        if is_transient_error(error):
+            # Timeouts, dropped connections and crashed tabs - worth another attempt
+            detail = str(error).strip().splitlines()
+            return TransientNavigationError(detail[0] if detail else type(error).__name__)
+        logger.error(f"❌ Navigation failed for {url}: {error}")
+        return 'FAIL', None, f"Navigation error: {str(error)[:50]}", 30, None
+
+    def responses_for(self, driver):
+        """The driver's DocumentResponses - None when HTTP status capture is off or the browser has no log"""
+        if not HTTP_STATUS_CAPTURE:
+            return None
+        responses = self._responses.get(driver)
+        if responses is None:
+            responses = self._responses[driver] = DocumentResponses(driver)
+        return responses if responses.available else None
+
+    def capture_evidence(self, driver, url, row_idx, test_run_id, status, test_screenshot_dir, timer, snapshot):
+        """Snapshot (if asked for) and screenshot of the page in the driver's current tab"""
+        # Only the capture is timed here - compression and writing happen on the snapshot thread
+        if snapshot:
+            with timer.phase('snapshot'):
+                try:
+                    self.snapshot_writer.submit(test_run_id, row_idx, url, capture_snapshot(driver))
+                except Exception as e:
+                    logger.debug(f"Snapshot failed: {e}")
+
+        # Take screenshot
+        with timer.phase('screenshot'):
+            return self.take_screenshot_fast(driver, test_run_id, row_idx, status, test_screenshot_dir)
 
     def take_screenshot_fast(self, driver, test_run_id, row_idx, status, test_screenshot_dir):
         """Fast screenshot capture"""
@@ -410,6 +563,7 @@ class HybridBackgroundWorker:
         try:
             driver.save_screenshot(screenshot_path)
             if os.path.exists(screenshot_path):
+                self.thumbnail_writer.submit(screenshot_path)
                 return screenshot_filename
             else:
                 return None
@@ -435,6 +589,9 @@ class HybridBackgroundWorker:
 
             logger.info(f"📦 Session data loaded: {len(session_data.get('cookies', []))} cookies")
 
+            # Keep it for later jobs on the same tenant
+            self.session_store.save(session_data, domain=self.run_domain(test_run))
+
             driver = self.create_testing_browser_with_session(session_data)
             if driver:
                 try:
@@ -482,8 +639,7 @@ class HybridBackgroundWorker:
                 logger.info(f"📄 Page title after session application: {driver.title}")
 
                 # Check if we're still on a login page
-                login_indicators = ['login', 'sign in', 'authenticate', 'invalid']
-                if any(indicator in page_title for indicator in login_indicators):
+                if looks_like_login(page_title):
                     logger.warning("⚠️ Session transfer may have failed - still on login page")
                     logger.warning(f"Title: {driver.title}")
                     # Don't quit the browser - return it anyway as it might still work
@@ -589,89 +745,597 @@ class HybridBackgroundWorker:
             logger.debug(f"Browser health check failed: {e}")
             return False
 
+    def run_first_url(self, test_run):
+        """First testable URL of a run - cached, used to find the tenant and to probe sessions"""
+        if test_run.id not in self._run_first_urls:
+            try:
+                self._run_first_urls[test_run.id] = open_url_source(test_run).first_valid_url()
+            except Exception as e:
+                logger.debug(f"Could not read first URL for test {test_run.id}: {e}")
+                return None
+        return self._run_first_urls[test_run.id]
+
+    def run_domain(self, test_run):
+        return domain_for_url(self.run_first_url(test_run))
+
+    def has_transferred_session(self, test_run):
+        return (os.path.exists(f"sessions/auth_ready_{test_run.id}.txt")
+                and os.path.exists(f"sessions/session_data_{test_run.id}.json"))
+
+    def has_reusable_session(self, test_run):
+        """A warm browser or unexpired stored session exists for the run's tenant"""
+        domain = self.run_domain(test_run)
+        return bool(domain) and (self.browser_pool.get(domain) is not None
+                                 or self.session_store.entry(domain) is not None)
+
     def get_or_create_authenticated_driver(self, test_run):
-        """Get authenticated driver"""
-        if hasattr(self, '_persistent_testing_browser'):
+        """Authenticated driver for a run: a just-transferred session, a warm browser, or a stored session"""
+        domain = self.run_domain(test_run)
+
+        # A session the user just transferred for this run always wins
+        if self.has_transferred_session(test_run):
+            driver = self.wait_for_authentication_fast(test_run)
+            if driver and domain:
+                self.pool_browser(domain, driver)
+            return driver
+
+        if not domain:
+            return None
+
+        entry = self.session_store.entry(domain)
+        probe_url = (entry['session'].get('current_url') if entry else None) or self.run_first_url(test_run)
+
+        driver = self.browser_pool.get(domain)
+        if driver is not None:
+            if probe_session(driver, probe_url):
+                logger.info(f"♻️ Reusing warm browser for {domain}")
+                self.session_store.mark_valid(domain)
+                return driver
+            # Kept until a replacement is pooled - runs still using it move over to that
+            logger.info(f"🔒 Warm browser for {domain} is no longer logged in")
+            self.metrics.browser_restarts.inc()
+
+        if entry is not None:
+            age_minutes = (time.time() - entry['captured_at']) / 60
+            logger.info(f"🔑 Reusing stored session for {domain} (captured {age_minutes:.0f} min ago)")
+            driver = self.create_testing_browser_with_session(entry['session'])
+            if driver and not looks_like_login(driver.title, driver.current_url):
+                self.session_store.mark_valid(domain)
+                self.pool_browser(domain, driver)
+                return driver
+
+            # The tenant no longer accepts it - ask for a fresh login
+            self.session_store.invalidate(domain)
+            if driver:
+                try:
+                    driver.quit()
+                except Exception:
+                    pass
+
+        self.browser_pool.discard(domain)  # A warm browser that failed its probe
+        return None
+
+    def pool_browser(self, domain, driver):
+        """Make driver the tenant's warm browser - runs on the browser it replaces move to it first"""
+        previous = self.browser_pool.get(domain)
+        if previous is not None and previous is not driver:
+            moved = [ctx for ctx in self.active_runs.values() if ctx.driver is previous]
+            for ctx in moved:
+                ctx.driver = driver
+            if moved:
+                logger.info(f"🔀 Moved {len(moved)} run(s) on {domain} to the new browser")
+            self.governor.forget(previous)
+        self.browser_pool.put(domain, driver)
+
+    def refresh_stored_session(self, test_run, driver):
+        """Copy the browser's current cookies to the session store so keep-alive uses live ones"""
+        try:
+            self.session_store.update_cookies(self.run_domain(test_run), driver.get_cookies())
+        except Exception as e:
+            logger.debug(f"Could not refresh stored session: {e}")
+
+    def pause_run_for_login(self, ctx, row_idx, login_url):
+        """Session expired mid-run - keep the tested rows, wait for a new login, resume at row_idx"""
+        test_run, driver = ctx.test_run, ctx.driver
+        domain = self.run_domain(test_run)
+        logger.warning(f"🔐 Session for {domain} expired at row {row_idx + 1} (sent to {login_url}) - "
+                       f"pausing test {test_run.id} until a new login")
+        self.flush_pending_results(force=True)
+
+        # Retried rows finish out of order - drop anything past the resume row so it isn't stored twice
+        if ctx.shard is not None:
+            self.db_manager.release_shard(ctx.shard.id, self.worker_id, row_idx)
+            self.db_manager.update_test_run_status(test_run.id, 'waiting_login')
+        else:
+            self.db_manager.delete_results_from_row(test_run.id, row_idx)
+            self.db_manager.pause_for_login(test_run.id, row_idx, ctx.progress)
+        ctx.stopped = 'waiting_login'
+
+        # Neither the browser nor the stored copy of the session is any use now
+        if domain:
+            self.session_store.invalidate(domain)
+        if self.browser_pool.owns(driver):
+            self.browser_pool.discard(domain)
+        else:
             try:
-                title = self._persistent_testing_browser.title
-                if not any(indicator in title.lower() for indicator in ['login', 'sign in', 'authenticate']):
-                    return self._persistent_testing_browser
-                else:
-                    self._persistent_testing_browser.quit()
-                    delattr(self, '_persistent_testing_browser')
-            except:
-                if hasattr(self, '_persistent_testing_browser'):
-                    delattr(self, '_persistent_testing_browser')
+                driver.quit()
+            except Exception:
+                pass
 
-        driver = self.wait_for_authentication_fast(test_run)
-        if driver:
-            self._persistent_testing_browser = driver
-        return driver
+        self.metrics.session_expirations.inc()
 
-    def process_test_run_fast(self, test_run):
-        """Process test run with AGGRESSIVE detection - COMPLETE FIXED VERSION"""
+    def probe_canary(self, test_run, driver, breaker, attempt):
+        """Load a URL that worked before; True if the target answers normally again, None without a URL.
+
+        A redirect to a login page raises SessionExpired.
+        """
+        canary_url = breaker.last_pass_url or self.run_first_url(test_run)
+        if not canary_url:
+            return None
+
+        logger.info(f"🐤 Canary {attempt}/{CANARY_ATTEMPTS} for test {test_run.id}: {canary_url[:80]}")
         try:
-            # Update status to running
-            self.db_manager.update_test_run_status(test_run.id, 'running', 0)
-            logger.info(f"🔥 Starting AGGRESSIVE processing for test {test_run.id}: {test_run.test_name}")
+            responses = self.responses_for(driver)
+            if responses:
+                responses.begin()
+            driver.get(canary_url)
+            time.sleep(1)
+            if is_login_redirect(canary_url, driver.current_url, driver.title):
+                raise SessionExpired(driver.current_url)
+
+            http_verdict = evaluate_http_status(
+                (responses.response() or {}).get('status') if responses else None)
+            if http_verdict:
+                is_fail, reason = True, http_verdict['reason']
+            else:
+                is_fail, reason, _ = self.simple_fail_detection(driver, canary_url)
+            if not is_fail:
+                return True
+            logger.info(f"🐤 Canary failed: {reason}")
+        except SessionExpired:
+            raise
+        except Exception as e:
+            logger.info(f"🐤 Canary could not load: {str(e)[:80]}")
+        return False
+
+    def park_run(self, ctx, resume_row):
+        """The canary failed too - stop the run and keep the streak's rows untested for a resume"""
+        test_run, breaker = ctx.test_run, ctx.breaker
+        canary = "canary URL failed too" if breaker.last_pass_url else "no URL has passed yet to use as a canary"
+        reason = f"Circuit breaker: {breaker.describe()}; {canary}"
+        logger.warning(f"🛑 Parking test {test_run.id} - {reason}")
+        self.flush_pending_results(force=True)
+        self.snapshot_writer.flush()
+
+        if ctx.shard is not None:
+            # The other shards keep their own places - only this one's range is handed back
+            self.db_manager.release_shard(ctx.shard.id, self.worker_id, resume_row)
+            self.db_manager.park_run(test_run.id, None, reason)
+        else:
+            self.db_manager.park_run(test_run.id, resume_row, reason, ctx.progress)
+        self.metrics.runs_finished.inc(status='parked')
+        ctx.stopped = 'parked'
+
+        # A dead target makes the browser useless for this tenant too
+        if self.browser_pool.owns(ctx.driver):
+            self.browser_pool.discard(self.run_domain(test_run))
+        else:
+            try:
+                ctx.driver.quit()
+            except Exception:
+                pass
 
-            # Get authenticated driver - FIXED to not wait indefinitely
-            driver = self.wait_for_authentication_fast(test_run)
+    def trip_breaker(self, ctx):
+        """Stop dispatching after a failure streak - the run's next chunks probe a canary instead"""
+        if ctx.canary is not None:
+            return  # Already probing - loads still finishing in other tabs add to the same streak
+        test_run, breaker = ctx.test_run, ctx.breaker
+        logger.warning(f"⚡ Circuit breaker tripped for test {test_run.id}: {breaker.describe()}")
+
+        # Rows waiting for a retry or still loading in another tab are untested too - a stopped run resumes from the earliest of them
+        first_pending = ctx.first_pending_row()
+        resume_row = breaker.streak_start if first_pending is None else min(breaker.streak_start, first_pending)
+        ctx.canary = {'attempt': 0, 'resume_row': resume_row}
+
+    def check_canary(self, ctx):
+        """One canary attempt for a tripped run. Between attempts the run steps aside for a doubling wait,
+        so a short outage resumes the run instead of parking it - and other runs keep the worker meanwhile.
+        """
+        test_run, breaker, canary = ctx.test_run, ctx.breaker, ctx.canary
+        canary['attempt'] += 1
+        try:
+            target_alive = self.probe_canary(test_run, ctx.driver, breaker, canary['attempt'])
+        except SessionExpired as e:
+            # The streak was the session running out - retest it after the new login
+            ctx.canary = None
+            self.pause_run_for_login(ctx, canary['resume_row'], str(e))
+            return
+
+        if target_alive:
+            logger.info(f"🐤 Canary passed - the streak is genuine, continuing test {test_run.id}")
+            self.metrics.circuit_breaker_trips.inc(outcome='resumed')
+            breaker.reset_after_canary()
+            ctx.canary = None
+        elif target_alive is None or canary['attempt'] >= CANARY_ATTEMPTS:
+            self.metrics.circuit_breaker_trips.inc(outcome='parked')
+            ctx.canary = None
+            self.park_run(ctx, canary['resume_row'])
+        else:
+            ctx.not_before = time.monotonic() + CANARY_WAIT_SECONDS * 2 ** (canary['attempt'] - 1)
+
+    def replace_lost_browser(self, test_run, driver):
+        """The browser crashed or disconnected - swap in another authenticated one if we can"""
+        if self.check_browser_health_fast(driver):
+            return driver
+
+        logger.warning(f"💥 Browser lost during test {test_run.id} - starting a replacement")
+        domain = self.run_domain(test_run)
+        if self.browser_pool.owns(driver):
+            self.browser_pool.discard(domain)
+        else:
+            try:
+                driver.quit()
+            except Exception:
+                pass
+        self.metrics.browser_restarts.inc()
+
+        replacement = self.get_or_create_authenticated_driver(test_run)
+        if replacement is None:
+            # No session to start one with - the next loads fail and trip the circuit breaker
+            logger.error(f"❌ No replacement browser for test {test_run.id}")
+            return driver
+        return replacement
+
+    def start_run(self, test_run, shard=None):
+        """Authenticate and open a run's rows (or a claimed shard's); returns its RunContext, or None"""
+        driver = None
+        try:
+            if shard is not None:
+                # A shard continues from its own last recorded row - the parent run is already running
+                resume_from = shard.next_row if shard.next_row is not None else shard.start_row
+                logger.info(f"🧩 Claimed shard {shard.shard_index + 1}/{test_run.shard_count} of test {test_run.id} "
+                            f"(rows {shard.start_row + 1}-{shard.end_row or 'end'}, from row {resume_from + 1})")
+            else:
+                # Runs paused by an expired session or the circuit breaker continue where they stopped
+                resume_from = test_run.resume_from_row or 0
+
+                # Update status to running
+                self.db_manager.update_test_run_status(test_run.id, 'running',
+                                                       test_run.progress if resume_from else 0)
+                logger.info(f"🔥 Starting AGGRESSIVE processing for test {test_run.id}: {test_run.test_name}")
+
+            # Get authenticated driver - a transferred, warm or stored session
+            transferred = self.has_transferred_session(test_run)
+            refusals = self.governor.refusals
+            driver = self.get_or_create_authenticated_driver(test_run)
+            if not driver and self.governor.refusals > refusals:
+                # No memory for a browser - the session files are kept, so it is admitted again later
+                logger.warning(f"🧠 No memory for a browser for test {test_run.id} - back to the queue")
+                if shard is not None:
+                    self.db_manager.release_shard(shard.id, self.worker_id, resume_from)
+                self.db_manager.update_test_run_status(test_run.id, 'waiting_login')
+                return None
+            if not driver and not transferred:
+                # A reused session turned out to be stale - wait for the user to log in again
+                logger.warning(f"🔐 No valid session for test {test_run.id} - back to waiting for login")
+                if shard is not None:
+                    self.db_manager.release_shard(shard.id, self.worker_id, resume_from)
+                self.db_manager.update_test_run_status(test_run.id, 'waiting_login')
+                return None
             if not driver:
                 logger.error(f"❌ Failed to get authenticated driver for test {test_run.id}")
                 self.db_manager.update_test_run_status(test_run.id, 'failed', 0)
-                return
+                self.metrics.runs_finished.inc(status='failed')
+                return None
 
-            # Load URLs from uploaded file
-            df = self.load_urls_from_file(test_run)
-            if df is None:
+            # Open URL source for the uploaded file
+            source = self.load_urls_from_file(test_run)
+            if source is None:
                 logger.error(f"❌ Failed to load URLs from file for test {test_run.id}")
                 self.db_manager.update_test_run_status(test_run.id, 'failed', 0)
-                if driver:
+                self.metrics.runs_finished.inc(status='failed')
+                if not self.browser_pool.owns(driver):
                     try:
                         driver.quit()
                     except:
                         pass
-                return
+                return None
 
             # Setup screenshot directory
             test_screenshot_dir = os.path.join(self.screenshots_dir, f"test_{test_run.id}")
             os.makedirs(test_screenshot_dir, exist_ok=True)
 
-            # Initialize counters
-            passed = failed = skipped = 0
-            total_urls = len(df)
-
-            logger.info(f"🔥 Processing {total_urls} URLs with AGGRESSIVE ERROR DETECTION")
+            logger.info(f"🔥 Processing {test_run.total_urls or 0} URLs with AGGRESSIVE ERROR DETECTION")
             logger.info(f"🔥 Will wait up to 3 seconds per URL for errors to appear")
 
-            # In the URL processing loop, change this part:
-            for idx, row in df.iterrows():
+            # Only the mapped metadata columns are read alongside the URL
+            metadata_fields = {field: column for field, column in self.get_metadata_columns(test_run, source).items()
+                               if column}
+            logger.info(f"🏷️ Row metadata columns: {metadata_fields or 'none found'}")
+
+            capture_snapshots = self.CAPTURE_SNAPSHOTS or bool(test_run.capture_snapshots)
+            if capture_snapshots:
+                logger.info("📄 Capturing page snapshots for this run")
+
+            # Rows whose page load failed transiently get more attempts later in the run.
+            # Rows are streamed from the upload - only one chunk is held in memory.
+            retries = RetryQueue()
+            rows = source.iter_rows(metadata_columns=list(metadata_fields.values()))
+            if shard is not None:
+                rows = shard_rows(rows, shard.start_row, shard.end_row)
+            rows = retries.interleave(rows)
+
+            user = self.db_manager.get_user_by_id(test_run.user_id)
+            ctx = RunContext(test_run, driver, source, rows, test_screenshot_dir, metadata_fields, capture_snapshots,
+                             breaker=CircuitBreaker(),  # Stops dispatching when every URL fails the same way
+                             retries=retries, resume_from=resume_from,
+                             user_weight=self.scheduler.weight_for(user.username if user else None), shard=shard)
+
+            # A resumed run (or shard) starts from the results it already has
+            if shard is not None:
+                counts = self.db_manager.get_result_counts(test_run.id, shard.start_row, shard.end_row)
+                ctx.passed, ctx.failed = counts.get('PASS', 0), counts.get('FAIL', 0)
+                ctx.processed = sum(counts.values())
+            elif resume_from:
+                counts = self.db_manager.get_result_counts(test_run.id)
+                ctx.passed, ctx.failed = counts.get('PASS', 0), counts.get('FAIL', 0)
+                ctx.processed = sum(counts.values())
+                logger.info(f"⏯️ Resuming test {test_run.id} at row {resume_from + 1} "
+                            f"({ctx.processed} rows already tested)")
+            return ctx
+
+        except Exception as e:
+            logger.error(f"💥 Fatal error starting test {test_run.id}: {e}")
+            self.fail_run(test_run, driver)
+            return None
+
+    def next_page_loads(self, ctx, max_page_loads):
+        """Yield (row, url, metadata, attempt, timer) for up to max_page_loads of a run's next page loads"""
+        page_loads = 0
+        while page_loads < max_page_loads and ctx.canary is None:
+            # Once the upload is exhausted only retries are left - those not due yet wait for a later chunk
+            item = next(ctx.rows, None) or ctx.retries.pop_due()
+            if item is None:
+                return
+            idx, url, metadata, attempt = item
+
+            if attempt == 1:
+                if not is_valid_url(url):
+                    ctx.skipped += 1
+                    continue
+                if idx < ctx.resume_from:
+                    continue  # Tested before the run was paused
+
+                ctx.processed += 1
+                ctx.next_row = idx + 1
+                logger.info(f"🔥 Processing URL {ctx.processed}/{ctx.total_urls}: {url[:50]}...")
+            else:
+                logger.info(f"🔁 Retrying row {idx + 1} (attempt {attempt}/{ctx.retries.max_attempts}): "
+                            f"{url[:50]}...")
+            page_loads += 1
+
+            # Time between finishing the previous URL and starting this one
+            timer = PhaseTimer()
+            timer.add('queue_wait', timer.started - ctx.last_url_done)
+            yield idx, url, metadata, attempt, timer
+
+    def iter_page_loads(self, ctx, max_page_loads):
+        """Yield (row, url, metadata, attempt, timer, outcome) for each page load of a chunk.
+
+        outcome is what process_url_fast returned, or the TransientNavigationError or
+        SessionExpired it raised.
+        """
+        tabs = self.tabs_for(ctx.driver)
+        if tabs is not None:
+            yield from self.pipeline_page_loads(ctx, tabs, max_page_loads)
+            return
+
+        for idx, url, metadata, attempt, timer in self.next_page_loads(ctx, max_page_loads):
+            # FASTER processing with reduced waits
+            try:
+                outcome = self.process_url_fast(ctx.driver, url, idx, ctx.test_run.id, ctx.screenshot_dir, timer,
+                                                snapshot=ctx.capture_snapshots)
+            except (TransientNavigationError, SessionExpired) as e:
+                outcome = e
+            yield idx, url, metadata, attempt, timer, outcome
+
+    def tabs_for(self, driver):
+        """The driver's BrowserTabs, opened on first use - None when pages load one at a time"""
+        if TABS_PER_BROWSER <= 1:
+            return None
+        tabs = self._tabs.get(driver)
+        if tabs is None:
+            tabs = self._tabs[driver] = BrowserTabs(driver)
+        return tabs
+
+    def pipeline_page_loads(self, ctx, tabs, max_page_loads):
+        """Spread a chunk's page loads over the tabs of the run's browser.
+
+        A navigation is started in one tab while pages in the others load, settle or are
+        checked, so the waits of each URL overlap instead of adding up. Outcomes come out
+        in the order pages finish; every load is finished before the chunk ends.
+        """
+        loads = self.next_page_loads(ctx, max_page_loads)
+        try:
+            while True:
+                if ctx.driver is not tabs.driver:
+                    # The browser was replaced - what it still had loading gets another attempt
+                    for slot in tabs.busy_slots():
+                        load = slot.load
+                        slot.clear()
+                        ctx.in_flight.discard(load[0])
+                        yield (*load, TransientNavigationError("Browser replaced mid-load"))
+                    tabs = self.tabs_for(ctx.driver)
+
+                now = time.monotonic()
+                for slot in tabs.idle_slots():
+                    load = next(loads, None)
+                    if load is None:
+                        break
+                    slot.start(load, now)
+                    ctx.in_flight.add(load[0])
+
+                busy = tabs.busy_slots()
+                if not busy:
+                    return
+
+                slot = min(busy, key=lambda s: s.due)
+                wait = slot.due - time.monotonic()
+                if wait > 0:
+                    time.sleep(wait)
+
+                outcome = self.step_tab(ctx, tabs, slot)
+                if outcome is not None:
+                    load = slot.load
+                    slot.clear()
+                    ctx.in_flight.discard(load[0])
+                    yield (*load, outcome)
+        finally:
+            tabs.abandon()
+            ctx.in_flight.clear()
+
+    def step_tab(self, ctx, tabs, slot):
+        """Move a tab's page load on by one stage; returns its outcome once the page is done, else None.
+
+        Stages follow process_url_fast: navigate, wait for the load, settle for a second,
+        then check the fail criteria at FAIL_CHECK_INTERVALS.
+        """
+        idx, url, metadata, attempt, timer = slot.load
+        driver = tabs.driver
+        now = time.monotonic()
+        try:
+            tabs.switch(slot.handle)
+
+            responses = self.responses_for(driver)
+            if slot.stage == 'navigate':
+                if responses:
+                    responses.begin(slot.handle)
+                driver.execute_script(NAVIGATE_SCRIPT, url)
+                slot.advance('loading', now + TAB_POLL_SECONDS * 2, now)
+                return None
+
+            if slot.stage == 'loading':
                 try:
-                    url = str(row[test_run.url_column])
+                    driver.switch_to.alert
+                    state = {'since_load': 1.0, 'net_error': None}  # An alert holds the page - check it now
+                except Exception:
+                    state = driver.execute_script(LOAD_STATE_SCRIPT)
+
+                if state is None:
+                    if now - slot.started > self.PAGE_LOAD_TIMEOUT:
+                        raise TimeoutException("Timed out waiting for page load in tab")
+                    slot.due = now + TAB_POLL_SECONDS
+                    return None
+                if state.get('net_error'):
+                    raise WebDriverException(f"unknown error: net::{state['net_error']}")
+
+                timer.add('navigation', now - slot.started)
+                if responses:
+                    slot.response = responses.response(slot.handle)
+
+                # An error response needs no settling or checks - go straight to the verdict
+                settle = max(0.0, 1.0 - float(state.get('since_load') or 0))  # process_url_fast's minimal wait
+                if evaluate_http_status(slot.response and slot.response['status']):
+                    settle = 0.0
+                slot.advance('settling', now + settle, now)
+                if settle:
+                    return None
+
+            if slot.stage == 'settling':
+                timer.add('readiness', now - slot.started)
+
+                # A login page instead of the requested one means the session ran out
+                if is_login_redirect(url, driver.current_url, driver.title):
+                    raise SessionExpired(driver.current_url)
+                slot.advance('checking', now, now)
+
+            # checking
+            http_verdict = evaluate_http_status(slot.response and slot.response['status'])
+            with timer.phase('detection'):
+                fail_result = http_verdict or self.check_fail_criteria(driver)
+
+            if http_verdict:
+                logger.info(f"❌ FAIL from response: {http_verdict['reason']}")
+                status, error_message, confidence = 'FAIL', http_verdict['reason'], 99
+            elif fail_result['is_fail']:
+                logger.info(f"❌ FAIL detected at {self.FAIL_CHECK_INTERVALS[slot.checks]}s: "
+                            f"{fail_result['reason']}")
+                status, error_message, confidence = 'FAIL', fail_result['reason'], 95
+            else:
+                slot.checks += 1
+                if slot.checks < len(self.FAIL_CHECK_INTERVALS):
+                    offset = self.FAIL_CHECK_INTERVALS[slot.checks] - self.FAIL_CHECK_INTERVALS[0]
+                    slot.due = slot.started + offset
+                    return None
+                status, error_message, confidence = 'PASS', None, 85
+
+            screenshot_filename = self.capture_evidence(driver, url, idx, ctx.test_run.id, status,
+                                                        ctx.screenshot_dir, timer, ctx.capture_snapshots)
+            return status, screenshot_filename, error_message, confidence, slot.response
+
+        except SessionExpired as e:
+            return e
+        except Exception as e:
+            return self.navigation_error_outcome(url, e)
+
+    def process_chunk(self, ctx, max_page_loads=CHUNK_SIZE):
+        """Test a run's next rows, up to max_page_loads page loads.
 
-                    if not url or url == 'nan' or not url.startswith('http'):
-                        skipped += 1
-                        continue
+        Returns the page loads done; ctx.stopped is set once the run has completed,
+        been paused or parked, or failed.
+        """
+        test_run = ctx.test_run
+        page_loads = 0
+        try:
+            # Touch the run's browser so the pool doesn't close it as idle while other runs have the worker
+            self.browser_pool.get(self.run_domain(test_run))
 
-                    logger.info(f"🔥 Processing URL {idx + 1}/{total_urls}: {url[:50]}...")
+            if ctx.canary is not None:
+                # Tripped breaker - this chunk is one canary load
+                self.check_canary(ctx)
+                return 1
 
-                    # FASTER processing with reduced waits
-                    status, screenshot_filename, error_message, confidence = self.process_url_fast(
-                        driver, url, idx, test_run.id, test_screenshot_dir
-                    )
+            for idx, url, metadata, attempt, timer, outcome in self.iter_page_loads(ctx, max_page_loads):
+                try:
+                    page_loads += 1
+
+                    try:
+                        if isinstance(outcome, Exception):
+                            raise outcome
+                        status, screenshot_filename, error_message, confidence, response = outcome
+                    except TransientNavigationError as e:
+                        error_message = f"Navigation error: {str(e)[:50]}"
+                        if is_browser_lost(e):
+                            ctx.driver = self.replace_lost_browser(test_run, ctx.driver)
+
+                        if ctx.retries.defer(idx, url, metadata, attempt):
+                            logger.warning(f"⏳ Row {idx + 1} deferred after attempt {attempt}: {error_message}")
+                            self.metrics.url_retries.inc(outcome='deferred')
+                            # Deferred rows still count towards a streak - a dead target must not be retried forever
+                            if ctx.breaker.record(idx, url, 'FAIL', error_message):
+                                self.trip_breaker(ctx)
+                            continue
+
+                        self.metrics.url_retries.inc(outcome='exhausted')
+                        status, screenshot_filename, confidence, response = 'FAIL', None, 30, None
+
+                    if attempt > 1 and status == 'PASS':
+                        self.metrics.url_retries.inc(outcome='recovered')
+                    self.metrics.record_url(status, timer.durations, timer.total_ms / 1000)
+                    if response:
+                        self.metrics.http_responses.inc(status_class=f"{response['status'] // 100}xx")
 
                     # Update counters
                     if status == 'PASS':
-                        passed += 1
+                        ctx.passed += 1
                     elif status == 'FAIL':
-                        failed += 1
+                        ctx.failed += 1
                     else:
-                        skipped += 1
+                        ctx.skipped += 1
 
                     # Get page title quickly
                     try:
-                        page_title = driver.title[:100] if driver.title else None  # Reduced length
+                        page_title = ctx.driver.title[:100] if ctx.driver.title else None  # Reduced length
                     except:
                         page_title = None
 
@@ -685,110 +1349,403 @@ class HybridBackgroundWorker:
                         page_title=page_title,
                         error_message=error_message,
                         confidence=confidence,
-                        execution_time=0,
+                        execution_time=timer.total_ms,
                         detection_method='fast_invalid_file_detection',
-                        evidence=error_message,
-                        methods_used='invalid_select_file_only'
+                        evidence={'reason': error_message, 'timings_ms': timer.as_ms(), 'http': response},
+                        methods_used='invalid_select_file_only',
+                        attempts=attempt,
+                        http_status=response and response['status'],
+                        redirect_chain=response and response['redirects'],
+                        response_ms=response and response['response_ms'],
+                        **timer.columns(),
+                        **{field: metadata.get(column) for field, column in ctx.metadata_fields.items()}
                     )
 
+                    if ctx.breaker.record(idx, url, status, error_message):
+                        self.trip_breaker(ctx)
+
                     # Update progress every 5 URLs instead of every 2
-                    if (idx + 1) % 5 == 0:
-                        progress = ((idx + 1) / total_urls) * 100
-                        self.db_manager.update_test_run_status(test_run.id, 'running', progress)
+                    if ctx.every('progress', 5):
+                        if ctx.shard is not None:
+                            # Check the claim before writing - a shard taken over by another worker is theirs
+                            if not self.sync_shard(ctx):
+                                return page_loads
+                        else:
+                            self.queue_progress(ctx)
                         self.flush_pending_results()
 
-                    # Simplified progress logging
-                    if (idx + 1) % 10 == 0:  # Log every 10 URLs instead of every URL
-                        progress = ((idx + 1) / total_urls) * 100
-                        logger.info(f"🔥 Progress: {idx + 1}/{total_urls} ({progress:.0f}%) - P:{passed} F:{failed}")
-
-                    # Remove browser health checks for speed
-                    # if not self.check_browser_health_fast(driver): # COMMENTED OUT
+                    # Keep the stored session's cookies current for keep-alive and later jobs
+                    if ctx.every('session_refresh', self.SESSION_REFRESH_EVERY):
+                        self.refresh_stored_session(test_run, ctx.driver)
 
+                    # Simplified progress logging
+                    if ctx.every('log', 10):  # Log every 10 URLs instead of every URL
+                        logger.info(f"🔥 Progress: {ctx.processed}/{ctx.total_urls} ({ctx.progress:.0f}%) - "
+                                    f"P:{ctx.passed} F:{ctx.failed}")
+
+                except SessionExpired as e:
+                    # Rows still waiting for a retry are tested again after the new login
+                    self.pause_run_for_login(ctx, min(idx, ctx.resume_row()), str(e))
+                    return page_loads
                 except Exception as e:
                     logger.error(f"💥 Error processing row {idx}: {e}")
-                    failed += 1
+                    ctx.failed += 1
                     continue
+                finally:
+                    ctx.last_url_done = time.perf_counter()
 
-            # Final flush of any remaining results
-            self.flush_pending_results(force=True)
+                # Give the other runs a turn
+                if page_loads >= max_page_loads:
+                    return page_loads
 
-            # Calculate final statistics
-            total_processed = passed + failed
-            success_rate = (passed / total_processed * 100) if total_processed > 0 else 0
+            if ctx.canary is not None:
+                return page_loads  # Tripped - the next chunk probes the canary
 
-            logger.info(f"🔥 Test {test_run.id} processing completed!")
-            logger.info(f"🔥 Final Results: P:{passed} F:{failed} S:{skipped} ({success_rate:.1f}% success)")
+            if len(ctx.retries):
+                # Only retries still in their backoff are left - the run sits out until the first is due
+                ctx.not_before = ctx.retries.next_due()
+                return page_loads
 
-            # Update test run with final results
-            try:
-                # Update status to completed
-                self.db_manager.update_test_run_status(test_run.id, 'completed', 100.0)
+            self.finish_run(ctx)
 
-                # Update the test run record with final statistics
-                test_run.passed = passed
-                test_run.failed = failed
-                test_run.skipped = skipped
-                test_run.success_rate = success_rate
-                test_run.completed_date = datetime.now()
-                test_run.status = 'completed'
+        except Exception as e:
+            logger.error(f"💥 Fatal error processing test {test_run.id}: {e}")
+            self.fail_run(test_run, ctx.driver)
+            ctx.stopped = 'failed'
+
+        return page_loads
+
+    def finish_run(self, ctx):
+        """Every row is done - store the final statistics and release the browser"""
+        test_run, driver = ctx.test_run, ctx.driver
+        passed, failed, skipped = ctx.passed, ctx.failed, ctx.skipped
+
+        # Final flush of any remaining results, with the final counters
+        if ctx.shard is None:
+            self.queue_progress(ctx)
+        self.flush_pending_results(force=True)
+        self.snapshot_writer.flush()
+        self.refresh_stored_session(test_run, driver)
+
+        if ctx.shard is not None:
+            self.finish_shard(ctx)
+            return
 
-                # Commit the changes
-                self.db_manager.session.commit()
+        # Calculate final statistics
+        total_processed = passed + failed
+        success_rate = (passed / total_processed * 100) if total_processed > 0 else 0
 
-                logger.info(f"✅ Test run {test_run.id} marked as completed in database")
+        logger.info(f"🔥 Test {test_run.id} processing completed!")
+        logger.info(f"🔥 Final Results: P:{passed} F:{failed} S:{skipped} ({success_rate:.1f}% success)")
 
-            except Exception as e:
-                logger.error(f"💥 Error updating final test results: {e}")
-                # Try to at least mark as completed
-                try:
-                    self.db_manager.update_test_run_status(test_run.id, 'completed', 100.0)
-                except:
-                    pass
+        # Update test run with final results
+        try:
+            # Update status to completed
+            self.db_manager.update_test_run_status(test_run.id, 'completed', 100.0)
+            self.metrics.runs_finished.inc(status='completed')
+
+            # Update the test run record with final statistics
+            test_run.passed = passed
+            test_run.failed = failed
+            test_run.skipped = skipped
+            test_run.success_rate = success_rate
+            test_run.completed_date = datetime.now()
+            test_run.status = 'completed'
+
+            # Commit the changes
+            self.db_manager.session.commit()
+
+            logger.info(f"✅ Test run {test_run.id} marked as completed in database")
+
+            # Where the time went, per phase
+            phase_summary = self.db_manager.finalize_run_timings(test_run.id)
+            if phase_summary:
+                logger.info("⏱️ Phase timings (avg / p95 ms, share): " + ", ".join(
+                    f"{phase} {stats['avg']:.0f}/{stats['p95']:.0f} ({stats['share']:.0f}%)"
+                    for phase, stats in phase_summary.items()
+                ))
 
-            # Clean up browser
+        except Exception as e:
+            logger.error(f"💥 Error updating final test results: {e}")
+            # Try to at least mark as completed
             try:
-                if driver:
-                    logger.info("🧹 Cleaning up browser...")
-                    # Don't quit if this is a persistent browser - just log
-                    if hasattr(self, '_persistent_testing_browser') and driver == self._persistent_testing_browser:
-                        logger.info("🔄 Keeping persistent browser for future tests")
-                    else:
-                        driver.quit()
-                        logger.info("🔚 Browser closed")
-            except Exception as e:
-                logger.warning(f"⚠️ Error during browser cleanup: {e}")
+                self.db_manager.update_test_run_status(test_run.id, 'completed', 100.0)
+            except:
+                pass
+        ctx.stopped = 'completed'
+
+        # Clean up browser
+        try:
+            if driver:
+                logger.info("🧹 Cleaning up browser...")
+                # Don't quit warm browsers - the next job on this tenant reuses them
+                if self.browser_pool.owns(driver):
+                    logger.info("🔄 Keeping warm browser for future tests")
+                else:
+                    driver.quit()
+                    logger.info("🔚 Browser closed")
+        except Exception as e:
+            logger.warning(f"⚠️ Error during browser cleanup: {e}")
+
+        logger.info(f"🎉 Test {test_run.id} completed successfully!")
+
+    def finish_shard(self, ctx):
+        """A shard's rows are done - the worker finishing the last shard completes the whole run"""
+        test_run = ctx.test_run
+        ctx.stopped = 'completed'
+        logger.info(f"🧩 Test {ctx.label} done: P:{ctx.passed} F:{ctx.failed} S:{ctx.skipped}")
+        if not self.db_manager.complete_shard(ctx.shard.id, self.worker_id, ctx.passed, ctx.failed, ctx.skipped,
+                                              ctx.processed):
+            return
+
+        self.metrics.runs_finished.inc(status='completed')
+        self.db_manager.session.refresh(test_run)
+        logger.info(f"✅ Test run {test_run.id} completed across {test_run.shard_count} shards: "
+                    f"P:{test_run.passed} F:{test_run.failed} S:{test_run.skipped} "
+                    f"({test_run.success_rate:.1f}% success)")
+        phase_summary = self.db_manager.finalize_run_timings(test_run.id)
+        if phase_summary:
+            logger.info("⏱️ Phase timings (avg / p95 ms, share): " + ", ".join(
+                f"{phase} {stats['avg']:.0f}/{stats['p95']:.0f} ({stats['share']:.0f}%)"
+                for phase, stats in phase_summary.items()
+            ))
+
+    def is_shard_result(self, ctx, result):
+        return (result['test_run_id'] == ctx.test_run.id and ctx.shard.start_row <= result['row_number']
+                and (ctx.shard.end_row is None or result['row_number'] < ctx.shard.end_row))
+
+    def stored_up_to(self, ctx):
+        """Row a takeover of the shard must restart from - its results below are all in the database"""
+        unflushed = [r['row_number'] for r in self.pending_results if self.is_shard_result(ctx, r)]
+        return min([ctx.resume_row(), *unflushed])
+
+    def sync_shard(self, ctx):
+        """Heartbeat a claimed shard and merge its counters into the run; False if it has to stop here"""
+        status = self.db_manager.update_shard_progress(ctx.shard.id, self.worker_id, self.stored_up_to(ctx),
+                                                       ctx.processed, ctx.passed, ctx.failed, ctx.skipped)
+        if status is None:
+            # The lease ran out and another worker took the shard over - its results are theirs now
+            logger.warning(f"⚠️ Lost the claim on test {ctx.label} - stopping it here")
+            self.pending_results = [r for r in self.pending_results if not self.is_shard_result(ctx, r)]
+            ctx.stopped = 'released'
+            return False
+        if status != 'running':
+            # Paused or parked by another shard, or from the UI - hand the rest of the range back
+            self.suspend_run(ctx)
+            return False
+        return True
 
-            logger.info(f"🎉 Test {test_run.id} completed successfully!")
+    def fail_run(self, test_run, driver):
+        """Mark a run failed after an unexpected error, keeping the results it has"""
+        # Try to mark test as failed
+        try:
+            self.db_manager.update_test_run_status(test_run.id, 'failed', 0)
+            self.metrics.runs_finished.inc(status='failed')
+        except:
+            pass
 
+        # Flush any pending results
+        try:
+            self.flush_pending_results(force=True)
         except Exception as e:
-            logger.error(f"💥 Fatal error in process_test_run_fast: {e}")
+            logger.error(f"💥 Final flush failed: {e}")
 
-            # Try to mark test as failed
-            try:
-                self.db_manager.update_test_run_status(test_run.id, 'failed', 0)
-            except:
-                pass
+        # Clean up browser - a warm browser may be in use by other runs on the tenant
+        try:
+            if driver and not self.browser_pool.owns(driver):
+                driver.quit()
+        except:
+            pass
+
+    def suspend_run(self, ctx):
+        """Hand an active run back to the queue - it resumes from its first unfinished row"""
+        self.flush_pending_results(force=True)
+        resume_row = ctx.resume_row()
+        if ctx.shard is not None:
+            # Another worker process can pick the shard up straight away
+            self.db_manager.release_shard(ctx.shard.id, self.worker_id, resume_row)
+            ctx.stopped = 'released'
+        else:
+            self.db_manager.delete_results_from_row(ctx.test_run.id, resume_row)
+            self.db_manager.pause_for_login(ctx.test_run.id, resume_row, ctx.progress)
+            ctx.stopped = 'waiting_login'
+        logger.info(f"⏸️ Test {ctx.label} suspended at row {resume_row + 1}")
 
-            # Flush any pending results
+    def process_test_run_fast(self, test_run):
+        """Process a whole test run on its own, without interleaving other runs"""
+        ctx = self.start_run(test_run)
+        while ctx is not None and ctx.stopped is None:
+            # Nothing else shares the worker here, so waiting out a retry's backoff holds up no one
+            wait = ctx.not_before - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+            self.process_chunk(ctx)
+
+    def can_admit(self, job):
+        """Room to interleave another run - its tenant needs a browser the pool can keep open"""
+        if len(self.active_runs) >= MAX_ACTIVE_RUNS:
+            return False
+        active_domains = {self.run_domain(ctx.test_run) for ctx in self.active_runs.values()}
+        domain = self.run_domain(job)
+        if domain in active_domains:
+            return True
+        if len(active_domains) >= self.browser_pool.max_size:
+            return False
+        # A new tenant needs a browser - a warm one, or memory to start one
+        return self.browser_pool.has(domain) or self.governor.can_spawn() or bool(self.idle_browsers())
+
+    def idle_browsers(self):
+        """Measured (driver, bytes) of warm browsers no active run is using, heaviest first"""
+        in_use = [ctx.driver for ctx in self.active_runs.values()]
+        return [(driver, rss) for driver, rss in self.governor.heaviest_first()
+                if not any(driver is used for used in in_use) and self.browser_pool.owns(driver)]
+
+    def close_browser(self, driver, rss, reason):
+        domain = self.browser_pool.domain_of(driver)
+        logger.info(f"🧠 Closing the {domain or 'unpooled'} browser ({rss / MB:.0f} MB) - {reason}")
+        if domain:
+            self.browser_pool.discard(domain)
+        else:
             try:
-                self.flush_pending_results(force=True)
-            except:
+                driver.quit()
+            except Exception:
                 pass
-
-            # Clean up browser
+        self.governor.forget(driver)
+        self.metrics.governor_actions.inc(action='closed')
+
+    def free_browser_memory(self):
+        """Close idle warm browsers, heaviest first, until a new one fits; True if it does"""
+        for driver, rss in self.idle_browsers():
+            self.close_browser(driver, rss, "making room for a new browser")
+            if self.governor.can_spawn():
+                return True
+        return self.governor.can_spawn()
+
+    def recycle_browser(self, driver, rss):
+        """Swap a bloated browser for a fresh one on the stored session, for every run sharing it"""
+        runs = [ctx for ctx in self.active_runs.values() if ctx.driver is driver]
+        test_run = runs[0].test_run
+        domain = self.run_domain(test_run)
+        logger.info(f"🧠 Recycling the {domain} browser ({rss / MB:.0f} MB) for {len(runs)} run(s)")
+
+        # The new browser starts from the old one's latest cookies
+        self.refresh_stored_session(test_run, driver)
+        if self.browser_pool.owns(driver):
+            self.browser_pool.discard(domain)
+        else:
             try:
-                if 'driver' in locals() and driver:
-                    driver.quit()
-            except:
+                driver.quit()
+            except Exception:
                 pass
+        self.governor.forget(driver)
+        self.metrics.governor_actions.inc(action='recycled')
+
+        refusals = self.governor.refusals
+        replacement = self.get_or_create_authenticated_driver(test_run)
+        for ctx in runs:
+            if replacement is not None:
+                ctx.driver = replacement
+                continue
+            if self.governor.refusals > refusals:
+                self.suspend_run(ctx)  # Still no room - back to the queue until there is
+            else:
+                self.pause_run_for_login(ctx, ctx.resume_row(), "no usable session for a recycled browser")
+            self.active_runs.pop(ctx.key, None)
 
-        finally:
-            # Ensure any remaining results are saved
-            try:
-                self.flush_pending_results(force=True)
-            except Exception as e:
-                logger.error(f"💥 Final flush failed: {e}")
+    def enforce_memory_budget(self):
+        """Sample the browsers, size the pool to the budget, and close or recycle the heaviest while over it"""
+        if not self.governor.due():
+            return
+        self.governor.sample(list(self._browsers))
+
+        # Never below the tenants already running - their browsers stay open
+        active_domains = {self.run_domain(ctx.test_run) for ctx in self.active_runs.values()}
+        capacity = self.governor.capacity()
+        self.browser_pool.max_size = max(min(self.BROWSER_POOL_LIMIT, capacity), len(active_domains), 1)
+        self.metrics.browser_capacity.set(capacity)
+
+        # Idle warm browsers beyond the capacity go now, rather than the pool evicting one a run is using later
+        for driver, rss in self.idle_browsers():
+            if len(self.browser_pool) <= self.browser_pool.max_size:
+                break
+            self.close_browser(driver, rss, "the memory budget has no room for it")
+
+        over = self.governor.over_budget()
+        if over <= 0:
+            return
+        logger.warning(f"🧠 Browsers use {self.governor.total / MB:.0f} MB - {over / MB:.0f} MB over the "
+                       f"{self.governor.budget / MB:.0f} MB budget")
+
+        for driver, rss in self.governor.heaviest_first():
+            if over <= 0:
+                break
+            if not any(ctx.driver is driver for ctx in self.active_runs.values()):
+                self.close_browser(driver, rss, "over the memory budget")
+                over -= rss
+            elif rss > self.governor.estimate:  # A fresh browser would be smaller
+                self.recycle_browser(driver, rss)
+                over -= rss - self.governor.estimate
+
+    def admit_run(self, job, shard=None):
+        ctx = self.start_run(job, shard)
+        if ctx is not None:
+            self.scheduler.admit(ctx, list(self.active_runs.values()))
+            self.active_runs[ctx.key] = ctx
+            logger.info(f"📥 Test {ctx.label} admitted ({job.priority or 'normal'} priority) - "
+                        f"{len(self.active_runs)} run(s) active")
+
+    def start_sharded_run(self, job):
+        """Authenticated sharded run - mark it running so worker processes start claiming its shards"""
+        if not self.db_manager.get_shards(job.id):
+            self.db_manager.create_shards(job.id, job.shard_count, job.total_urls or 0)
+        self.db_manager.update_test_run_status(job.id, 'running')
+        logger.info(f"🧩 Test {job.id} split into {job.shard_count} shards for worker processes to claim")
+
+    def claim_shards(self):
+        """Claim free shards of running sharded runs while this process has room; True if any were claimed"""
+        claimed = False
+        for test_run_id in self.db_manager.get_claimable_run_ids(SHARD_LEASE_SECONDS):
+            held = sum(1 for run_id, _ in self.active_runs if run_id == test_run_id)
+            test_run = self.db_manager.get_test_run_by_id(test_run_id)
+            if held >= SHARDS_PER_WORKER or test_run is None or not self.can_admit(test_run):
+                continue
+            shard = self.db_manager.claim_shard(test_run_id, self.worker_id, SHARD_LEASE_SECONDS)
+            if shard is not None:
+                self.admit_run(test_run, shard)
+                claimed = True
+        return claimed
+
+    def run_next_chunk(self):
+        """Give the fair-share pick one chunk; True if any work was done"""
+        ctx = self.scheduler.pick([c for c in self.active_runs.values() if c.not_before <= time.monotonic()])
+        if ctx is None:
+            return False
+
+        page_loads = self.process_chunk(ctx)
+        self.scheduler.charge(ctx, page_loads)
+
+        if ctx.stopped is not None:
+            self.active_runs.pop(ctx.key, None)
+            if ctx.stopped == 'waiting_login':
+                # The tenant's session is gone for every run sharing it - they wait for the same new login
+                domain = self.run_domain(ctx.test_run)
+                for other in [c for c in self.active_runs.values() if self.run_domain(c.test_run) == domain]:
+                    self.suspend_run(other)
+                    self.active_runs.pop(other.key, None)
+        return True
+
+    def idle_wait(self, poll_interval):
+        """How long the loop may block for a job signal - no later than the next run's retries come due"""
+        waiting = [c.not_before for c in self.active_runs.values()]
+        if not waiting:
+            return poll_interval
+        return min(poll_interval, max(min(waiting) - time.monotonic(), 0.0))
+
+    def heartbeat_shards(self):
+        """Keep the leases on claimed shards that are waiting for their next chunk"""
+        for ctx in [c for c in self.active_runs.values() if c.shard is not None]:
+            if not self.sync_shard(ctx):
+                self.active_runs.pop(ctx.key, None)
 
     def process_pending_to_waiting_fast(self, test_run):
         try:
@@ -800,6 +1757,10 @@ class HybridBackgroundWorker:
 
     def cleanup_persistent_session(self):
         """Clean up persistent browser sessions"""
+        if len(self.browser_pool):
+            logger.info(f"🔚 Closing {len(self.browser_pool)} warm browser(s)...")
+            self.browser_pool.close_all()
+
         if hasattr(self, '_persistent_testing_browser'):
             try:
                 logger.info("🔚 Cleaning up persistent testing browser...")
@@ -831,22 +1792,33 @@ class HybridBackgroundWorker:
         logger.info("🔥" + "=" * 80)
 
         loop_count = 0
+        self.metrics_server.start()
+        self.keepalive.start()
+        watching = self.job_signals.start()
+        idle_wait = self.FALLBACK_POLL_INTERVAL if watching else self.POLL_INTERVAL
 
         try:
             while True:
                 try:
                     loop_count += 1
+                    work_done = False
+                    self.metrics.last_loop.set(time.time())
 
-                    # Log every 10 loops (45 seconds) to show worker is alive
+                    # Log every 10 loops to show worker is alive
                     if loop_count % 10 == 1:
                         logger.info(f"🔄 Worker alive - Loop #{loop_count}")
 
+                    self.browser_pool.close_idle()
+                    self.enforce_memory_budget()
+
                     # Get pending jobs
                     pending_jobs = self.get_pending_jobs_fast()
 
                     if pending_jobs:
                         logger.info(f"📋 Found {len(pending_jobs)} pending jobs")
 
+                        # Higher priority runs are admitted first when browser slots are short
+                        pending_jobs.sort(key=lambda j: -PRIORITY_WEIGHTS.get(j.priority, 0))
                         for job in pending_jobs:
                             logger.info(f"🔍 Processing job {job.id}: {job.test_name} - Status: {job.status}")
 
@@ -867,22 +1839,42 @@ class HybridBackgroundWorker:
                                 auth_exists = os.path.exists(auth_file)
                                 session_exists = os.path.exists(session_file)
 
-                                if auth_exists and session_exists:
-                                    logger.info(f"🎯 Authentication files found for job {job.id}!")
-                                    logger.info(f"🚀 Starting processing for job {job.id}")
-                                    self.process_test_run_fast(job)
+                                if (auth_exists and session_exists) or self.has_reusable_session(job):
+                                    if not self.can_admit(job):
+                                        if loop_count % 20 == 1:
+                                            logger.info(f"⏳ Job {job.id} is ready - waiting for a free browser slot")
+                                        continue
+                                    if auth_exists and session_exists:
+                                        logger.info(f"🎯 Authentication files found for job {job.id}!")
+                                    else:
+                                        logger.info(f"🔑 Reusing the {self.run_domain(job)} session for job {job.id}")
+                                    if (job.shard_count or 1) > 1:
+                                        self.start_sharded_run(job)
+                                    else:
+                                        self.admit_run(job)
                                 else:
-                                    if loop_count % 20 == 1:  # Log every minute
+                                    if loop_count % 20 == 1:
                                         logger.info(f"⏰ Still waiting for authentication for job {job.id}")
                                         logger.info(f"   Auth file ({auth_file}): {auth_exists}")
                                         logger.info(f"   Session file ({session_file}): {session_exists}")
-                    else:
+                    elif not self.active_runs:
                         # No pending jobs
-                        if loop_count % 20 == 1:  # Log every minute when idle
+                        if loop_count % 20 == 1:
                             logger.info("😴 No pending jobs, worker is idle...")
 
-                    # Sleep for 3 seconds between checks
-                    time.sleep(3)
+                    # Shards of sharded runs - claimed from any worker process sharing the database
+                    self.heartbeat_shards()
+                    if self.claim_shards():
+                        work_done = True
+
+                    # One chunk of the run that is furthest behind its fair share
+                    if self.run_next_chunk():
+                        work_done = True
+
+                    # A finished job may have unblocked others - look again straight away.
+                    # Otherwise block until the UI signals a new job or session transfer.
+                    if not work_done:
+                        self.job_signals.wait(self.idle_wait(idle_wait))
 
                 except KeyboardInterrupt:
                     logger.info("🛑 Keyboard interrupt received")
@@ -895,6 +1887,18 @@ class HybridBackgroundWorker:
         finally:
             # Cleanup on shutdown
             logger.info("🔚 Shutting down aggressive worker...")
+            self.job_signals.stop()
+            self.metrics_server.stop()
+            self.keepalive.stop()
+            # Active runs go back to the queue and resume where they were on the next start
+            for ctx in list(self.active_runs.values()):
+                try:
+                    self.suspend_run(ctx)
+                except Exception as e:
+                    logger.error(f"💥 Could not suspend test {ctx.test_run.id}: {e}")
+            self.active_runs.clear()
+            self.thumbnail_writer.shutdown(wait=True)
+            self.snapshot_writer.shutdown()
             try:
                 self.flush_pending_results(force=True)
                 logger.info("✅ Final database flush completed")
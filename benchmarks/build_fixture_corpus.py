@@ -0,0 +1,57 @@
+"""Write a labeled detection corpus (JSONL) from the fixture pages.
+
+    python benchmarks/build_fixture_corpus.py --pages 500 --out fixture_corpus.jsonl
+    python detection_corpus.py fixture_corpus.jsonl
+"""
+import json
+import random
+import argparse
+
+from fixture_server import PAGE_KINDS, DEFAULT_MIX, render_page
+
+# What the worker sees once a page's scripts have run - the raw HTML alone doesn't have it
+RUNTIME_CAPTURE = {
+    'delayed_modal': {'modal_texts': ["An exception has occurred"]},
+}
+
+EXPECTED_REASONS = {
+    'invalid_select': 'invalid select file',
+    'alert_denied': 'access denied',
+    'delayed_modal': 'an exception has occurred',
+    'ui_dialog': 'your request did not complete',
+    'exception': 'exception messages:',
+}
+
+
+def build_corpus(path, pages, mix=None, seed=0, base_url="http://fixture.local"):
+    mix = mix or DEFAULT_MIX
+    rng = random.Random(seed)
+    kinds = rng.choices(list(mix), weights=list(mix.values()), k=pages)
+    with open(path, 'w', encoding='utf-8') as f:
+        for i, kind in enumerate(kinds):
+            record = {
+                'url': f"{base_url}/{kind}/{i}",
+                'kind': kind,
+                'html': render_page(kind, i),
+                'expected_status': PAGE_KINDS[kind],
+            }
+            if kind in EXPECTED_REASONS:
+                record['expected_reason'] = EXPECTED_REASONS[kind]
+            record.update(RUNTIME_CAPTURE.get(kind, {}))
+            f.write(json.dumps(record) + "\n")
+    return len(kinds)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write a labeled detection corpus from the fixture pages")
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--out", default="fixture_corpus.jsonl")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    count = build_corpus(args.out, args.pages, seed=args.seed)
+    print(f"Wrote {count} pages to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
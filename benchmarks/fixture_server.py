@@ -0,0 +1,207 @@
+"""Local fake-Yardi HTTP server for benchmarking the worker without a real tenant.
+
+Every page kind mimics a failure mode the worker has to detect (or a clean page it
+must not flag). URLs look like /<kind>/<n>; the expected status for each kind is in
+PAGE_KINDS.
+
+    python benchmarks/fixture_server.py --port 8765 --latency-ms 200 --jitter-ms 100
+"""
+import time
+import random
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit
+
+# kind -> expected worker status
+PAGE_KINDS = {
+    'clean': 'PASS',
+    'report': 'PASS',
+    'invalid_select': 'FAIL',
+    'alert_denied': 'FAIL',
+    'delayed_modal': 'FAIL',
+    'ui_dialog': 'FAIL',
+    'exception': 'FAIL',
+}
+
+# Default mix - most menu links are fine
+DEFAULT_MIX = {
+    'clean': 45,
+    'report': 15,
+    'invalid_select': 10,
+    'alert_denied': 8,
+    'delayed_modal': 8,
+    'ui_dialog': 8,
+    'exception': 6,
+}
+
+PAGE_TEMPLATE = """<!DOCTYPE html>
+<html>
+<head>
+<title>{title}</title>
+<style>
+body {{ font-family: Arial, sans-serif; margin: 0; }}
+#header {{ background: #1b3f6b; color: #fff; padding: 8px 16px; }}
+#menu {{ float: left; width: 200px; background: #eef2f7; height: 600px; }}
+#content {{ margin-left: 220px; padding: 16px; }}
+.ui-dialog {{ position: absolute; top: 120px; left: 300px; border: 1px solid #888; background: #fff; padding: 12px; }}
+.modal {{ position: fixed; top: 80px; left: 35%; border: 2px solid #b00; background: #fff; padding: 16px; }}
+</style>
+</head>
+<body>
+<div id="header">Voyager 7S &middot; Fixture Property Management</div>
+<div id="menu">
+<ul>
+<li>Residents</li><li>Receivables</li><li>Payables</li><li>Reports</li><li>Setup</li>
+</ul>
+</div>
+<div id="content">
+{content}
+</div>
+{extra}
+</body>
+</html>
+"""
+
+FILTER_FORM = """<h2>{title}</h2>
+<form>
+<table>
+<tr><td>Property</td><td><input name="prop" value="fix{n}"></td></tr>
+<tr><td>From Date</td><td><input name="from" value="01/2024"></td></tr>
+<tr><td>To Date</td><td><input name="to" value="12/2024"></td></tr>
+</table>
+<input type="button" value="Display"> <input type="button" value="Excel">
+</form>
+"""
+
+
+def _report_rows(n):
+    rows = "".join(f"<tr><td>Unit {n}-{i}</td><td>{1000 + i * 37:.2f}</td><td>Current</td></tr>" for i in range(40))
+    return f"<table border='1'><tr><th>Unit</th><th>Balance</th><th>Status</th></tr>{rows}</table>"
+
+
+def render_page(kind, n):
+    """HTML for one fixture page"""
+    title = f"Fixture {kind.replace('_', ' ').title()} {n}"
+    form = FILTER_FORM.format(title=title, n=n)
+    extra = ""
+
+    if kind == 'clean':
+        content = form
+    elif kind == 'report':
+        content = form + _report_rows(n)
+    elif kind == 'invalid_select':
+        content = "<h2>Error</h2><p>Invalid select file</p>"
+    elif kind == 'alert_denied':
+        content = form
+        extra = '<script>setTimeout(function () { alert("Access denied"); }, 100);</script>'
+    elif kind == 'delayed_modal':
+        # The error text is decoded at runtime so it is not in the initial page source
+        content = form
+        extra = """<script>
+setTimeout(function () {
+  var d = document.createElement('div');
+  d.className = 'modal';
+  d.setAttribute('role', 'dialog');
+  d.textContent = atob('QW4gZXhjZXB0aW9uIGhhcyBvY2N1cnJlZA==');
+  document.body.appendChild(d);
+}, 1500);
+</script>"""
+    elif kind == 'ui_dialog':
+        content = form
+        extra = ('<div class="ui-dialog"><div class="ui-dialog-content">'
+                 'Your request did not complete. Please try your request again.</div></div>')
+    elif kind == 'exception':
+        content = "<h2>Server Error</h2><p>Exception messages: object reference not set</p>"
+    else:
+        raise KeyError(kind)
+
+    return PAGE_TEMPLATE.format(title=title, content=content, extra=extra)
+
+
+class _FixtureHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server.fixture
+        path = urlsplit(self.path).path.strip('/')
+
+        if path in ('', 'home'):
+            body = PAGE_TEMPLATE.format(title="Fixture Home", content="<h2>Welcome</h2>", extra="")
+        else:
+            kind, _, n = path.partition('/')
+            if kind not in PAGE_KINDS:
+                self.send_error(404)
+                return
+            server.delay()
+            body = render_page(kind, n or '0')
+
+        data = body.encode('utf-8')
+        server.requests += 1
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class FixtureServer:
+    """Threaded fixture server with configurable response latency"""
+
+    def __init__(self, host="127.0.0.1", port=0, latency_ms=0, jitter_ms=0, seed=None):
+        self.host = host
+        self.port = port
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.requests = 0
+        self._random = random.Random(seed)
+        self._httpd = None
+
+    @property
+    def base_url(self):
+        return f"http://{self.host}:{self.port}"
+
+    def delay(self):
+        latency = self.latency_ms + self._random.uniform(-self.jitter_ms, self.jitter_ms)
+        if latency > 0:
+            time.sleep(latency / 1000)
+
+    def start(self):
+        httpd = ThreadingHTTPServer((self.host, self.port), _FixtureHandler)
+        httpd.daemon_threads = True
+        httpd.fixture = self
+        self.port = httpd.server_address[1]
+        self._httpd = httpd
+        threading.Thread(target=httpd.serve_forever, name="fixture-server", daemon=True).start()
+        return self
+
+    def stop(self):
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+
+    def urls(self, count, mix=None, seed=0):
+        """(url, kind, expected_status) for count pages drawn from the mix"""
+        mix = mix or DEFAULT_MIX
+        rng = random.Random(seed)
+        kinds = rng.choices(list(mix), weights=list(mix.values()), k=count)
+        return [(f"{self.base_url}/{kind}/{i}", kind, PAGE_KINDS[kind]) for i, kind in enumerate(kinds)]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve fake Yardi pages for benchmarking")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=0)
+    parser.add_argument("--jitter-ms", type=float, default=0)
+    args = parser.parse_args()
+
+    fixture = FixtureServer(args.host, args.port, args.latency_ms, args.jitter_ms).start()
+    print(f"Fixture server on {fixture.base_url} - page kinds: {', '.join(PAGE_KINDS)}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        fixture.stop()
@@ -0,0 +1,189 @@
+"""End-to-end worker throughput benchmark against the local fixture server.
+
+Each configuration starts a fixture server with its own latency profile, creates a
+throwaway workspace (database, upload, session files), and runs a real
+HybridBackgroundWorker over the generated URLs. It then reports URLs/min, per-URL
+p50/p95 latency and detection accuracy.
+
+    python benchmarks/run_benchmark.py --urls 100 --config typical --headless
+"""
+import os
+import sys
+import csv
+import json
+import time
+import shutil
+import argparse
+import tempfile
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fixture_server import FixtureServer, DEFAULT_MIX  # noqa: E402
+
+# name -> fixture latency profile and page mix
+CONFIGS = {
+    'instant': {'latency_ms': 0, 'jitter_ms': 0, 'mix': DEFAULT_MIX},
+    'typical': {'latency_ms': 250, 'jitter_ms': 150, 'mix': DEFAULT_MIX},
+    'slow': {'latency_ms': 1200, 'jitter_ms': 600, 'mix': DEFAULT_MIX},
+    'error_heavy': {'latency_ms': 250, 'jitter_ms': 150,
+                    'mix': {'clean': 20, 'report': 5, 'invalid_select': 15, 'alert_denied': 15,
+                            'delayed_modal': 20, 'ui_dialog': 15, 'exception': 10}},
+}
+
+UPLOAD_NAME = "benchmark_urls.csv"
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def write_upload(path, urls):
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['sMenuSet', 'smenuType', 'Caption', 'sLink'])
+        for url, kind, _ in urls:
+            writer.writerow(['BENCH', kind, f"Fixture {kind}", url])
+
+
+def score(expected_by_row, kinds_by_row, results):
+    """Accuracy overall and per page kind, plus FAIL precision/recall"""
+    tp = fp = fn = tn = 0
+    per_kind = {}
+    for row in results:
+        expected = expected_by_row.get(row['row_number'])
+        if expected is None:
+            continue
+        actual = row['status']
+        kind = kinds_by_row[row['row_number']]
+        stats = per_kind.setdefault(kind, {'total': 0, 'correct': 0})
+        stats['total'] += 1
+        stats['correct'] += int(actual == expected)
+
+        if expected == 'FAIL':
+            tp += actual == 'FAIL'
+            fn += actual != 'FAIL'
+        else:
+            fp += actual == 'FAIL'
+            tn += actual != 'FAIL'
+
+    total = tp + fp + fn + tn
+    return {
+        'accuracy': (tp + tn) / total if total else 0.0,
+        'fail_precision': tp / (tp + fp) if tp + fp else 0.0,
+        'fail_recall': tp / (tp + fn) if tp + fn else 0.0,
+        'per_kind': {kind: s['correct'] / s['total'] for kind, s in sorted(per_kind.items())},
+    }
+
+
+def run_config(name, config, url_count, headless, keep_workspace=False, seed=0):
+    fixture = FixtureServer(latency_ms=config['latency_ms'], jitter_ms=config['jitter_ms'], seed=seed).start()
+    urls = fixture.urls(url_count, config['mix'], seed=seed)
+    workspace = tempfile.mkdtemp(prefix=f"bench_{name}_")
+    previous_cwd = os.getcwd()
+
+    try:
+        # The worker uses paths relative to the working directory - give it a private one
+        os.chdir(workspace)
+        os.makedirs("uploads", exist_ok=True)
+        write_upload(os.path.join("uploads", UPLOAD_NAME), urls)
+
+        from background_worker import HybridBackgroundWorker
+
+        worker = HybridBackgroundWorker()
+        worker.HEADLESS_BROWSER = headless
+        db = worker.db_manager
+        user_id = db.create_user(f"bench_{name}", f"bench_{name}@localhost", "benchmark")
+        test_run_id = db.create_test_run(
+            user_id, "fixture", f"benchmark {name}", len(urls), 'sLink', UPLOAD_NAME,
+            metadata_columns={'menu_set': 'sMenuSet', 'menu_type': 'smenuType', 'caption': 'Caption'}
+        )
+
+        # Pretend the user already authenticated in the UI
+        with open(os.path.join("sessions", f"session_data_{test_run_id}.json"), 'w') as f:
+            json.dump({'cookies': [], 'current_url': f"{fixture.base_url}/home"}, f)
+        with open(os.path.join("sessions", f"auth_ready_{test_run_id}.txt"), 'w') as f:
+            f.write("benchmark")
+
+        started = time.perf_counter()
+        worker.process_test_run_fast(db.get_test_run_by_id(test_run_id))
+        wall_seconds = time.perf_counter() - started
+        worker.cleanup_persistent_session()
+        worker.thumbnail_writer.shutdown(wait=True)
+
+        results = db.get_test_results_frame(test_run_id).to_dict('records')
+        latencies = [r['execution_time'] for r in results if r['execution_time'] is not None]
+
+        # Busy time excludes browser startup and session transfer, which happen once per run
+        busy_ms = sum((r['execution_time'] or 0) + (r['queue_wait_ms'] or 0) + (r['db_flush_ms'] or 0)
+                      for r in results)
+
+        report = {
+            'config': name,
+            'urls': len(urls),
+            'results': len(results),
+            'latency_ms': config['latency_ms'],
+            'jitter_ms': config['jitter_ms'],
+            'wall_seconds': round(wall_seconds, 2),
+            'urls_per_min': round(len(results) / busy_ms * 60000, 1) if busy_ms else 0.0,
+            'urls_per_min_wall': round(len(results) / wall_seconds * 60, 1) if wall_seconds else 0.0,
+            'p50_ms': round(percentile(latencies, 50), 1),
+            'p95_ms': round(percentile(latencies, 95), 1),
+        }
+        report.update(score({i: expected for i, (_, _, expected) in enumerate(urls)},
+                            {i: kind for i, (_, kind, _) in enumerate(urls)}, results))
+        db.close()
+        return report
+
+    finally:
+        os.chdir(previous_cwd)
+        fixture.stop()
+        if keep_workspace:
+            print(f"Workspace kept at {workspace}")
+        else:
+            shutil.rmtree(workspace, ignore_errors=True)
+
+
+def print_report(reports):
+    header = f"{'config':<12} {'urls':>5} {'URLs/min':>9} {'wall/min':>9} {'p50 ms':>8} {'p95 ms':>8} " \
+             f"{'accuracy':>9} {'precision':>10} {'recall':>7}"
+    print(header)
+    print("-" * len(header))
+    for r in reports:
+        print(f"{r['config']:<12} {r['results']:>5} {r['urls_per_min']:>9} {r['urls_per_min_wall']:>9} "
+              f"{r['p50_ms']:>8} {r['p95_ms']:>8} {r['accuracy']:>9.1%} {r['fail_precision']:>10.1%} "
+              f"{r['fail_recall']:>7.1%}")
+
+    for r in reports:
+        print(f"\n{r['config']} accuracy by page kind:")
+        for kind, accuracy in r['per_kind'].items():
+            print(f"  {kind:<16} {accuracy:.1%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the background worker against local fixture pages")
+    parser.add_argument("--urls", type=int, default=50, help="URLs per configuration")
+    parser.add_argument("--config", action="append", choices=sorted(CONFIGS),
+                        help="Configuration to run (repeatable, default: all)")
+    parser.add_argument("--headless", action="store_true", help="Run Chrome headless")
+    parser.add_argument("--json", dest="json_path", help="Also write the reports to this JSON file")
+    parser.add_argument("--keep-workspace", action="store_true", help="Keep the per-run database and screenshots")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    reports = [run_config(name, CONFIGS[name], args.urls, args.headless, args.keep_workspace, args.seed)
+               for name in (args.config or list(CONFIGS))]
+    print_report(reports)
+
+    if args.json_path:
+        with open(args.json_path, 'w') as f:
+            json.dump(reports, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+import os
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Tabs one browser loads URLs in at once - 1 keeps the one-page-at-a-time loop
+TABS_PER_BROWSER = max(1, int(os.environ.get("TABS_PER_BROWSER", "1")))
+
+# Interval between checks on a tab whose page hasn't finished loading
+TAB_POLL_SECONDS = float(os.environ.get("TAB_POLL_SECONDS", "0.25"))
+
+# Keep pages in background tabs loading and running their timers at full speed
+BACKGROUND_TAB_ARGUMENTS = [
+    "--disable-background-timer-throttling",
+    "--disable-renderer-backgrounding",
+    "--disable-backgrounding-occluded-windows",
+]
+
+# Starts the navigation after the script returns, so the driver isn't held while the page loads.
+# The marker tells the old document apart from the new one until the navigation commits.
+NAVIGATE_SCRIPT = """
+var url = arguments[0];
+window.__urlTesterStale = true;
+setTimeout(function () { window.location.href = url; }, 0);
+"""
+
+# null until the new document has loaded, then seconds since its load event and any network error
+LOAD_STATE_SCRIPT = """
+if (window.__urlTesterStale || document.readyState !== 'complete') { return null; }
+var nav = performance.getEntriesByType('navigation')[0];
+var code = document.querySelector('.error-code');
+return {
+    since_load: nav && nav.loadEventEnd ? (performance.now() - nav.loadEventEnd) / 1000 : 0,
+    net_error: location.protocol === 'chrome-error:' ? (code ? code.textContent.trim() : 'ERR_FAILED') : null
+};
+"""
+
+
+class TabSlot:
+    """A browser tab and the page load it is working through"""
+
+    def __init__(self, handle):
+        self.handle = handle
+        self.load = None  # (row, url, metadata, attempt, timer) while a page is in this tab
+        self.stage = None  # navigate, loading, settling or checking
+        self.due = 0.0
+        self.started = 0.0  # When the current stage began
+        self.checks = 0  # Fail-criteria checks done on the loaded page
+        self.response = None  # Main-document response once the page has loaded
+
+    @property
+    def busy(self):
+        return self.load is not None
+
+    def start(self, load, now):
+        self.load = load
+        self.stage, self.due, self.started, self.checks = 'navigate', now, now, 0
+        self.response = None
+
+    def advance(self, stage, due, now):
+        self.stage, self.due, self.started = stage, due, now
+
+    def clear(self):
+        self.load, self.stage = None, None
+
+
+class BrowserTabs:
+    """The tabs of one browser that page loads are spread over.
+
+    Opened once per browser and reused by every run that shares it; cookies and the
+    SSO session are the browser's, so every tab is logged in.
+    """
+
+    def __init__(self, driver, count=TABS_PER_BROWSER):
+        self.driver = driver
+        self.main_handle = driver.current_window_handle
+        self._current = self.main_handle
+        self.slots = [TabSlot(self.main_handle)]
+
+        for _ in range(count - 1):
+            try:
+                driver.switch_to.new_window('tab')
+            except Exception as e:
+                logger.warning(f"⚠️ Could only open {len(self.slots)} of {count} tabs: {e}")
+                break
+            self._current = driver.current_window_handle
+            self.slots.append(TabSlot(self._current))
+
+        self.switch(self.main_handle)
+        logger.info(f"🗂️ Loading URLs in {len(self.slots)} tabs of one browser")
+
+    def switch(self, handle):
+        if handle != self._current:
+            self.driver.switch_to.window(handle)
+            self._current = handle
+
+    def idle_slots(self):
+        return [slot for slot in self.slots if not slot.busy]
+
+    def busy_slots(self):
+        return [slot for slot in self.slots if slot.busy]
+
+    def abandon(self):
+        """Stop whatever is still loading and hand the browser back on its first tab"""
+        for slot in self.busy_slots():
+            try:
+                self.switch(slot.handle)
+                self.driver.execute_script("window.stop();")
+            except Exception:
+                pass
+            slot.clear()
+        try:
+            self.switch(self.main_handle)
+        except Exception:
+            pass
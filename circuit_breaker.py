@@ -0,0 +1,71 @@
+import os
+import re
+
+# Consecutive results with the same FAIL signature before the run stops dispatching URLs
+FAIL_STREAK_THRESHOLD = int(os.environ.get("CIRCUIT_BREAKER_FAILS", "25"))
+
+# Consecutive navigation errors (timeouts, refused connections, crashed tabs) before it stops
+ERROR_STREAK_THRESHOLD = int(os.environ.get("CIRCUIT_BREAKER_ERRORS", "5"))
+
+# Canary loads tried before a tripped run is parked, and the wait before the first one (doubles each time)
+CANARY_ATTEMPTS = int(os.environ.get("CIRCUIT_BREAKER_CANARY_ATTEMPTS", "3"))
+CANARY_WAIT_SECONDS = float(os.environ.get("CIRCUIT_BREAKER_CANARY_WAIT", "15"))
+
+NAVIGATION_ERROR = 'navigation_error'
+
+
+def failure_signature(status, error_message):
+    """What a failed result looks like with row-specific details removed - None for a PASS"""
+    if status != 'FAIL':
+        return None
+    message = (error_message or '').strip().lower()
+    if message.startswith('navigation error'):
+        return NAVIGATION_ERROR
+    return re.sub(r"\d+", "#", message)[:80] or 'fail'
+
+
+class CircuitBreaker:
+    """Watches a run's results for a streak of identical failures that points at a dead target.
+
+    A tenant that is down or has revoked access fails every URL the same way, so a long
+    enough streak of one signature trips the breaker. A canary URL then decides whether
+    the streak was real (reset and carry on) or systemic (park the run).
+    """
+
+    def __init__(self, fail_threshold=FAIL_STREAK_THRESHOLD, error_threshold=ERROR_STREAK_THRESHOLD):
+        self.fail_threshold = fail_threshold
+        self.error_threshold = error_threshold
+        self.signature = None
+        self.streak = 0
+        self.streak_start = None  # Row where the current streak began
+        self.last_pass_url = None
+        self.trips = 0
+
+    @property
+    def threshold(self):
+        return self.error_threshold if self.signature == NAVIGATION_ERROR else self.fail_threshold
+
+    def record(self, row_number, url, status, error_message):
+        """Add one result; returns True if the breaker has tripped"""
+        signature = failure_signature(status, error_message)
+        if signature is None:
+            self.signature, self.streak, self.streak_start = None, 0, None
+            if status == 'PASS':
+                self.last_pass_url = url
+            return False
+
+        if signature != self.signature:
+            self.signature, self.streak, self.streak_start = signature, 0, row_number
+        self.streak += 1
+        return self.threshold > 0 and self.streak >= self.threshold
+
+    def reset_after_canary(self):
+        """The canary passed, so the streak was genuine - double the thresholds so it isn't probed every row"""
+        self.trips += 1
+        self.fail_threshold *= 2
+        self.error_threshold *= 2
+        self.signature, self.streak, self.streak_start = None, 0, None
+
+    def describe(self):
+        kind = "navigation errors" if self.signature == NAVIGATION_ERROR else f"failures ('{self.signature}')"
+        return f"{self.streak} consecutive {kind} from row {(self.streak_start or 0) + 1}"
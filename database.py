@@ -1,18 +1,65 @@
 import sqlite3
 import hashlib
 import json
-from datetime import datetime
-from sqlalchemy import create_engine, Column, Integer, String, DateTime, Float, Text, Boolean, text
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine, Column, Integer, String, DateTime, Float, Text, Boolean, Index, text, func, case
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 import os
 import logging
+import pandas as pd
+from job_signals import notify_worker
 
 # Get logger
 logger = logging.getLogger(__name__)
 
 Base = declarative_base()
 
+# Columns added after the first release - applied to existing databases on startup
+TEST_RUN_MIGRATIONS = [
+    ("config_filename", "ALTER TABLE test_runs ADD COLUMN config_filename VARCHAR(255)"),
+    ("detection_preset", "ALTER TABLE test_runs ADD COLUMN detection_preset VARCHAR(50)"),
+    ("avg_confidence", "ALTER TABLE test_runs ADD COLUMN avg_confidence FLOAT"),
+    ("avg_execution_time", "ALTER TABLE test_runs ADD COLUMN avg_execution_time FLOAT"),
+    ("parsed_filename", "ALTER TABLE test_runs ADD COLUMN parsed_filename VARCHAR(255)"),
+    ("metadata_columns", "ALTER TABLE test_runs ADD COLUMN metadata_columns TEXT"),
+    ("run_version", "ALTER TABLE test_runs ADD COLUMN run_version INTEGER DEFAULT 0"),
+    ("phase_timings", "ALTER TABLE test_runs ADD COLUMN phase_timings TEXT"),
+    ("capture_snapshots", "ALTER TABLE test_runs ADD COLUMN capture_snapshots BOOLEAN DEFAULT 0"),
+    ("resume_from_row", "ALTER TABLE test_runs ADD COLUMN resume_from_row INTEGER"),
+    ("status_reason", "ALTER TABLE test_runs ADD COLUMN status_reason TEXT"),
+    ("priority", "ALTER TABLE test_runs ADD COLUMN priority VARCHAR(10) DEFAULT 'normal'"),
+    ("shard_count", "ALTER TABLE test_runs ADD COLUMN shard_count INTEGER DEFAULT 1"),
+]
+
+TEST_RESULT_MIGRATIONS = [
+    ("confidence", "ALTER TABLE test_results ADD COLUMN confidence FLOAT"),
+    ("execution_time", "ALTER TABLE test_results ADD COLUMN execution_time FLOAT"),
+    ("detection_method", "ALTER TABLE test_results ADD COLUMN detection_method VARCHAR(100)"),
+    ("evidence", "ALTER TABLE test_results ADD COLUMN evidence TEXT"),
+    ("methods_used", "ALTER TABLE test_results ADD COLUMN methods_used VARCHAR(500)"),
+    ("menu_set", "ALTER TABLE test_results ADD COLUMN menu_set VARCHAR(200)"),
+    ("menu_type", "ALTER TABLE test_results ADD COLUMN menu_type VARCHAR(200)"),
+    ("caption", "ALTER TABLE test_results ADD COLUMN caption TEXT"),
+    ("queue_wait_ms", "ALTER TABLE test_results ADD COLUMN queue_wait_ms FLOAT"),
+    ("navigation_ms", "ALTER TABLE test_results ADD COLUMN navigation_ms FLOAT"),
+    ("readiness_ms", "ALTER TABLE test_results ADD COLUMN readiness_ms FLOAT"),
+    ("detection_ms", "ALTER TABLE test_results ADD COLUMN detection_ms FLOAT"),
+    ("snapshot_ms", "ALTER TABLE test_results ADD COLUMN snapshot_ms FLOAT"),
+    ("screenshot_ms", "ALTER TABLE test_results ADD COLUMN screenshot_ms FLOAT"),
+    ("db_flush_ms", "ALTER TABLE test_results ADD COLUMN db_flush_ms FLOAT"),
+    ("attempts", "ALTER TABLE test_results ADD COLUMN attempts INTEGER DEFAULT 1"),
+    ("http_status", "ALTER TABLE test_results ADD COLUMN http_status INTEGER"),
+    ("redirect_chain", "ALTER TABLE test_results ADD COLUMN redirect_chain TEXT"),
+    ("response_ms", "ALTER TABLE test_results ADD COLUMN response_ms FLOAT"),
+]
+
+# Indexes are created with IF NOT EXISTS, so these are safe to run on every startup
+INDEX_MIGRATIONS = [
+    "CREATE INDEX IF NOT EXISTS ix_test_results_run_row ON test_results (test_run_id, row_number)",
+    "CREATE INDEX IF NOT EXISTS ix_test_results_run_menu_type ON test_results (test_run_id, menu_type)",
+]
+
 
 class User(Base):
     __tablename__ = 'users'
@@ -31,7 +78,7 @@ class TestRun(Base):
     user_id = Column(Integer, nullable=False)
     database_name = Column(String(100), nullable=False)
     test_name = Column(String(200), nullable=False)
-    status = Column(String(20), default='pending')  # pending, running, completed, failed, waiting_login
+    status = Column(String(20), default='pending')  # pending, running, completed, failed, waiting_login, parked
     progress = Column(Float, default=0.0)
     total_urls = Column(Integer, default=0)
     passed = Column(Integer, default=0)
@@ -46,6 +93,15 @@ class TestRun(Base):
     detection_preset = Column(String(50))  # NEW: Store which preset was used (lightning, balanced, etc.)
     avg_confidence = Column(Float)  # NEW: Average confidence score across all results
     avg_execution_time = Column(Float)  # NEW: Average execution time per URL
+    parsed_filename = Column(String(255))  # Columnar (Arrow) copy of the upload, shared by content hash
+    metadata_columns = Column(Text)  # JSON: result field -> upload column, resolved when the run is created
+    run_version = Column(Integer, default=0)  # Bumped on every write - UI caches are keyed on it
+    phase_timings = Column(Text)  # JSON: per-phase avg/p50/p95 (ms) aggregated when the run completes
+    capture_snapshots = Column(Boolean, default=False)  # Store each page's source and text (page_snapshots)
+    resume_from_row = Column(Integer)  # Set when the session expired mid-run - testing continues from this row
+    status_reason = Column(Text)  # Why a run was parked by the circuit breaker
+    priority = Column(String(10), default='normal')  # low, normal, high - share of its user's worker time
+    shard_count = Column(Integer, default=1)  # Row-range shards (test_shards) worker processes claim independently
 
 
 class TestResult(Base):
@@ -68,11 +124,157 @@ class TestResult(Base):
     evidence = Column(Text)  # JSON string with detailed evidence from all methods
     methods_used = Column(String(500))  # Comma-separated list of methods used
 
+    # Row metadata copied from the upload at ingest, so views never re-open the file
+    menu_set = Column(String(200))
+    menu_type = Column(String(200))
+    caption = Column(Text)
+    attempts = Column(Integer, default=1)  # Page loads it took - more than 1 after transient navigation errors
+
+    # Main-document response from the browser's performance log
+    http_status = Column(Integer)
+    redirect_chain = Column(Text)  # JSON [[url, status], ...] of the redirects before the final response
+    response_ms = Column(Float)  # From the request to the final response's headers
+
+    # Where this URL's time went, in milliseconds (see phase_timing.PHASES)
+    queue_wait_ms = Column(Float)
+    navigation_ms = Column(Float)
+    readiness_ms = Column(Float)
+    detection_ms = Column(Float)
+    snapshot_ms = Column(Float)
+    screenshot_ms = Column(Float)
+    db_flush_ms = Column(Float)
+
+    __table_args__ = (
+        Index('ix_test_results_run_row', 'test_run_id', 'row_number'),
+        Index('ix_test_results_run_menu_type', 'test_run_id', 'menu_type'),
+    )
+
+
+class TestShard(Base):
+    """A row range of a sharded run - claimed and tested by one worker process at a time"""
+    __tablename__ = 'test_shards'
+
+    id = Column(Integer, primary_key=True)
+    test_run_id = Column(Integer, nullable=False)
+    shard_index = Column(Integer, nullable=False)
+    start_row = Column(Integer, nullable=False)
+    end_row = Column(Integer)  # Exclusive; None for the last shard
+    status = Column(String(20), default='pending')  # pending, claimed, completed
+    worker_id = Column(String(100))  # host:pid of the claiming worker
+    claimed_at = Column(DateTime)
+    heartbeat_at = Column(DateTime)  # A claim whose heartbeat is older than the lease can be taken over
+    next_row = Column(Integer)  # Every row before this has a stored result - where a released or taken-over shard continues
+    processed = Column(Integer, default=0)
+    passed = Column(Integer, default=0)
+    failed = Column(Integer, default=0)
+    skipped = Column(Integer, default=0)
+    completed_at = Column(DateTime)
+
+    __table_args__ = (
+        Index('ix_test_shards_run_status', 'test_run_id', 'status'),
+    )
+
+
+class ResultVerdict(Base):
+    """A re-scored verdict for one result - each re-score of a run writes a new version"""
+    __tablename__ = 'result_verdicts'
+
+    id = Column(Integer, primary_key=True)
+    test_run_id = Column(Integer, nullable=False)
+    row_number = Column(Integer, nullable=False)
+    result_id = Column(Integer)
+    version = Column(Integer, nullable=False)
+    rules_version = Column(String(20))  # page_detection.rules_version() at scoring time
+    status = Column(String(20), nullable=False)
+    reason = Column(Text)
+    criteria = Column(String(100))
+    previous_status = Column(String(20))
+    changed = Column(Boolean, default=False)
+    scored_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index('ix_result_verdicts_run_version', 'test_run_id', 'version'),
+    )
+
+
+class PageSnapshotEntry(Base):
+    """Where one page snapshot lives inside a run's compressed segment files"""
+    __tablename__ = 'page_snapshots'
+
+    id = Column(Integer, primary_key=True)
+    test_run_id = Column(Integer, nullable=False)
+    row_number = Column(Integer, nullable=False)
+    url = Column(Text)
+    segment = Column(String(50), nullable=False)  # File name under snapshots/test_<run id>/
+    offset = Column(Integer, nullable=False)
+    length = Column(Integer, nullable=False)  # Compressed bytes
+    raw_size = Column(Integer)
+    codec = Column(String(10), nullable=False)  # zstd or gzip
+    captured_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index('ix_page_snapshots_run_row', 'test_run_id', 'row_number'),
+    )
+
+
+class RunProgress(Base):
+    """Live counters of a run - one small row the UI polls instead of reloading test_runs"""
+    __tablename__ = 'run_progress'
+
+    test_run_id = Column(Integer, primary_key=True)
+    status = Column(String(20))
+    progress = Column(Float, default=0.0)
+    processed = Column(Integer, default=0)
+    passed = Column(Integer, default=0)
+    failed = Column(Integer, default=0)
+    skipped = Column(Integer, default=0)
+    updated_at = Column(DateTime, index=True)  # Pollers fetch the rows written since their last look
+
+
+# Columns loaded into the results frame used by the results pages and exports
+RESULT_FRAME_COLUMNS = [
+    'id', 'row_number', 'url', 'status', 'screenshot_filename', 'page_title', 'error_message',
+    'processed_date', 'confidence', 'execution_time', 'detection_method', 'menu_set', 'menu_type', 'caption',
+    'attempts', 'http_status', 'response_ms',
+    'queue_wait_ms', 'navigation_ms', 'readiness_ms', 'detection_ms', 'snapshot_ms', 'screenshot_ms', 'db_flush_ms'
+]
+
+# Everything a results export carries - full text, no display truncation
+RESULT_EXPORT_COLUMNS = [
+    'row_number', 'url', 'status', 'menu_set', 'menu_type', 'caption', 'screenshot_filename', 'error_message',
+    'page_title', 'confidence', 'execution_time', 'detection_method', 'methods_used', 'attempts', 'http_status',
+    'redirect_chain', 'response_ms', 'processed_date'
+]
+
+
+def _sql_time(value):
+    """A datetime formatted the way SQLAlchemy stores it in SQLite, for raw SQL comparisons"""
+    return value.strftime('%Y-%m-%d %H:%M:%S.%f')
+
+
+def _sync_progress(executor, test_run_id, processed=None, passed=None, failed=None, skipped=None):
+    """Copy a run's status and progress into run_progress, with any counters given.
+
+    Runs on the caller's connection or session, so it commits with the write it reflects.
+    Counters left as None keep their last value.
+    """
+    executor.execute(text(
+        "INSERT INTO run_progress (test_run_id, status, progress, processed, passed, failed, skipped, updated_at) "
+        "SELECT id, status, COALESCE(progress, 0), COALESCE(:processed, 0), COALESCE(:passed, 0), "
+        "COALESCE(:failed, 0), COALESCE(:skipped, 0), :now FROM test_runs WHERE id = :run "
+        "ON CONFLICT(test_run_id) DO UPDATE SET status = excluded.status, progress = excluded.progress, "
+        "processed = COALESCE(:processed, run_progress.processed), passed = COALESCE(:passed, run_progress.passed), "
+        "failed = COALESCE(:failed, run_progress.failed), skipped = COALESCE(:skipped, run_progress.skipped), "
+        "updated_at = excluded.updated_at"
+    ), {'run': test_run_id, 'processed': processed, 'passed': passed, 'failed': failed, 'skipped': skipped,
+        'now': _sql_time(datetime.utcnow())})
+
 
 class DatabaseManager:
     def __init__(self, db_path="yardi_tester.db"):
         self.db_path = db_path
-        self.engine = create_engine(f'sqlite:///{db_path}', echo=False)
+        # Sharded runs have several worker processes writing - wait for the lock instead of failing
+        self.engine = create_engine(f'sqlite:///{db_path}', echo=False, connect_args={'timeout': 30})
 
         # Create tables first
         Base.metadata.create_all(self.engine)
@@ -86,24 +288,36 @@ class DatabaseManager:
     def check_and_migrate_database(self):
         """Check and migrate database schema if needed"""
         try:
-            from sqlalchemy import text
+            missing = self._find_missing_columns()
 
-            # Fix: Use text() for raw SQL
-            self.session.execute(text("SELECT config_filename FROM test_runs LIMIT 1")).fetchone()
+            if not missing:
+                logger.info("✅ Database schema is up to date")
+                return
 
-            logger.info("✅ Database schema is up to date")
+            logger.warning(f"⚠️ Database schema needs update - missing columns: {', '.join(missing)}")
+            self._migrate_database_schema()
         except Exception as e:
-            logger.warning(f"⚠️ Database schema needs update: {e}")
-
-            # Add the missing column
-            try:
-                logger.info("🔧 Adding config_filename column...")
-                self.session.execute(text("ALTER TABLE test_runs ADD COLUMN config_filename VARCHAR(255)"))
-                self.session.commit()
-                logger.info("✅ Database schema updated successfully")
-            except Exception as migrate_error:
-                logger.error(f"💥 Failed to update schema: {migrate_error}")
-                self.session.rollback()
+            logger.error(f"💥 Failed to check database schema: {e}")
+        finally:
+            self._ensure_indexes()
+
+    def _ensure_indexes(self):
+        """Create indexes that older databases are missing"""
+        try:
+            with self.engine.begin() as conn:
+                for sql in INDEX_MIGRATIONS:
+                    conn.execute(text(sql))
+        except Exception as e:
+            logger.warning(f"⚠️ Failed to create indexes: {e}")
+
+    def _find_missing_columns(self):
+        """Return table.column names from the migration lists that don't exist yet"""
+        missing = []
+        with self.engine.connect() as conn:
+            for table, migrations in (('test_runs', TEST_RUN_MIGRATIONS), ('test_results', TEST_RESULT_MIGRATIONS)):
+                existing = {row[1] for row in conn.execute(text(f"PRAGMA table_info({table})"))}
+                missing.extend(f"{table}.{column}" for column, _ in migrations if column not in existing)
+        return missing
 
     def _migrate_database_schema(self):
         """Apply database schema migrations"""
@@ -114,25 +328,8 @@ class DatabaseManager:
             raw_conn = self.engine.raw_connection()
             cursor = raw_conn.cursor()
 
-            # Migrations for test_runs table
-            test_run_migrations = [
-                ("config_filename", "ALTER TABLE test_runs ADD COLUMN config_filename VARCHAR(255)"),
-                ("detection_preset", "ALTER TABLE test_runs ADD COLUMN detection_preset VARCHAR(50)"),
-                ("avg_confidence", "ALTER TABLE test_runs ADD COLUMN avg_confidence FLOAT"),
-                ("avg_execution_time", "ALTER TABLE test_runs ADD COLUMN avg_execution_time FLOAT")
-            ]
-
-            # Migrations for test_results table
-            test_result_migrations = [
-                ("confidence", "ALTER TABLE test_results ADD COLUMN confidence FLOAT"),
-                ("execution_time", "ALTER TABLE test_results ADD COLUMN execution_time FLOAT"),
-                ("detection_method", "ALTER TABLE test_results ADD COLUMN detection_method VARCHAR(100)"),
-                ("evidence", "ALTER TABLE test_results ADD COLUMN evidence TEXT"),
-                ("methods_used", "ALTER TABLE test_results ADD COLUMN methods_used VARCHAR(500)")
-            ]
-
             # Apply test_runs migrations
-            for column_name, sql in test_run_migrations:
+            for column_name, sql in TEST_RUN_MIGRATIONS:
                 try:
                     cursor.execute(sql)
                     logger.info(f"✅ Added test_runs.{column_name}")
@@ -143,7 +340,7 @@ class DatabaseManager:
                         logger.warning(f"⚠️ Failed to add test_runs.{column_name}: {e}")
 
             # Apply test_results migrations
-            for column_name, sql in test_result_migrations:
+            for column_name, sql in TEST_RESULT_MIGRATIONS:
                 try:
                     cursor.execute(sql)
                     logger.info(f"✅ Added test_results.{column_name}")
@@ -197,8 +394,12 @@ class DatabaseManager:
         """Get user by username"""
         return self.session.query(User).filter_by(username=username).first()
 
+    def get_user_by_id(self, user_id):
+        return self.session.query(User).filter_by(id=user_id).first()
+
     def create_test_run(self, user_id, database_name, test_name, total_urls, url_column, uploaded_filename,
-                        config_filename=None, detection_preset=None):
+                        config_filename=None, detection_preset=None, parsed_filename=None, metadata_columns=None,
+                        capture_snapshots=False, priority='normal', shard_count=1):
         """Create a new test run with hybrid detection support"""
         test_run = TestRun(
             user_id=user_id,
@@ -208,10 +409,20 @@ class DatabaseManager:
             url_column=url_column,
             uploaded_filename=uploaded_filename,
             config_filename=config_filename,
-            detection_preset=detection_preset
+            detection_preset=detection_preset,
+            parsed_filename=parsed_filename,
+            metadata_columns=json.dumps(metadata_columns) if metadata_columns else None,
+            capture_snapshots=capture_snapshots,
+            priority=priority,
+            shard_count=max(shard_count, 1)
         )
         self.session.add(test_run)
         self.session.commit()
+        if test_run.shard_count > 1:
+            self.create_shards(test_run.id, test_run.shard_count, total_urls)
+
+        # Wake the background worker instead of waiting for its next poll
+        notify_worker(f"job_created {test_run.id}")
         return test_run.id
 
     def update_test_run_status(self, test_run_id, status, progress=None):
@@ -223,8 +434,226 @@ class DatabaseManager:
                 test_run.progress = progress
             if status == 'completed':
                 test_run.completed_date = datetime.utcnow()
+                test_run.resume_from_row = None
+                test_run.status_reason = None
+            test_run.run_version = (test_run.run_version or 0) + 1
+            self.session.flush()
+            _sync_progress(self.session, test_run_id)
             self.session.commit()
 
+            # Jobs reset to pending need the worker to move them back to waiting_login
+            if status == 'pending':
+                notify_worker(f"job_reset {test_run_id}")
+
+    def pause_for_login(self, test_run_id, resume_from_row, progress=None):
+        """Session expired mid-run: wait for a new login, then continue from resume_from_row"""
+        test_run = self.session.query(TestRun).filter_by(id=test_run_id).first()
+        if test_run:
+            test_run.status = 'waiting_login'
+            test_run.resume_from_row = resume_from_row
+            if progress is not None:
+                test_run.progress = progress
+            test_run.run_version = (test_run.run_version or 0) + 1
+            self.session.flush()
+            _sync_progress(self.session, test_run_id)
+            self.session.commit()
+
+    def delete_results_from_row(self, test_run_id, row_number):
+        """Drop a run's results from row_number on, so a resumed run tests those rows again"""
+        self.session.query(TestResult).filter(
+            TestResult.test_run_id == test_run_id, TestResult.row_number >= row_number
+        ).delete(synchronize_session=False)
+        self.session.commit()
+
+    def park_run(self, test_run_id, resume_from_row, reason, progress=None):
+        """Circuit breaker tripped: drop the streak's results and hold the run until it is resumed.
+
+        Sharded runs pass resume_from_row=None - each shard keeps its own place (release_shard).
+        """
+        if resume_from_row is not None:
+            self.delete_results_from_row(test_run_id, resume_from_row)
+        test_run = self.session.query(TestRun).filter_by(id=test_run_id).first()
+        if test_run:
+            test_run.status = 'parked'
+            test_run.status_reason = reason
+            if resume_from_row is not None:
+                test_run.resume_from_row = resume_from_row
+            if progress is not None:
+                test_run.progress = progress
+            test_run.run_version = (test_run.run_version or 0) + 1
+            self.session.flush()
+            _sync_progress(self.session, test_run_id)
+            self.session.commit()
+
+    def resume_parked_run(self, test_run_id):
+        """Queue a parked run again - it continues from resume_from_row"""
+        test_run = self.session.query(TestRun).filter_by(id=test_run_id).first()
+        if test_run and test_run.status == 'parked':
+            test_run.status_reason = None
+            self.session.commit()
+            self.update_test_run_status(test_run_id, 'pending')
+
+    def get_result_counts(self, test_run_id, start_row=None, end_row=None):
+        """{status: count} of the results already stored for a run, or for a row range of it"""
+        query = self.session.query(TestResult.status, func.count(TestResult.id)).filter(
+            TestResult.test_run_id == test_run_id
+        )
+        if start_row is not None:
+            query = query.filter(TestResult.row_number >= start_row)
+        if end_row is not None:
+            query = query.filter(TestResult.row_number < end_row)
+        return {status: count for status, count in query.group_by(TestResult.status).all()}
+
+    def create_shards(self, test_run_id, shard_count, total_urls):
+        """Split a run into contiguous row ranges - the last one is open-ended so no row is missed"""
+        size = max(-(-total_urls // shard_count), 1)
+        for index in range(shard_count):
+            self.session.add(TestShard(test_run_id=test_run_id, shard_index=index, start_row=index * size,
+                                       end_row=None if index == shard_count - 1 else (index + 1) * size))
+        self.session.commit()
+
+    def get_shards(self, test_run_id):
+        return self.session.query(TestShard).filter_by(test_run_id=test_run_id).order_by(TestShard.shard_index).all()
+
+    def get_claimable_run_ids(self, lease_seconds):
+        """Running sharded runs with a shard that is unclaimed or whose claim has gone stale"""
+        cutoff = _sql_time(datetime.utcnow() - timedelta(seconds=lease_seconds))
+        with self.engine.connect() as conn:
+            rows = conn.execute(text(
+                "SELECT DISTINCT s.test_run_id FROM test_shards s JOIN test_runs r ON r.id = s.test_run_id "
+                "WHERE r.status = 'running' AND (s.status = 'pending' OR "
+                "(s.status = 'claimed' AND s.heartbeat_at < :cutoff)) ORDER BY r.created_date"
+            ), {'cutoff': cutoff}).fetchall()
+        return [row[0] for row in rows]
+
+    def claim_shard(self, test_run_id, worker_id, lease_seconds):
+        """Atomically claim the next free (or abandoned) shard of a running run; returns it or None.
+
+        The conditional UPDATE only succeeds for one worker. Taking over a stale claim drops
+        the results its previous owner wrote past the shard's last recorded next_row.
+        """
+        now = datetime.utcnow()
+        cutoff = _sql_time(now - timedelta(seconds=lease_seconds))
+        now = _sql_time(now)
+        free = "(status = 'pending' OR (status = 'claimed' AND heartbeat_at < :cutoff))"
+        for _ in range(5):
+            with self.engine.begin() as conn:
+                candidate = conn.execute(text(
+                    f"SELECT id, status, start_row, end_row, next_row FROM test_shards "
+                    f"WHERE test_run_id = :run AND {free} ORDER BY shard_index LIMIT 1"
+                ), {'run': test_run_id, 'cutoff': cutoff}).fetchone()
+                if candidate is None:
+                    return None
+
+                claimed = conn.execute(text(
+                    f"UPDATE test_shards SET status = 'claimed', worker_id = :worker, claimed_at = :now, "
+                    f"heartbeat_at = :now WHERE id = :id AND {free}"
+                ), {'worker': worker_id, 'now': now, 'id': candidate.id, 'cutoff': cutoff}).rowcount
+                if not claimed:
+                    continue  # Another worker got it first
+
+                if candidate.status == 'claimed':
+                    resume_row = candidate.next_row if candidate.next_row is not None else candidate.start_row
+                    self._delete_result_range(conn, test_run_id, resume_row, candidate.end_row)
+                    logger.warning(f"⚠️ Took over stale shard {candidate.id} of test {test_run_id} "
+                                   f"from row {resume_row + 1}")
+
+            self.session.expire_all()
+            return self.session.query(TestShard).filter_by(id=candidate.id).first()
+        return None
+
+    @staticmethod
+    def _delete_result_range(conn, test_run_id, start_row, end_row=None):
+        params = {'run': test_run_id, 'start': start_row}
+        condition = "test_run_id = :run AND row_number >= :start"
+        if end_row is not None:
+            condition += " AND row_number < :end"
+            params['end'] = end_row
+        conn.execute(text(f"DELETE FROM test_results WHERE {condition}"), params)
+
+    def update_shard_progress(self, shard_id, worker_id, next_row, processed, passed, failed, skipped):
+        """Heartbeat plus counters for a claimed shard, merged into the parent run's progress.
+
+        Returns the parent run's status if this worker still owns the shard, else None.
+        """
+        with self.engine.begin() as conn:
+            owned = conn.execute(text(
+                "UPDATE test_shards SET heartbeat_at = :now, next_row = :next_row, processed = :processed, "
+                "passed = :passed, failed = :failed, skipped = :skipped "
+                "WHERE id = :id AND worker_id = :worker AND status = 'claimed'"
+            ), {'now': _sql_time(datetime.utcnow()), 'next_row': next_row, 'processed': processed, 'passed': passed,
+                'failed': failed, 'skipped': skipped, 'id': shard_id, 'worker': worker_id}).rowcount
+            if not owned:
+                return None
+
+            test_run_id = conn.execute(text("SELECT test_run_id FROM test_shards WHERE id = :id"),
+                                       {'id': shard_id}).scalar()
+            conn.execute(text(
+                "UPDATE test_runs SET progress = MIN(100.0, 100.0 * (SELECT COALESCE(SUM(processed), 0) "
+                "FROM test_shards WHERE test_run_id = :run) / MAX(COALESCE(total_urls, 0), 1)), "
+                "run_version = COALESCE(run_version, 0) + 1 WHERE id = :run AND status = 'running'"
+            ), {'run': test_run_id})
+            totals = conn.execute(text("SELECT SUM(processed), SUM(passed), SUM(failed), SUM(skipped) "
+                                       "FROM test_shards WHERE test_run_id = :run"), {'run': test_run_id}).fetchone()
+            _sync_progress(conn, test_run_id, *(value or 0 for value in totals))
+            return conn.execute(text("SELECT status FROM test_runs WHERE id = :run"), {'run': test_run_id}).scalar()
+
+    def release_shard(self, shard_id, worker_id, resume_row):
+        """Give a claimed shard back - results from resume_row on are dropped and tested again later"""
+        with self.engine.begin() as conn:
+            shard = conn.execute(text("SELECT test_run_id, end_row FROM test_shards WHERE id = :id AND "
+                                      "worker_id = :worker AND status = 'claimed'"),
+                                 {'id': shard_id, 'worker': worker_id}).fetchone()
+            if shard is None:
+                return False
+            self._delete_result_range(conn, shard.test_run_id, resume_row, shard.end_row)
+            conn.execute(text("UPDATE test_shards SET status = 'pending', worker_id = NULL, next_row = :row "
+                              "WHERE id = :id"), {'row': resume_row, 'id': shard_id})
+        return True
+
+    def complete_shard(self, shard_id, worker_id, passed, failed, skipped, processed):
+        """Mark a shard done; the worker that completes the last shard also completes the run.
+
+        Returns True for that worker only - the run is finished exactly once.
+        """
+        with self.engine.begin() as conn:
+            now = _sql_time(datetime.utcnow())
+            owned = conn.execute(text(
+                "UPDATE test_shards SET status = 'completed', completed_at = :now, heartbeat_at = :now, "
+                "next_row = NULL, processed = :processed, passed = :passed, failed = :failed, skipped = :skipped "
+                "WHERE id = :id AND worker_id = :worker AND status = 'claimed'"
+            ), {'now': now, 'processed': processed, 'passed': passed, 'failed': failed, 'skipped': skipped,
+                'id': shard_id, 'worker': worker_id}).rowcount
+            if not owned:
+                return False
+
+            test_run_id = conn.execute(text("SELECT test_run_id FROM test_shards WHERE id = :id"),
+                                       {'id': shard_id}).scalar()
+            remaining = conn.execute(text("SELECT COUNT(*) FROM test_shards WHERE test_run_id = :run "
+                                          "AND status != 'completed'"), {'run': test_run_id}).scalar()
+            if remaining:
+                return False
+
+            totals = conn.execute(text("SELECT SUM(passed), SUM(failed), SUM(skipped) FROM test_shards "
+                                       "WHERE test_run_id = :run"), {'run': test_run_id}).fetchone()
+            run_passed, run_failed, run_skipped = (value or 0 for value in totals)
+            tested = run_passed + run_failed
+            finished = conn.execute(text(
+                "UPDATE test_runs SET status = 'completed', progress = 100.0, passed = :passed, failed = :failed, "
+                "skipped = :skipped, success_rate = :rate, completed_date = :now, resume_from_row = NULL, "
+                "status_reason = NULL, run_version = COALESCE(run_version, 0) + 1 "
+                "WHERE id = :run AND status != 'completed'"
+            ), {'passed': run_passed, 'failed': run_failed, 'skipped': run_skipped,
+                'rate': run_passed / tested * 100 if tested else 0, 'now': now, 'run': test_run_id}).rowcount
+            _sync_progress(conn, test_run_id, run_passed + run_failed + run_skipped, run_passed, run_failed,
+                           run_skipped)
+        self.session.expire_all()
+        return bool(finished)
+
+    def delete_shards(self, test_run_id):
+        self.session.query(TestShard).filter_by(test_run_id=test_run_id).delete()
+        self.session.commit()
+
     def update_test_run_results(self, test_run_id, passed, failed, skipped, success_rate):
         """Update test run with final results"""
         test_run = self.session.query(TestRun).filter_by(id=test_run_id).first()
@@ -233,6 +662,9 @@ class DatabaseManager:
             test_run.failed = failed
             test_run.skipped = skipped
             test_run.success_rate = success_rate
+            test_run.run_version = (test_run.run_version or 0) + 1
+            self.session.flush()
+            _sync_progress(self.session, test_run_id, passed + failed + skipped, passed, failed, skipped)
             self.session.commit()
 
     def update_test_run_analytics(self, test_run_id, avg_confidence, avg_execution_time):
@@ -241,13 +673,47 @@ class DatabaseManager:
         if test_run:
             test_run.avg_confidence = avg_confidence
             test_run.avg_execution_time = avg_execution_time
+            test_run.run_version = (test_run.run_version or 0) + 1
             self.session.commit()
 
-    def add_test_result(self, test_run_id, row_number, url, status, screenshot_filename=None, page_title=None,
-                        error_message=None, confidence=None, execution_time=None, detection_method=None,
-                        evidence=None, methods_used=None):
+    def add_test_result(self, test_run_id, row_number, url, status, **fields):
         """Add individual test result with hybrid detection data"""
+        result = self._build_test_result(test_run_id, row_number, url, status, **fields)
+        self.session.add(result)
+        self.session.commit()
+        return result
+
+    def add_test_results(self, results, progress=None):
+        """Insert a batch of results (dicts of add_test_result arguments) in one transaction.
 
+        progress ({run id: {'progress', 'processed', 'passed', 'failed', 'skipped'}}) is written in
+        the same transaction, and every run touched gets its run_version bumped.
+        """
+        rows = [self._build_test_result(**result) for result in results]
+        progress = progress or {}
+        try:
+            self.session.add_all(rows)
+            self.session.flush()
+            for test_run_id in {row.test_run_id for row in rows} | set(progress):
+                counters = dict(progress.get(test_run_id, {}))
+                percent = counters.pop('progress', None)
+                self.session.execute(text(
+                    "UPDATE test_runs SET progress = COALESCE(:progress, progress), "
+                    "run_version = COALESCE(run_version, 0) + 1 WHERE id = :id"
+                ), {'progress': percent, 'id': test_run_id})
+                if counters or percent is not None:
+                    _sync_progress(self.session, test_run_id, **counters)
+            self.session.commit()
+        except Exception:
+            self.session.rollback()
+            raise
+        return rows
+
+    @staticmethod
+    def _build_test_result(test_run_id, row_number, url, status, screenshot_filename=None, page_title=None,
+                           error_message=None, confidence=None, execution_time=None, detection_method=None,
+                           evidence=None, methods_used=None, menu_set=None, menu_type=None, caption=None,
+                           attempts=1, http_status=None, redirect_chain=None, response_ms=None, **phase_columns):
         # Convert evidence to JSON string if it's a dict
         evidence_str = None
         if evidence:
@@ -264,7 +730,7 @@ class DatabaseManager:
             else:
                 methods_str = str(methods_used)
 
-        result = TestResult(
+        return TestResult(
             test_run_id=test_run_id,
             row_number=row_number,
             url=url,
@@ -276,11 +742,124 @@ class DatabaseManager:
             execution_time=execution_time,
             detection_method=detection_method,
             evidence=evidence_str,
-            methods_used=methods_str
+            methods_used=methods_str,
+            menu_set=menu_set,
+            menu_type=menu_type,
+            caption=caption,
+            attempts=attempts,
+            http_status=http_status,
+            redirect_chain=json.dumps(redirect_chain) if redirect_chain else None,
+            response_ms=response_ms,
+            **phase_columns
         )
-        self.session.add(result)
+
+    def record_db_flush_time(self, result_ids, db_flush_ms):
+        """Store each result's share of the batch insert that wrote it"""
+        if not result_ids:
+            return
+        with self.engine.begin() as conn:
+            conn.execute(
+                text(f"UPDATE test_results SET db_flush_ms = :ms "
+                     f"WHERE id IN ({', '.join(str(int(i)) for i in result_ids)})"),
+                {'ms': db_flush_ms}
+            )
+
+    def finalize_run_timings(self, test_run_id):
+        """Aggregate per-URL phase timings into the run summary and averages"""
+        from phase_timing import summarize_phases
+
+        frame = self.get_test_results_frame(test_run_id)
+        summary = summarize_phases(frame)
+        test_run = self.session.query(TestRun).filter_by(id=test_run_id).first()
+        if test_run is None:
+            return summary
+
+        test_run.phase_timings = json.dumps(summary)
+        if not frame.empty:
+            confidence = frame['confidence'].dropna()
+            execution_time = frame['execution_time'].dropna()
+            test_run.avg_confidence = float(confidence.mean()) if not confidence.empty else None
+            test_run.avg_execution_time = float(execution_time.mean()) if not execution_time.empty else None
+        test_run.run_version = (test_run.run_version or 0) + 1
+        self.session.commit()
+        return summary
+
+    def add_page_snapshots(self, entries):
+        """Index snapshots already written to their segments - own connection, called from the writer thread"""
+        if not entries:
+            return
+        with self.engine.begin() as conn:
+            conn.execute(PageSnapshotEntry.__table__.insert(), entries)
+
+    def get_page_snapshot_entries(self, test_run_id, row_numbers=None):
+        """Snapshot index rows for a run as dicts, in (row_number, capture) order"""
+        table = PageSnapshotEntry.__table__
+        query = table.select().where(table.c.test_run_id == test_run_id)
+        if row_numbers is not None:
+            query = query.where(table.c.row_number.in_(list(row_numbers)))
+        with self.engine.connect() as conn:
+            rows = conn.execute(query.order_by(table.c.row_number, table.c.id)).mappings().all()
+        return [dict(row) for row in rows]
+
+    def get_snapshot_row_numbers(self, test_run_id):
+        """Rows of a run that have at least one snapshot"""
+        rows = self.session.query(PageSnapshotEntry.row_number).filter(
+            PageSnapshotEntry.test_run_id == test_run_id
+        ).distinct().all()
+        return {row_number for row_number, in rows}
+
+    def get_snapshot_run_ids(self):
+        """Test runs that have page snapshots"""
+        rows = self.session.query(PageSnapshotEntry.test_run_id).distinct().order_by(
+            PageSnapshotEntry.test_run_id).all()
+        return [test_run_id for test_run_id, in rows]
+
+    def delete_page_snapshots(self, test_run_id):
+        self.session.query(PageSnapshotEntry).filter(PageSnapshotEntry.test_run_id == test_run_id).delete()
         self.session.commit()
 
+    def get_latest_verdict_version(self, test_run_id):
+        return self.session.query(func.max(ResultVerdict.version)).filter(
+            ResultVerdict.test_run_id == test_run_id
+        ).scalar() or 0
+
+    def get_verdicts(self, test_run_id, version=None):
+        """{row_number: (status, reason)} for one verdict version of a run (default: the latest)"""
+        version = version or self.get_latest_verdict_version(test_run_id)
+        rows = self.session.query(ResultVerdict.row_number, ResultVerdict.status, ResultVerdict.reason).filter(
+            ResultVerdict.test_run_id == test_run_id, ResultVerdict.version == version
+        ).all()
+        return {row_number: (status, reason) for row_number, status, reason in rows}
+
+    def add_result_verdicts(self, verdicts):
+        if not verdicts:
+            return
+        with self.engine.begin() as conn:
+            conn.execute(ResultVerdict.__table__.insert(), verdicts)
+
+    def apply_verdicts(self, test_run_id, verdicts):
+        """Make re-scored verdicts the results' status and refresh the run's pass/fail counts.
+
+        verdicts are dicts with result_id, status and reason.
+        """
+        with self.engine.begin() as conn:
+            conn.execute(
+                text("UPDATE test_results SET status = :status, error_message = :reason WHERE id = :result_id"),
+                [{'result_id': v['result_id'], 'status': v['status'], 'reason': v['reason']} for v in verdicts]
+            )
+            passed, failed = conn.execute(
+                text("SELECT COALESCE(SUM(status = 'PASS'), 0), COALESCE(SUM(status = 'FAIL'), 0) "
+                     "FROM test_results WHERE test_run_id = :id"),
+                {'id': test_run_id}
+            ).one()
+            conn.execute(
+                text("UPDATE test_runs SET passed = :passed, failed = :failed, success_rate = :rate, "
+                     "run_version = COALESCE(run_version, 0) + 1 WHERE id = :id"),
+                {'id': test_run_id, 'passed': passed, 'failed': failed,
+                 'rate': passed / (passed + failed) * 100 if passed + failed else 0}
+            )
+        self.session.expire_all()
+
     def get_user_test_runs(self, user_id):
         """Get all test runs for a user"""
         return self.session.query(TestRun).filter_by(user_id=user_id).order_by(TestRun.created_date.desc()).all()
@@ -289,6 +868,92 @@ class DatabaseManager:
         """Get specific test run"""
         return self.session.query(TestRun).filter_by(id=test_run_id).first()
 
+    def bump_run_version(self, test_run_id):
+        """Mark a run's cached views as stale after its results changed"""
+        self.session.execute(
+            text("UPDATE test_runs SET run_version = COALESCE(run_version, 0) + 1 WHERE id = :id"),
+            {'id': test_run_id}
+        )
+        self.session.commit()
+
+    def get_run_version(self, test_run_id):
+        """Current run version - a column query, so it is never served from the identity map"""
+        return self.session.query(TestRun.run_version).filter(TestRun.id == test_run_id).scalar() or 0
+
+    def get_result_status_counts(self, user_id):
+        """Result counts per run and status for a user: {run_id: {'total': n, 'PASS': n, 'FAIL': n, ...}}"""
+        rows = self.session.query(
+            TestResult.test_run_id, TestResult.status, func.count(TestResult.id)
+        ).join(
+            TestRun, TestRun.id == TestResult.test_run_id
+        ).filter(
+            TestRun.user_id == user_id
+        ).group_by(TestResult.test_run_id, TestResult.status).all()
+
+        counts = {}
+        for test_run_id, status, count in rows:
+            run_counts = counts.setdefault(test_run_id, {'total': 0})
+            run_counts[status] = count
+            run_counts['total'] += count
+        return counts
+
+    def get_progress_since(self, user_id, since=None):
+        """A user's run_progress rows written after since, on a fresh connection: {run id: row dict}.
+
+        since is the newest updated_at an earlier call returned (None for everything). Each write
+        stamps its row while holding the database write lock, so stamps follow commit order.
+        """
+        query = ("SELECT p.test_run_id, p.status, p.progress, p.processed, p.passed, p.failed, p.skipped, "
+                 "p.updated_at FROM run_progress p JOIN test_runs r ON r.id = p.test_run_id WHERE r.user_id = :user")
+        params = {'user': user_id}
+        if since is not None:
+            query += " AND p.updated_at > :since"
+            params['since'] = since
+        with self.engine.connect() as conn:
+            rows = conn.execute(text(query), params).mappings().all()
+        return {row['test_run_id']: dict(row) for row in rows}
+
+    def get_run_status_counts(self):
+        """Number of test runs in each status, on a fresh connection (safe from other threads)"""
+        with self.engine.connect() as conn:
+            rows = conn.execute(text("SELECT status, COUNT(*) FROM test_runs GROUP BY status")).all()
+        return {status: count for status, count in rows}
+
+    def get_test_results_frame(self, test_run_id):
+        """All results of a run as a DataFrame, read in one query without building ORM objects"""
+        query = text(
+            f"SELECT {', '.join(RESULT_FRAME_COLUMNS)} FROM test_results "
+            f"WHERE test_run_id = :test_run_id ORDER BY row_number"
+        )
+        with self.engine.connect() as conn:
+            return pd.read_sql_query(query, conn, params={'test_run_id': test_run_id})
+
+    def iter_test_results(self, test_run_id, columns=RESULT_EXPORT_COLUMNS, batch_size=1000):
+        """Yield result rows as dicts in row order, one keyset-paged batch at a time.
+
+        Uses its own connection so it can run on an export thread while the app's
+        session is busy elsewhere.
+        """
+        query = text(
+            f"SELECT {', '.join(columns)}, id AS _cursor_id FROM test_results "
+            f"WHERE test_run_id = :test_run_id "
+            f"AND (row_number > :last_row OR (row_number = :last_row AND id > :last_id)) "
+            f"ORDER BY row_number, id LIMIT :batch_size"
+        )
+        last_row, last_id = -1, -1
+        while True:
+            with self.engine.connect() as conn:
+                batch = conn.execute(query, {'test_run_id': test_run_id, 'last_row': last_row,
+                                             'last_id': last_id, 'batch_size': batch_size}).mappings().all()
+            if not batch:
+                return
+            for row in batch:
+                row = dict(row)
+                last_row, last_id = row['row_number'], row.pop('_cursor_id')
+                yield row
+            if len(batch) < batch_size:
+                return
+
     def get_test_results(self, test_run_id):
         """Get all results for a test run"""
         return self.session.query(TestResult).filter_by(test_run_id=test_run_id).order_by(TestResult.row_number).all()
@@ -353,6 +1018,46 @@ class DatabaseManager:
 
         return results, analytics
 
+    def get_menu_type_breakdown(self, test_run_id):
+        """Per-MenuType pass/fail counts for a run, aggregated in SQL"""
+        rows = self.session.query(
+            TestResult.menu_type,
+            func.count(TestResult.id),
+            func.sum(case((TestResult.status == 'PASS', 1), else_=0)),
+            func.sum(case((TestResult.status == 'FAIL', 1), else_=0))
+        ).filter(
+            TestResult.test_run_id == test_run_id
+        ).group_by(TestResult.menu_type).order_by(func.count(TestResult.id).desc()).all()
+
+        return [
+            {'menu_type': menu_type, 'total': total, 'passed': passed or 0, 'failed': failed or 0}
+            for menu_type, total, passed, failed in rows
+        ]
+
+    def update_result_metadata(self, test_run_id, metadata_columns, rows):
+        """Bulk-fill metadata for results stored before it was captured at ingest.
+
+        rows is an iterable of dicts with row_number, menu_set, menu_type and caption.
+        """
+        statement = text(
+            "UPDATE test_results SET menu_set = :menu_set, menu_type = :menu_type, caption = :caption "
+            "WHERE test_run_id = :test_run_id AND row_number = :row_number"
+        )
+        batch = []
+        for row in rows:
+            batch.append(dict(row, test_run_id=test_run_id))
+            if len(batch) >= 1000:
+                self.session.execute(statement, batch)
+                batch = []
+        if batch:
+            self.session.execute(statement, batch)
+
+        test_run = self.session.query(TestRun).filter_by(id=test_run_id).first()
+        if test_run:
+            test_run.metadata_columns = json.dumps(metadata_columns)
+            test_run.run_version = (test_run.run_version or 0) + 1
+        self.session.commit()
+
     def get_user_databases(self, user_id):
         """Get unique database names for a user"""
         results = self.session.query(TestRun.database_name).filter_by(user_id=user_id).distinct().all()
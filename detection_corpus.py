@@ -0,0 +1,209 @@
+"""Evaluate page detection offline against a labeled corpus of saved pages.
+
+A corpus is a JSONL file, one page per line:
+
+    {"url": "...", "html": "<html>...</html>", "expected_status": "FAIL", "expected_reason": "access denied"}
+
+"html_file" (relative to the corpus file) may replace "html". Optional "alert_text",
+"body_text", "title" and "modal_texts" override what is parsed from the HTML - use
+them when the snapshot was captured from a live browser. "expected_reason" is
+optional and matched case-insensitively against the detected reason or criterion.
+
+    python detection_corpus.py corpus.jsonl --detector fail_criteria --processes 8
+"""
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+from functools import partial
+from multiprocessing import Pool
+
+from page_detection import PageSnapshot, evaluate_snapshot, evaluate_content
+
+DETECTORS = ('fail_criteria', 'content')
+
+SNAPSHOT_OVERRIDES = ('alert_text', 'body_text', 'title', 'modal_texts')
+
+
+def load_corpus(path):
+    """Yield corpus records with html_file resolved to inline html"""
+    base_dir = os.path.dirname(os.path.abspath(path))
+    with open(path, encoding='utf-8') as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            record = json.loads(line)
+            if 'html' not in record and record.get('html_file'):
+                with open(os.path.join(base_dir, record['html_file']), encoding='utf-8', errors='replace') as page:
+                    record['html'] = page.read()
+            record['expected_status'] = str(record.get('expected_status', '')).upper()
+            if record['expected_status'] not in ('PASS', 'FAIL'):
+                raise ValueError(f"{path}:{line_number}: expected_status must be PASS or FAIL")
+            record.setdefault('line', line_number)
+            yield record
+
+
+def snapshot_for(record):
+    """PageSnapshot for a corpus record, preferring live-captured fields over parsed ones"""
+    snapshot = PageSnapshot.from_html(record.get('html', ''), url=record.get('url'),
+                                      alert_text=record.get('alert_text'))
+    for field in SNAPSHOT_OVERRIDES:
+        if record.get(field) is not None:
+            setattr(snapshot, field, record[field])
+    return snapshot
+
+
+def evaluate_record(record, detector='fail_criteria'):
+    """Verdict and timings for one corpus page"""
+    started = time.perf_counter()
+    snapshot = snapshot_for(record)
+    parsed = time.perf_counter()
+
+    if detector == 'content':
+        status, reason, _ = evaluate_content(snapshot)
+        criteria = None
+    else:
+        verdict = evaluate_snapshot(snapshot)
+        status = 'FAIL' if verdict['is_fail'] else 'PASS'
+        reason, criteria = verdict['reason'], verdict['criteria']
+    finished = time.perf_counter()
+
+    expected_reason = record.get('expected_reason')
+    reason_match = None
+    if expected_reason and status == 'FAIL' and record['expected_status'] == 'FAIL':
+        expected_lower = expected_reason.lower()
+        reason_match = expected_lower in (reason or '').lower() or expected_lower == (criteria or '')
+
+    return {
+        'line': record.get('line'),
+        'url': record.get('url'),
+        'expected_status': record['expected_status'],
+        'status': status,
+        'reason': reason,
+        'reason_match': reason_match,
+        'parse_ms': (parsed - started) * 1000,
+        'match_ms': (finished - parsed) * 1000,
+    }
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def _latency(values):
+    return {
+        'mean': round(sum(values) / len(values), 3) if values else 0.0,
+        'p50': round(percentile(values, 50), 3),
+        'p95': round(percentile(values, 95), 3),
+        'max': round(max(values), 3) if values else 0.0,
+    }
+
+
+def summarize(results, wall_seconds):
+    """Precision/recall for FAIL, accuracy, reason agreement and latency"""
+    tp = sum(r['expected_status'] == 'FAIL' and r['status'] == 'FAIL' for r in results)
+    fp = sum(r['expected_status'] == 'PASS' and r['status'] == 'FAIL' for r in results)
+    fn = sum(r['expected_status'] == 'FAIL' and r['status'] != 'FAIL' for r in results)
+    tn = len(results) - tp - fp - fn
+    precision = tp / (tp + fp) if tp + fp else 0.0
+    recall = tp / (tp + fn) if tp + fn else 0.0
+    reason_checked = [r['reason_match'] for r in results if r['reason_match'] is not None]
+
+    return {
+        'pages': len(results),
+        'true_positive': tp,
+        'false_positive': fp,
+        'false_negative': fn,
+        'true_negative': tn,
+        'accuracy': (tp + tn) / len(results) if results else 0.0,
+        'fail_precision': precision,
+        'fail_recall': recall,
+        'fail_f1': 2 * precision * recall / (precision + recall) if precision + recall else 0.0,
+        'reason_accuracy': sum(reason_checked) / len(reason_checked) if reason_checked else None,
+        'parse_ms': _latency([r['parse_ms'] for r in results]),
+        'match_ms': _latency([r['match_ms'] for r in results]),
+        'wall_seconds': round(wall_seconds, 3),
+        'pages_per_second': round(len(results) / wall_seconds, 1) if wall_seconds else 0.0,
+    }
+
+
+def _init_worker(log_level):
+    logging.basicConfig(level=log_level)
+    logging.getLogger().setLevel(log_level)
+
+
+def run_corpus(path, detector='fail_criteria', processes=None, chunksize=16, log_level=logging.WARNING):
+    """Evaluate every page in the corpus across processes; returns (summary, per-page results)"""
+    if detector not in DETECTORS:
+        raise ValueError(f"Unknown detector {detector!r} - choose from {', '.join(DETECTORS)}")
+
+    evaluate = partial(evaluate_record, detector=detector)
+    started = time.perf_counter()
+    if processes == 1:
+        _init_worker(log_level)
+        results = [evaluate(record) for record in load_corpus(path)]
+    else:
+        with Pool(processes=processes, initializer=_init_worker, initargs=(log_level,)) as pool:
+            results = list(pool.imap(evaluate, load_corpus(path), chunksize=chunksize))
+    wall_seconds = time.perf_counter() - started
+
+    summary = summarize(results, wall_seconds)
+    summary.update({'corpus': path, 'detector': detector, 'processes': processes or os.cpu_count()})
+    return summary, results
+
+
+def print_summary(summary, results, show_misses=20):
+    print(f"Corpus: {summary['corpus']} ({summary['pages']} pages, detector={summary['detector']}, "
+          f"processes={summary['processes']})")
+    print(f"  accuracy        {summary['accuracy']:.1%}")
+    print(f"  FAIL precision  {summary['fail_precision']:.1%}")
+    print(f"  FAIL recall     {summary['fail_recall']:.1%}")
+    print(f"  FAIL F1         {summary['fail_f1']:.1%}")
+    if summary['reason_accuracy'] is not None:
+        print(f"  reason match    {summary['reason_accuracy']:.1%}")
+    print(f"  confusion       TP={summary['true_positive']} FP={summary['false_positive']} "
+          f"FN={summary['false_negative']} TN={summary['true_negative']}")
+    for stage in ('parse_ms', 'match_ms'):
+        s = summary[stage]
+        print(f"  {stage:<15} mean={s['mean']} p50={s['p50']} p95={s['p95']} max={s['max']}")
+    print(f"  throughput      {summary['pages_per_second']} pages/s ({summary['wall_seconds']}s wall)")
+
+    misses = [r for r in results if r['status'] != r['expected_status'] or r['reason_match'] is False]
+    if misses and show_misses:
+        print(f"\nMismatches ({len(misses)}):")
+        for r in misses[:show_misses]:
+            print(f"  line {r['line']}: expected {r['expected_status']}, got {r['status']} "
+                  f"({r['reason'] or 'no reason'}) - {r['url']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate page detection against a labeled snapshot corpus")
+    parser.add_argument("corpus", help="JSONL corpus file")
+    parser.add_argument("--detector", choices=DETECTORS, default='fail_criteria',
+                        help="fail_criteria = the worker's checks, content = the detection engine's analysis")
+    parser.add_argument("--processes", type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument("--chunksize", type=int, default=16)
+    parser.add_argument("--json", dest="json_path", help="Also write the summary and per-page results here")
+    parser.add_argument("--show-misses", type=int, default=20, help="Mismatches to list (0 for none)")
+    args = parser.parse_args()
+
+    summary, results = run_corpus(args.corpus, args.detector, args.processes, args.chunksize)
+    print_summary(summary, results, args.show_misses)
+
+    if args.json_path:
+        with open(args.json_path, 'w') as f:
+            json.dump({'summary': summary, 'results': results}, f, indent=2)
+
+    # Non-zero exit when the detector misclassifies anything, for use as a regression gate
+    sys.exit(0 if summary['false_positive'] + summary['false_negative'] == 0 else 1)
+
+
+if __name__ == "__main__":
+    main()
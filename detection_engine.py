@@ -3,6 +3,7 @@ import logging
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
+from page_detection import FAIL_CRITERIA, TITLE_ERROR_PATTERNS, is_error_content, extract_error_detail
 
 logger = logging.getLogger(__name__)
 
@@ -128,17 +129,7 @@ def extract_all_modal_and_dialog_content(driver):
                 logger.debug(f"Error checking modal selector {selector}: {e}")
 
         # 3. Look for specific fail criteria in visible elements
-        fail_criteria = [
-            'invalid select file',
-            'page does not exist',
-            'an exception has occurred',
-            'access denied',
-            'your request did not complete',
-            'exception messages:',
-            'please try your request again',
-        ]
-
-        for criteria in fail_criteria:
+        for criteria in FAIL_CRITERIA:
             try:
                 xpath = f"//*[contains(text(), '{criteria}')]"
                 elements = driver.find_elements(By.XPATH, xpath)
@@ -160,109 +151,6 @@ def extract_all_modal_and_dialog_content(driver):
         logger.error(f"💥 Error in modal detection: {e}")
         return ""
 
-def is_error_content(text):
-    """Enhanced error detection with specific focus on 'Invalid select file'"""
-    if not text:
-        logger.info("❌ No text to analyze")
-        return False
-
-    text_lower = text.lower()
-    logger.info(f"🔍 Analyzing text for errors... Length: {len(text)} chars")
-    logger.info(f"📝 Text preview: '{text[:150]}...'")
-
-    # HIGHEST PRIORITY: Your specific error (exact match)
-    critical_patterns = [
-        'invalid select file:',
-        'invalid select file',
-        'invalid file:',
-        'invalid file',
-        'invalid select'
-    ]
-
-    for pattern in critical_patterns:
-        if pattern in text_lower:
-            logger.info(f"🚨 CRITICAL ERROR DETECTED: Found '{pattern}' in text")
-            return True
-
-    # HIGH PRIORITY: Authentication errors
-    auth_patterns = [
-        'access denied',
-        'unauthorized',
-        'permission denied',
-        'forbidden',
-        'session expired',
-        'login required',
-        'authentication failed'
-    ]
-
-    for pattern in auth_patterns:
-        if pattern in text_lower:
-            logger.info(f"🔐 AUTH ERROR DETECTED: Found '{pattern}' in text")
-            return True
-
-    # MEDIUM PRIORITY: System errors
-    system_patterns = [
-        'error occurred',
-        'exception occurred',
-        'not found',
-        'database error',
-        'connection error',
-        'timeout',
-        'service unavailable',
-        '404', '403', '500', '502', '503'
-    ]
-
-    for pattern in system_patterns:
-        if pattern in text_lower:
-            logger.info(f"⚙️ SYSTEM ERROR DETECTED: Found '{pattern}' in text")
-            return True
-
-    logger.info("✅ No error patterns detected in text")
-    return False
-
-
-def extract_error_detail(text):
-    """Extract specific error details from text with enhanced logic"""
-    if not text:
-        return "No error text found"
-
-    text_lower = text.lower()
-
-    # Check for specific error types and return appropriate message
-    if 'invalid select file:' in text_lower:
-        return "Invalid select file error (with colon)"
-    elif 'invalid select file' in text_lower:
-        return "Invalid select file error"
-    elif 'invalid file:' in text_lower:
-        return "Invalid file error (with colon)"
-    elif 'invalid file' in text_lower:
-        return "Invalid file error"
-    elif 'access denied' in text_lower:
-        return "Access denied error"
-    elif 'session expired' in text_lower:
-        return "Session expired error"
-    elif 'not found' in text_lower:
-        return "Page not found error"
-    elif 'unauthorized' in text_lower:
-        return "Unauthorized access error"
-    elif 'database error' in text_lower:
-        return "Database error"
-    else:
-        # Look for lines containing error keywords
-        lines = text.split('\n')
-        for line in lines:
-            line_clean = line.strip()
-            if line_clean and any(err in line_clean.lower() for err in ['error', 'failed', 'invalid', 'denied']):
-                return line_clean[:150]  # Return first meaningful error line
-
-        # Fallback - return first non-empty line
-        for line in lines:
-            if line.strip():
-                return line.strip()[:100]
-
-        return "Error detected but no specific details found"
-
-
 def content_text_detection(driver, url):
     """Enhanced content-based text analysis with comprehensive modal detection"""
     start_time = time.time()
@@ -292,9 +180,7 @@ def content_text_detection(driver, url):
         # Check page title for errors
         try:
             title = driver.title.lower() if driver.title else ""
-            title_error_patterns = ['error', 'invalid', 'denied', 'unauthorized', '404', '403', '500']
-
-            for pattern in title_error_patterns:
+            for pattern in TITLE_ERROR_PATTERNS:
                 if pattern in title:
                     execution_time = int((time.time() - start_time) * 1000)
                     logger.info(f"❌ ERROR IN TITLE: Found '{pattern}' in title '{driver.title}'")
@@ -0,0 +1,387 @@
+import io
+import os
+import csv
+import glob
+import html
+import json
+import logging
+import tempfile
+import threading
+import zipfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+EXPORTS_DIR = "exports"
+SCREENSHOTS_DIR = "screenshots"
+
+# Screenshot files read ahead of the ZIP writer - bounds memory to a few images
+READ_AHEAD = 8
+READ_WORKERS = 4
+
+ZIP_README = """Test Results Summary
+===================
+Test ID: {test_run_id}
+Screenshots: {screenshot_count}
+Generated: {generated}
+
+Status Legend:
+PASS - Page loaded successfully
+FAIL - Page failed to load (may include extracted error text)
+SKIP - Page was skipped
+
+Features:
+- Smart Error Detection: Failed pages have error text extracted from screenshots
+- Complete URL Testing: All URLs tested with screenshots
+- Enhanced Error Analysis: Browser errors + extracted text
+
+File Naming Convention:
+row_[NUMBER]_[STATUS]_[URL_SNIPPET].png
+"""
+
+
+def export_filename(kind, test_run_id, run_version, extension):
+    return f"{kind}_test_{test_run_id}_v{run_version}.{extension}"
+
+
+def zip_entry_name(result):
+    clean_url = "".join(c for c in result['url'] if c.isalnum() or c in ('-', '_', '.'))[:50]
+    return f"row_{result['row_number'] + 1}_{result['status']}_{clean_url}.png"
+
+
+def _read_file(path):
+    try:
+        with open(path, 'rb') as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def write_screenshot_zip(out_file, test_run_id, screenshot_results, screenshots_dir=SCREENSHOTS_DIR,
+                         progress=None):
+    """Write a ZIP of a run's screenshots to an open binary file.
+
+    PNGs are already compressed, so entries are STORED. Files are read by a small
+    pool a few at a time ahead of the writer. Returns the number of screenshots written.
+    """
+    paths = [(os.path.join(screenshots_dir, f"test_{test_run_id}", r['screenshot_filename']), zip_entry_name(r))
+             for r in screenshot_results]
+    screenshot_count = 0
+
+    with zipfile.ZipFile(out_file, 'w', zipfile.ZIP_STORED, allowZip64=True) as zip_file, \
+            ThreadPoolExecutor(max_workers=READ_WORKERS, thread_name_prefix="zip-read") as pool:
+        pending = deque()
+        queued = iter(paths)
+
+        def fill():
+            while len(pending) < READ_AHEAD:
+                item = next(queued, None)
+                if item is None:
+                    return
+                pending.append((item[1], pool.submit(_read_file, item[0])))
+
+        fill()
+        while pending:
+            entry_name, future = pending.popleft()
+            data = future.result()
+            fill()
+            if data is None:
+                continue
+            zip_file.writestr(entry_name, data)
+            screenshot_count += 1
+            if progress:
+                progress(screenshot_count)
+
+        zip_file.writestr("README.txt", ZIP_README.format(
+            test_run_id=test_run_id,
+            screenshot_count=screenshot_count,
+            generated=datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        ))
+
+    return screenshot_count
+
+
+# (result field, column heading) in export order
+EXPORT_FIELDS = [
+    ('row_number', 'Row_Number'),
+    ('url', 'Complete_URL'),
+    ('status', 'Test_Status'),
+    ('menu_set', 'Menu_Set'),
+    ('menu_type', 'Menu_Type'),
+    ('caption', 'Caption'),
+    ('screenshot_filename', 'Screenshot_Filename'),
+    ('error_message', 'Error_Message'),
+    ('page_title', 'Page_Title'),
+    ('confidence', 'Confidence'),
+    ('execution_time', 'Execution_Time_ms'),
+    ('detection_method', 'Detection_Method'),
+    ('methods_used', 'Methods_Used'),
+    ('attempts', 'Attempts'),
+    ('http_status', 'HTTP_Status'),
+    ('redirect_chain', 'Redirect_Chain'),
+    ('response_ms', 'Response_Time_ms'),
+    ('processed_date', 'Processed_Date'),
+]
+
+# format -> (file extension, mime type, label)
+RESULT_EXPORT_FORMATS = {
+    'csv': ('csv', 'text/csv', 'CSV'),
+    'xlsx': ('xlsx', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', 'Excel (XLSX)'),
+    'jsonl': ('jsonl', 'application/x-ndjson', 'JSON Lines'),
+    'html': ('html', 'text/html', 'HTML Report'),
+}
+
+PROGRESS_EVERY = 500
+
+
+def _export_values(row):
+    """Export values for one result row - row numbers are 1-based like the uploaded file"""
+    values = [row.get(field) for field, _ in EXPORT_FIELDS]
+    if values[0] is not None:
+        values[0] += 1
+    return values
+
+
+def _counted(rows, progress):
+    for count, row in enumerate(rows, 1):
+        yield row
+        if progress and count % PROGRESS_EVERY == 0:
+            progress(count)
+
+
+def write_results_csv(out_file, summary, rows):
+    text_file = io.TextIOWrapper(out_file, encoding='utf-8-sig', newline='')
+    writer = csv.writer(text_file)
+    writer.writerow([heading for _, heading in EXPORT_FIELDS])
+    for row in rows:
+        writer.writerow(['' if v is None else v for v in _export_values(row)])
+    text_file.flush()
+    text_file.detach()
+
+
+def write_results_jsonl(out_file, summary, rows):
+    for row in rows:
+        record = dict(zip([heading for _, heading in EXPORT_FIELDS], _export_values(row)))
+        out_file.write(json.dumps(record, ensure_ascii=False, default=str).encode('utf-8'))
+        out_file.write(b'\n')
+
+
+def write_results_xlsx(out_file, summary, rows):
+    # Write-only workbooks stream rows to disk instead of building the sheet in memory
+    from openpyxl import Workbook
+    from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+
+    def cell(value):
+        if isinstance(value, str):
+            return ILLEGAL_CHARACTERS_RE.sub('', value)[:32767]
+        return value
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Results")
+    sheet.freeze_panes = 'A2'
+    sheet.append([heading for _, heading in EXPORT_FIELDS])
+    for row in rows:
+        sheet.append([cell(v) for v in _export_values(row)])
+    workbook.save(out_file)
+
+
+HTML_REPORT_HEAD = """<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<title>{title}</title>
+<style>
+body {{ font-family: -apple-system, Segoe UI, Roboto, sans-serif; margin: 2rem; color: #1f2937; }}
+h1 {{ font-size: 1.5rem; margin-bottom: 0.25rem; }}
+.meta {{ color: #6b7280; margin-bottom: 1.5rem; }}
+.stats {{ display: flex; gap: 1rem; margin-bottom: 1.5rem; }}
+.stat {{ border: 1px solid #e5e7eb; border-radius: 8px; padding: 0.75rem 1.25rem; }}
+.stat b {{ display: block; font-size: 1.4rem; }}
+table {{ border-collapse: collapse; width: 100%; font-size: 0.85rem; }}
+th, td {{ border: 1px solid #e5e7eb; padding: 0.4rem 0.6rem; text-align: left; vertical-align: top; }}
+th {{ background: #f3f4f6; position: sticky; top: 0; }}
+td {{ word-break: break-word; }}
+tr.FAIL td.status {{ color: #b91c1c; font-weight: 600; }}
+tr.PASS td.status {{ color: #15803d; font-weight: 600; }}
+</style>
+</head>
+<body>
+<h1>{title}</h1>
+<div class="meta">Database: {database} &middot; Test date: {created} &middot; Generated: {generated}</div>
+<div class="stats">
+<div class="stat"><b>{total}</b>Total URLs</div>
+<div class="stat"><b>{passed}</b>Passed</div>
+<div class="stat"><b>{failed}</b>Failed</div>
+<div class="stat"><b>{screenshots}</b>Screenshots</div>
+<div class="stat"><b>{success_rate}</b>Success Rate</div>
+</div>
+<table>
+<thead><tr>{headings}</tr></thead>
+<tbody>
+"""
+
+HTML_REPORT_TAIL = """</tbody>
+</table>
+</body>
+</html>
+"""
+
+
+def write_results_html(out_file, summary, rows):
+    """Self-contained HTML report - inline styles, no external assets"""
+    total = summary.get('total') or 0
+    passed = summary.get('passed') or 0
+    status_index = [field for field, _ in EXPORT_FIELDS].index('status')
+
+    out_file.write(HTML_REPORT_HEAD.format(
+        title=html.escape(f"Test Report: {summary.get('test_name', '')}"),
+        database=html.escape(str(summary.get('database_name', ''))),
+        created=html.escape(str(summary.get('created_date', ''))),
+        generated=datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        total=total,
+        passed=passed,
+        failed=summary.get('failed') or 0,
+        screenshots=summary.get('screenshots') or 0,
+        success_rate=f"{(passed / total * 100):.1f}%" if total else "n/a",
+        headings="".join(f"<th>{html.escape(heading)}</th>" for _, heading in EXPORT_FIELDS),
+    ).encode('utf-8'))
+
+    for row in rows:
+        values = _export_values(row)
+        status = html.escape(str(values[status_index] or ''))
+        cells = "".join(
+            f'<td class="{field}">{"" if v is None else html.escape(str(v))}</td>'
+            for (field, _), v in zip(EXPORT_FIELDS, values)
+        )
+        out_file.write(f'<tr class="{status}">{cells}</tr>\n'.encode('utf-8'))
+
+    out_file.write(HTML_REPORT_TAIL.encode('utf-8'))
+
+
+RESULT_WRITERS = {
+    'csv': write_results_csv,
+    'jsonl': write_results_jsonl,
+    'xlsx': write_results_xlsx,
+    'html': write_results_html,
+}
+
+
+class ExportJob:
+    """State of one background export"""
+
+    def __init__(self, path, total=0):
+        self.path = path
+        self.total = total
+        self.done = 0
+        self.error = None
+        self.future = None
+
+    @property
+    def status(self):
+        if self.error:
+            return 'failed'
+        if self.future is not None and not self.future.done():
+            return 'building'
+        return 'ready' if os.path.exists(self.path) else 'missing'
+
+
+class ExportManager:
+    """Builds export files in the background, one file per (kind, run, run_version).
+
+    Finished files live in exports/ and are reused until the run version changes,
+    so the same archive is never built twice and older versions are pruned.
+    """
+
+    def __init__(self, exports_dir=EXPORTS_DIR, max_workers=2):
+        self.exports_dir = exports_dir
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="exports")
+        self._jobs = {}
+        self._lock = threading.Lock()
+        os.makedirs(exports_dir, exist_ok=True)
+
+    def path_for(self, kind, test_run_id, run_version, extension):
+        return os.path.join(self.exports_dir, export_filename(kind, test_run_id, run_version, extension))
+
+    def get(self, kind, test_run_id, run_version, extension):
+        """Existing job (or finished file from an earlier session) for this export"""
+        path = self.path_for(kind, test_run_id, run_version, extension)
+        with self._lock:
+            job = self._jobs.get(path)
+            if job is None and os.path.exists(path):
+                job = self._jobs[path] = ExportJob(path)
+            return job
+
+    def submit(self, kind, test_run_id, run_version, extension, writer, total=0):
+        """Start building an export unless it is already built or in progress.
+
+        writer(out_file, progress) writes the export to an open binary file and
+        calls progress(done) as it goes.
+        """
+        path = self.path_for(kind, test_run_id, run_version, extension)
+        with self._lock:
+            job = self._jobs.get(path)
+            if job is not None and job.status in ('building', 'ready'):
+                return job
+            job = self._jobs[path] = ExportJob(path, total)
+            job.future = self._pool.submit(self._build, job, kind, test_run_id, writer)
+            return job
+
+    def _build(self, job, kind, test_run_id, writer):
+        fd, tmp_path = tempfile.mkstemp(dir=self.exports_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as out_file:
+                writer(out_file, lambda done: setattr(job, 'done', done))
+            os.replace(tmp_path, job.path)
+            logger.info(f"📦 Export ready: {job.path}")
+            self._prune(kind, test_run_id, keep=job.path)
+        except Exception as e:
+            job.error = str(e)
+            logger.error(f"💥 Export {job.path} failed: {e}")
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def _prune(self, kind, test_run_id, keep):
+        """Drop exports of the same kind built for older run versions"""
+        pattern = os.path.join(self.exports_dir, f"{kind}_test_{test_run_id}_v*")
+        for path in glob.glob(pattern):
+            if os.path.abspath(path) != os.path.abspath(keep):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def remove_run(self, test_run_id):
+        """Delete every export built for a run"""
+        for path in glob.glob(os.path.join(self.exports_dir, f"*_test_{test_run_id}_v*")):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def submit_screenshot_zip(self, test_run_id, run_version, screenshot_results,
+                              screenshots_dir=SCREENSHOTS_DIR):
+        records = list(screenshot_results)
+        return self.submit(
+            'screenshots', test_run_id, run_version, 'zip',
+            lambda out_file, progress: write_screenshot_zip(out_file, test_run_id, records,
+                                                            screenshots_dir, progress),
+            total=len(records),
+        )
+
+    def submit_results_export(self, db_manager, export_format, test_run_id, run_version, summary):
+        """Stream a run's results from the database into CSV/JSONL/XLSX/HTML.
+
+        summary is a plain dict of run details (name, counts...) - ORM objects
+        must not be touched from the export thread.
+        """
+        extension = RESULT_EXPORT_FORMATS[export_format][0]
+        writer = RESULT_WRITERS[export_format]
+        return self.submit(
+            f"results_{export_format}", test_run_id, run_version, extension,
+            lambda out_file, progress: writer(out_file, summary,
+                                              _counted(db_manager.iter_test_results(test_run_id), progress)),
+            total=summary.get('total') or 0,
+        )
@@ -0,0 +1,244 @@
+import os
+import hmac
+import time
+import hashlib
+import logging
+import secrets
+import mimetypes
+import threading
+from email.utils import formatdate, parsedate_to_datetime
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs, quote, unquote
+
+logger = logging.getLogger(__name__)
+
+# Bind address, port and the base URL the browser uses to reach the server
+FILE_SERVER_HOST = os.environ.get("FILE_SERVER_HOST", "127.0.0.1")
+FILE_SERVER_PORT = int(os.environ.get("FILE_SERVER_PORT", "8502"))
+FILE_SERVER_PUBLIC_URL = os.environ.get("FILE_SERVER_PUBLIC_URL")
+
+# Top-level directories the server may read from - nothing else is reachable
+SERVED_DIRS = ("screenshots", "exports")
+
+# Links stay valid this long; screenshots never change once written so browsers may cache them
+LINK_TTL_SECONDS = 12 * 3600
+CACHE_MAX_AGE = 86400
+COPY_BUFFER_SIZE = 256 * 1024
+
+
+def _etag(stat):
+    return f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+
+
+# A well-formed range that lies wholly past the end of the file - answered with 416
+UNSATISFIABLE = "unsatisfiable"
+
+
+def _parse_range(header, size):
+    """Single 'bytes=' range -> (start, end) inclusive, UNSATISFIABLE, or None to ignore it.
+
+    Malformed and multi-range headers are ignored, so the full file is sent (RFC 9110 14.2).
+    """
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
+    start_text, dash, end_text = header[len("bytes="):].strip().partition("-")
+    if not dash or not (start_text or end_text) or not all(t.isdigit() for t in (start_text, end_text) if t):
+        return None
+    if start_text == "":
+        # Suffix range: last N bytes
+        length = int(end_text)
+        if length == 0 or size == 0:
+            return UNSATISFIABLE
+        return max(size - length, 0), size - 1
+    start = int(start_text)
+    end = int(end_text) if end_text else size - 1
+    if end_text and end < start:
+        return None
+    if start >= size:
+        return UNSATISFIABLE
+    return start, min(end, size - 1)
+
+
+class _FileRequestHandler(BaseHTTPRequestHandler):
+    """GET/HEAD for signed file links with ETag, Cache-Control and Range support"""
+
+    server_version = "YardiFileServer/1.0"
+
+    def log_message(self, format, *args):
+        logger.debug(f"📁 {self.address_string()} - {format % args}")
+
+    def do_HEAD(self):
+        self._serve(send_body=False)
+
+    def do_GET(self):
+        self._serve(send_body=True)
+
+    def _serve(self, send_body):
+        parts = urlsplit(self.path)
+        params = parse_qs(parts.query)
+        relative_path = unquote(parts.path).lstrip("/")
+        download_name = params.get("name", [None])[0]
+
+        if not self.server.file_server.verify(relative_path, params.get("exp", [""])[0],
+                                              params.get("sig", [""])[0], download_name):
+            self.send_error(403, "Invalid or expired link")
+            return
+
+        path = self.server.file_server.resolve(relative_path)
+        if path is None or not os.path.isfile(path):
+            self.send_error(404, "File not found")
+            return
+
+        stat = os.stat(path)
+        etag = _etag(stat)
+        last_modified = formatdate(stat.st_mtime, usegmt=True)
+
+        if self._not_modified(etag, stat.st_mtime):
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Cache-Control", f"private, max-age={CACHE_MAX_AGE}")
+            self.end_headers()
+            return
+
+        size = stat.st_size
+        start, end = 0, size - 1
+        status = 200
+        range_header = self.headers.get("Range")
+        if range_header and self.headers.get("If-Range", etag) == etag:
+            byte_range = _parse_range(range_header, size)
+            if byte_range == UNSATISFIABLE:
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{size}")
+                self.end_headers()
+                return
+            if byte_range is not None:
+                start, end = byte_range
+                status = 206
+
+        self.send_response(status)
+        self.send_header("Content-Type", mimetypes.guess_type(path)[0] or "application/octet-stream")
+        self.send_header("Content-Length", str(end - start + 1 if size else 0))
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("ETag", etag)
+        self.send_header("Last-Modified", last_modified)
+        self.send_header("Cache-Control", f"private, max-age={CACHE_MAX_AGE}")
+        if status == 206:
+            self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+        if download_name:
+            self.send_header("Content-Disposition", f"attachment; filename*=UTF-8''{quote(download_name)}")
+        self.end_headers()
+
+        if send_body and size:
+            self._copy(path, start, end - start + 1)
+
+    def _not_modified(self, etag, mtime):
+        if_none_match = self.headers.get("If-None-Match")
+        if if_none_match is not None:
+            return etag in [tag.strip() for tag in if_none_match.split(",")] or if_none_match.strip() == "*"
+
+        if_modified_since = self.headers.get("If-Modified-Since")
+        if if_modified_since:
+            try:
+                return int(mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+        return False
+
+    def _copy(self, path, offset, length):
+        try:
+            with open(path, "rb") as f:
+                f.seek(offset)
+                while length > 0:
+                    block = f.read(min(COPY_BUFFER_SIZE, length))
+                    if not block:
+                        break
+                    self.wfile.write(block)
+                    length -= len(block)
+        except (BrokenPipeError, ConnectionResetError):
+            # Browser cancelled the download or seeked elsewhere
+            pass
+
+
+class FileServer:
+    """Small threaded HTTP server that streams result files straight from disk.
+
+    Links are HMAC-signed with a per-process secret and expire, so only pages
+    rendered by this app can hand them out.
+    """
+
+    def __init__(self, host=FILE_SERVER_HOST, port=FILE_SERVER_PORT, public_url=FILE_SERVER_PUBLIC_URL,
+                 root=".", served_dirs=SERVED_DIRS, link_ttl=LINK_TTL_SECONDS):
+        self.host = host
+        self.port = port
+        self.public_url = public_url
+        self.root = os.path.realpath(root)
+        self.served_dirs = tuple(served_dirs)
+        self.link_ttl = link_ttl
+        self._secret = secrets.token_bytes(32)
+        self._httpd = None
+        self._thread = None
+
+    @property
+    def is_running(self):
+        return self._httpd is not None
+
+    @property
+    def base_url(self):
+        if self.public_url:
+            return self.public_url.rstrip("/")
+        host = "localhost" if self.host in ("0.0.0.0", "127.0.0.1", "") else self.host
+        return f"http://{host}:{self.port}"
+
+    def start(self):
+        """Start serving in a daemon thread. Returns False if the port couldn't be bound."""
+        try:
+            httpd = ThreadingHTTPServer((self.host, self.port), _FileRequestHandler)
+        except OSError as e:
+            logger.warning(f"⚠️ File server could not bind {self.host}:{self.port}: {e}")
+            return False
+
+        httpd.daemon_threads = True
+        httpd.file_server = self
+        self.port = httpd.server_address[1]
+        self._httpd = httpd
+        self._thread = threading.Thread(target=httpd.serve_forever, name="file-server", daemon=True)
+        self._thread.start()
+        logger.info(f"📁 File server listening on {self.host}:{self.port}")
+        return True
+
+    def stop(self):
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+
+    def resolve(self, relative_path):
+        """Absolute path for a link, or None if it escapes the served directories"""
+        path = os.path.realpath(os.path.join(self.root, relative_path))
+        for directory in self.served_dirs:
+            allowed = os.path.join(self.root, directory)
+            if path.startswith(allowed + os.sep):
+                return path
+        return None
+
+    def _signature(self, relative_path, expires, download_name):
+        message = f"{relative_path}\n{expires}\n{download_name or ''}".encode("utf-8")
+        return hmac.new(self._secret, message, hashlib.sha256).hexdigest()
+
+    def verify(self, relative_path, expires, signature, download_name=None):
+        try:
+            if int(expires) < time.time():
+                return False
+        except ValueError:
+            return False
+        return hmac.compare_digest(self._signature(relative_path, expires, download_name), signature)
+
+    def url_for(self, path, download_name=None):
+        """Signed link to a file under one of the served directories"""
+        relative_path = os.path.relpath(os.path.realpath(path), self.root).replace(os.sep, "/")
+        # Round expiry up to the hour so links (and the browser cache) are stable across reruns
+        expires = (int(time.time()) // 3600 + 1) * 3600 + self.link_ttl
+        url = f"{self.base_url}/{quote(relative_path)}?exp={expires}&sig={self._signature(relative_path, expires, download_name)}"
+        if download_name:
+            url += f"&name={quote(download_name)}"
+        return url
@@ -0,0 +1,127 @@
+import os
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Read each page's HTTP status from Chrome's performance log (set to 0 to rely on page content alone)
+HTTP_STATUS_CAPTURE = os.environ.get("HTTP_STATUS_CAPTURE", "1") not in ("0", "false", "no")
+
+# Document requests kept per tab between navigations - the first is the one the worker started
+MAX_CHAINS_PER_TAB = 20
+
+_DOCUMENT_EVENTS = ('"Network.requestWillBeSent"', '"Network.responseReceived"')
+
+
+def enable_performance_log(chrome_options):
+    """Have chromedriver record network events, so main-document responses can be read back"""
+    chrome_options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
+    chrome_options.add_experimental_option('perfLoggingPrefs', {'enableNetwork': True, 'enablePage': False})
+
+
+def target_id(window_handle):
+    """DevTools target id behind a window handle - older chromedrivers prefix it"""
+    return (window_handle or '').replace('CDwindow-', '')
+
+
+class DocumentResponses:
+    """Main-document responses of a browser's tabs, read from its performance log.
+
+    begin() is called just before a tab navigates and response() once its page has
+    loaded; the log holds every tab's events, so whatever is drained is kept per tab.
+    """
+
+    def __init__(self, driver):
+        self.driver = driver
+        self.available = True
+        self._chains = {}  # target id -> [chain, ...] in the order requests started
+        self._by_request = {}  # (target id, request id) -> chain
+        self._seq = 0  # Requests seen so far
+        self._begun = {}  # target id -> requests seen when it last navigated
+
+    def begin(self, handle=None):
+        """Forget what the tab (the current one by default) loaded before - it is about to navigate"""
+        self._collect()
+        if not self.available:
+            return
+        tab = target_id(handle or self.driver.current_window_handle)
+        for chain in self._chains.pop(tab, []):
+            self._by_request.pop((tab, chain['request_id']), None)
+        self._begun[tab] = self._seq
+
+    def response(self, handle=None):
+        """{'status', 'url', 'redirects', 'response_ms'} of the tab's navigation since begin(), or None"""
+        self._collect()
+        if not self.available:
+            return None
+        tab = target_id(handle or self.driver.current_window_handle)
+        chains = self._chains.get(tab)
+        if not chains and len(self._chains) == 1:
+            chains = next(iter(self._chains.values()))  # Handles that aren't target ids - only one tab anyway
+        chains = [c for c in chains or [] if c['seq'] > self._begun.get(tab, 0)]
+        if not chains:
+            return None
+
+        chain = next((c for c in chains if c['main']), chains[0])
+        if chain['status'] is None:
+            return None
+        return {
+            'status': chain['status'],
+            'url': chain['final_url'],
+            'redirects': chain['redirects'],
+            'response_ms': chain['response_ms'],
+        }
+
+    def _collect(self):
+        if not self.available:
+            return
+        try:
+            entries = self.driver.get_log('performance')
+        except Exception as e:
+            logger.warning(f"⚠️ Performance log unavailable - HTTP status capture off for this browser: {e}")
+            self.available = False
+            return
+
+        for entry in entries:
+            message = entry.get('message', '')
+            if '"Document"' not in message or not any(event in message for event in _DOCUMENT_EVENTS):
+                continue
+            try:
+                payload = json.loads(message)
+            except ValueError:
+                continue
+            self._record(payload.get('webview'), payload.get('message', {}))
+
+    def _record(self, tab, event):
+        method, params = event.get('method'), event.get('params', {})
+        if params.get('type') != 'Document':
+            return
+        key = (tab, params.get('requestId'))
+
+        if method == 'Network.requestWillBeSent':
+            chain = self._by_request.get(key)
+            redirect = params.get('redirectResponse')
+            if chain is not None and redirect:
+                chain['redirects'].append([redirect.get('url'), redirect.get('status')])
+                return
+
+            self._seq += 1
+            chain = {'seq': self._seq, 'request_id': params.get('requestId'), 'main': params.get('frameId') == tab,
+                     'url': params.get('request', {}).get('url'), 'started': params.get('timestamp'),
+                     'redirects': [], 'status': None, 'final_url': None, 'response_ms': None}
+            chains = self._chains.setdefault(tab, [])
+            chains.append(chain)
+            self._by_request[key] = chain
+            if len(chains) > MAX_CHAINS_PER_TAB:
+                dropped = chains.pop(0)
+                self._by_request.pop((tab, dropped['request_id']), None)
+
+        elif method == 'Network.responseReceived':
+            chain = self._by_request.get(key)
+            if chain is None or chain['status'] is not None:
+                return
+            response = params.get('response', {})
+            chain['status'] = int(response['status']) if response.get('status') is not None else None
+            chain['final_url'] = response.get('url')
+            if chain['started'] is not None and params.get('timestamp') is not None:
+                chain['response_ms'] = round((params['timestamp'] - chain['started']) * 1000, 1)
@@ -0,0 +1,102 @@
+import os
+import time
+import threading
+import logging
+
+# watchdog is optional at runtime - without it the worker falls back to polling
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+
+    WATCHDOG_AVAILABLE = True
+except ImportError:
+    Observer = None
+    FileSystemEventHandler = object
+    WATCHDOG_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+SESSIONS_DIR = "sessions"
+WAKEUP_FILENAME = "worker_wakeup.signal"
+
+# Files in sessions/ that mean "the worker has something to do"
+SIGNAL_PREFIXES = ('auth_ready_', 'session_data_', WAKEUP_FILENAME)
+
+
+def notify_worker(reason="job_created", sessions_dir=SESSIONS_DIR):
+    """Wake the background worker by touching the wakeup file it watches"""
+    try:
+        os.makedirs(sessions_dir, exist_ok=True)
+        with open(os.path.join(sessions_dir, WAKEUP_FILENAME), 'w') as f:
+            f.write(f"{reason} at {time.time()}\n")
+    except Exception as e:
+        # Never fail the caller - the worker's fallback poll will pick the job up anyway
+        logger.debug(f"Could not signal worker: {e}")
+
+
+class _SessionsDirHandler(FileSystemEventHandler):
+    """Sets the listener event whenever a signal file appears or changes"""
+
+    def __init__(self, event):
+        super().__init__()
+        self.event = event
+
+    def on_any_event(self, event):
+        if event.is_directory or event.event_type == 'deleted':
+            return
+
+        path = getattr(event, 'dest_path', None) or event.src_path
+        if os.path.basename(path).startswith(SIGNAL_PREFIXES):
+            self.event.set()
+
+
+class JobSignalListener:
+    """Blocks the worker loop until a job or authentication signal arrives"""
+
+    def __init__(self, sessions_dir=SESSIONS_DIR):
+        self.sessions_dir = sessions_dir
+        self._event = threading.Event()
+        self._observer = None
+
+    @property
+    def is_watching(self):
+        return self._observer is not None
+
+    def start(self):
+        """Start watching the sessions directory. Returns False if only polling is possible."""
+        if not WATCHDOG_AVAILABLE:
+            logger.warning("⚠️ watchdog not installed - worker will poll for jobs")
+            return False
+
+        try:
+            os.makedirs(self.sessions_dir, exist_ok=True)
+            observer = Observer()
+            observer.schedule(_SessionsDirHandler(self._event), self.sessions_dir, recursive=False)
+            observer.daemon = True
+            observer.start()
+            self._observer = observer
+            logger.info(f"👀 Watching {self.sessions_dir}/ for job and auth signals")
+            return True
+        except Exception as e:
+            logger.warning(f"⚠️ Could not start sessions watcher, falling back to polling: {e}")
+            self._observer = None
+            return False
+
+    def wait(self, timeout):
+        """Wait until signalled or timeout expires. Returns True if a signal arrived."""
+        signalled = self._event.wait(timeout)
+        self._event.clear()
+        return signalled
+
+    def signal(self):
+        """Wake the waiting worker loop from within the same process"""
+        self._event.set()
+
+    def stop(self):
+        if self._observer is not None:
+            try:
+                self._observer.stop()
+                self._observer.join(timeout=5)
+            except Exception as e:
+                logger.debug(f"Error stopping sessions watcher: {e}")
+            self._observer = None
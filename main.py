@@ -2,16 +2,24 @@ import logging
 import streamlit as st
 import pandas as pd
 import os
-import zipfile
 import time
 import json
 import shutil
 import re
 from datetime import datetime
-from io import BytesIO
-from PIL import Image
 # import yaml
-from database import DatabaseManager, User, TestRun
+from database import DatabaseManager, User, TestRun, ResultVerdict, TestShard, RunProgress
+from url_source import resolve_metadata_columns
+from upload_cache import open_upload_preview, open_url_source
+from results_cache import load_results_frame, load_run_analytics, load_gallery_index
+from thumbnails import ensure_thumbnails
+from file_server import FileServer
+from exports import ExportManager, RESULT_EXPORT_FORMATS
+from metrics import worker_last_loop
+from page_snapshots import load_snapshot, remove_run_snapshots
+from session_store import SessionStore, domain_for_url, looks_like_login
+from scheduler import PRIORITIES, DEFAULT_PRIORITY, MAX_SHARDS
+from progress_feed import ProgressFeed, PROGRESS_POLL_SECONDS, ACTIVE_STATUSES
 
 # CORRECT - No Streamlit commands in import section
 try:
@@ -143,6 +151,43 @@ def get_db_manager():
 
 db_manager = get_db_manager()
 
+
+# Screenshots are streamed by a separate file server so they never pass through the websocket
+@st.cache_resource
+def get_file_server():
+    server = FileServer()
+    server.start()
+    return server
+
+
+file_server = get_file_server()
+
+
+@st.cache_resource
+def get_export_manager():
+    return ExportManager()
+
+
+export_manager = get_export_manager()
+
+# Sessions captured by earlier logins, shared with the worker by tenant domain
+session_store = SessionStore()
+
+
+def run_domain(test_run):
+    """Tenant host of a run's URLs, or None if the upload can't be read"""
+    try:
+        return domain_for_url(open_url_source(test_run).first_valid_url())
+    except Exception:
+        return None
+
+
+def file_link(path, download_name=None):
+    """Signed file server URL for a result file, or None if the server isn't running"""
+    if not file_server.is_running:
+        return None
+    return file_server.url_for(path, download_name)
+
 # Hardcoded SQL Query
 
 
@@ -256,6 +301,29 @@ def save_uploaded_file(uploaded_file):
         return None
 
 
+def backfill_result_metadata(test_run):
+    """One-time copy of MenuSet/MenuType/Caption from the upload into results of older runs"""
+    try:
+        source = open_url_source(test_run)
+        if not source.exists():
+            return
+
+        mapping = resolve_metadata_columns(source.columns(), exclude=test_run.url_column)
+        fields = {field: column for field, column in mapping.items() if column}
+        tested_rows = set(db_manager.get_test_results_frame(test_run.id)['row_number'])
+
+        empty = {field: None for field in mapping}
+        rows = (
+            {**empty, **{field: metadata.get(column) for field, column in fields.items()}, 'row_number': row_number}
+            for row_number, _, metadata in source.iter_rows(metadata_columns=list(fields.values()))
+            if row_number in tested_rows
+        )
+        with st.spinner("Indexing row metadata for this test (one-time)..."):
+            db_manager.update_result_metadata(test_run.id, mapping, rows)
+    except Exception as e:
+        logger.warning(f"Metadata backfill failed for test {test_run.id}: {e}")
+
+
 def delete_single_test(test_id):
     """Delete a single test and all its data"""
     try:
@@ -268,6 +336,9 @@ def delete_single_test(test_id):
         results = db_manager.get_test_results(test_id)
         for result in results:
             db_manager.session.delete(result)
+        db_manager.session.query(ResultVerdict).filter_by(test_run_id=test_id).delete()
+        db_manager.session.query(TestShard).filter_by(test_run_id=test_id).delete()
+        db_manager.session.query(RunProgress).filter_by(test_run_id=test_id).delete()
 
         # Delete test run
         db_manager.session.delete(test_run)
@@ -276,8 +347,10 @@ def delete_single_test(test_id):
         screenshots_dir = f"screenshots/test_{test_id}"
         if os.path.exists(screenshots_dir):
             shutil.rmtree(screenshots_dir)
+        export_manager.remove_run(test_id)
 
         db_manager.session.commit()
+        remove_run_snapshots(db_manager, test_id)
         return True
 
     except Exception as e:
@@ -461,6 +534,32 @@ def get_button_position(current_page):
     return page_positions.get(current_page, 1)
 
 
+# =============================================================================
+# LIVE PROGRESS
+# =============================================================================
+
+@st.fragment(run_every=PROGRESS_POLL_SECONDS)
+def show_live_progress(active_runs):
+    """Progress bars for active runs - refreshed on their own, without rerunning the page"""
+    feed = st.session_state.get('progress_feed')
+    if feed is None or feed.user_id != st.session_state.user_id:
+        feed = st.session_state.progress_feed = ProgressFeed(db_manager, st.session_state.user_id)
+
+    if feed.poll() & {t.id for t in active_runs}:
+        # A run finished, paused or was parked - the rest of the page needs the new state
+        db_manager.session.expire_all()
+        st.rerun()
+
+    st.subheader("Live Progress")
+    for test in active_runs:
+        row = feed.get(test)
+        progress = min(max(row['progress'] or 0.0, 0.0), 100.0)
+        processed = row['processed'] if row['processed'] is not None else round(progress * (test.total_urls or 0) / 100)
+        label = {'running': 'Running', 'waiting_login': 'Waiting Auth'}.get(row['status'], 'Pending')
+        st.progress(progress / 100, text=f"**{test.test_name}** - {label}: {processed}/{test.total_urls} URLs "
+                                         f"({progress:.0f}%) · P:{row['passed']} F:{row['failed']}")
+
+
 # =============================================================================
 # DASHBOARD OVERVIEW
 # =============================================================================
@@ -494,6 +593,10 @@ def show_dashboard():
     with col4:
         st.metric("Failed", failed_tests)
 
+    active_runs = [t for t in test_runs if t.status in ACTIVE_STATUSES]
+    if active_runs:
+        show_live_progress(active_runs)
+
     # Recent activity
     st.subheader("Recent Activity")
 
@@ -517,6 +620,9 @@ def show_dashboard():
                     st.markdown(f'<div class="job-status-failed">Failed</div>', unsafe_allow_html=True)
                 elif test.status == 'waiting_login':
                     st.markdown(f'<div class="job-status-waiting">Waiting Auth</div>', unsafe_allow_html=True)
+                elif test.status == 'parked':
+                    st.markdown(f'<div class="job-status-failed">Parked</div>', unsafe_allow_html=True)
+                    st.caption(test.status_reason or "")
                 else:
                     st.markdown(f'<div class="job-status-pending">Pending</div>', unsafe_allow_html=True)
 
@@ -533,6 +639,10 @@ def show_dashboard():
                     if st.button(f"Auth", key=f"auth_dash_{test.id}"):
                         st.session_state.current_page = 'manual_auth'
                         st.rerun()
+                elif test.status == 'parked':
+                    if st.button(f"Resume", key=f"resume_dash_{test.id}"):
+                        db_manager.resume_parked_run(test.id)
+                        st.rerun()
 
         st.markdown("---")
 
@@ -604,21 +714,20 @@ def show_new_test():
     # Process uploaded file
     if uploaded_file is not None:
         try:
-            # Read and preview file
+            # Parse once per distinct file content - reruns just memory-map the cached columnar copy
             with st.spinner("Processing file..."):
-                if uploaded_file.name.endswith('.csv'):
-                    df = pd.read_csv(uploaded_file)
-                else:
-                    df = pd.read_excel(uploaded_file)
+                parsed_filename, upload = open_upload_preview(uploaded_file, file_name=uploaded_file.name)
 
-            st.success(f"File loaded: {len(df)} rows, {len(df.columns)} columns")
+            total_rows = upload.num_rows
+            upload_columns = upload.columns
+            st.success(f"File loaded: {total_rows} rows, {len(upload_columns)} columns")
 
             # Step 3: Column Selection (renumbered from Step 4)
             st.subheader("3. Select URL Column")
 
             # Detect potential URL columns
             potential_url_columns = []
-            for col in df.columns:
+            for col in upload_columns:
                 if any(keyword in col.lower() for keyword in ['url', 'link', 'web', 'site', 'href', 'slink']):
                     potential_url_columns.append(col)
 
@@ -627,29 +736,30 @@ def show_new_test():
 
             url_column = st.selectbox(
                 "Select the column containing URLs/Links",
-                options=df.columns.tolist(),
-                index=df.columns.tolist().index(potential_url_columns[0]) if potential_url_columns else 0,
+                options=upload_columns,
+                index=upload_columns.index(potential_url_columns[0]) if potential_url_columns else 0,
                 help="Choose the column that contains the URLs you want to test"
             )
 
             # Step 4: Preview and Validation (renumbered from Step 5)
             st.subheader("4. Preview & Validation")
 
-            # URL analysis
-            valid_urls = df[url_column].dropna().astype(str)
-            http_urls = [str(u) for u in valid_urls if str(u).startswith("http")]
+            # URL analysis - counted on the URL column only
+            valid_url_count = upload.count_valid_urls(url_column)
+            sample_urls = upload.valid_urls(url_column, limit=5)
 
             col1, col2, col3 = st.columns(3)
             with col1:
-                st.metric("Total Rows", len(df))
+                st.metric("Total Rows", total_rows)
             with col2:
-                st.metric("Valid URLs", len(http_urls))
+                st.metric("Valid URLs", valid_url_count)
             with col3:
-                st.metric("URL Coverage", f"{len(http_urls) / len(df) * 100:.1f}%")
+                coverage = valid_url_count / total_rows * 100 if total_rows else 0
+                st.metric("URL Coverage", f"{coverage:.1f}%")
 
             # Data preview
             st.write("**Data Preview:**")
-            preview_df = df.head(3).copy()  # REDUCED from 5 to 3 for speed
+            preview_df = upload.head(3).copy()  # REDUCED from 5 to 3 for speed
             if url_column in preview_df.columns:
                 preview_df[url_column] = preview_df[url_column].astype(str).apply(
                     lambda x: x[:40] + "..." if len(str(x)) > 40 else str(x)  # REDUCED from 50 to 40
@@ -657,13 +767,12 @@ def show_new_test():
             st.dataframe(preview_df, use_container_width=True)
 
             # Sample URLs - REDUCED
-            if len(http_urls) > 0:
+            if valid_url_count > 0:
                 with st.expander("Sample URLs to be tested"):
-                    sample_urls = http_urls[:5]  # REDUCED from 10 to 5
-                    for i, url in enumerate(sample_urls, 1):
+                    for i, url in enumerate(sample_urls, 1):  # REDUCED from 10 to 5
                         st.text(f"{i}. {url}")
-                    if len(http_urls) > 5:
-                        st.text(f"... and {len(http_urls) - 5} more URLs")
+                    if valid_url_count > 5:
+                        st.text(f"... and {valid_url_count - 5} more URLs")
 
                 # Step 5: Submit Test (renumbered from Step 6)
                 st.subheader("5. Submit Test")
@@ -674,7 +783,7 @@ def show_new_test():
 
                 # FIXED: Faster time estimates
                 time_per_url = 2  # Fixed time estimate for content analysis only
-                total_time_seconds = time_per_url * len(http_urls)
+                total_time_seconds = time_per_url * valid_url_count
 
                 if total_time_seconds < 60:
                     time_estimate = f"{total_time_seconds} seconds"
@@ -686,12 +795,31 @@ def show_new_test():
                 # SIMPLIFIED: Show only essential info
                 col1, col2 = st.columns(2)
                 with col1:
-                    st.info(f"**URLs to test**: {len(http_urls)}")
+                    st.info(f"**URLs to test**: {valid_url_count}")
                 with col2:
                     st.info(f"**Estimated time**: {time_estimate}")
 
+                capture_snapshots = st.checkbox(
+                    "Capture page snapshots",
+                    help="Store each page's source and visible text (compressed) so results can be "
+                         "re-analysed and debugged later without re-testing"
+                )
+
+                col1, col2 = st.columns(2)
+                with col1:
+                    priority = st.selectbox(
+                        "Priority", PRIORITIES, index=PRIORITIES.index(DEFAULT_PRIORITY),
+                        format_func=str.capitalize,
+                        help="Share of your worker time this job gets next to your other running jobs"
+                    )
+                with col2:
+                    shard_count = st.number_input(
+                        "Worker shards", min_value=1, max_value=max(1, min(MAX_SHARDS, valid_url_count)), value=1,
+                        help="Split the job into row ranges that separate worker processes test in parallel"
+                    )
+
                 # FIXED: Submit button with proper validation
-                if form_valid and len(http_urls) > 0:
+                if form_valid and valid_url_count > 0:
                     if st.button("Start Test Job", type="primary", use_container_width=True):
                         try:
                             with st.spinner("Submitting test job..."):
@@ -725,10 +853,15 @@ def show_new_test():
                                     user_id=st.session_state.user_id,
                                     database_name=database_name.strip(),
                                     test_name=test_name.strip(),
-                                    total_urls=len(http_urls),
+                                    total_urls=valid_url_count,
                                     url_column=url_column,
                                     uploaded_filename=saved_filename,
-                                    config_filename=config_filename
+                                    config_filename=config_filename,
+                                    parsed_filename=parsed_filename,
+                                    metadata_columns=resolve_metadata_columns(upload_columns, exclude=url_column),
+                                    capture_snapshots=capture_snapshots,
+                                    priority=priority,
+                                    shard_count=int(shard_count)
                                 )
 
                                 st.success(f"Test job submitted successfully! Job ID: {test_run_id}")
@@ -745,7 +878,7 @@ def show_new_test():
                 else:
                     if not form_valid:
                         st.error("Please provide a test name before submitting.")
-                    elif len(http_urls) == 0:
+                    elif valid_url_count == 0:
                         st.error("No valid HTTP URLs found in the selected column.")
 
             else:
@@ -800,6 +933,9 @@ def show_manual_authentication():
                 st.info(f"**Database**: {test.database_name}")
                 st.info(f"**URLs to test**: {test.total_urls}")
                 st.info(f"**Created**: {test.created_date.strftime('%Y-%m-%d %H:%M')}")
+                if test.resume_from_row:
+                    st.warning(f"Session expired at row {test.resume_from_row + 1} - log in again to continue "
+                               f"from there. Rows already tested are kept.")
 
             with col2:
                 st.metric("⏱️ Status", "Waiting for Auth")
@@ -808,6 +944,18 @@ def show_manual_authentication():
                     st.caption(f"Progress: {test.progress:.0f}%")
 
             with col3:
+                domain = run_domain(test)
+                stored = session_store.entry(domain) if domain else None
+                if stored:
+                    expires = datetime.fromtimestamp(stored['expires_at']).strftime('%H:%M')
+                    st.success(f"Reusing saved {domain} session")
+                    st.caption(f"Starts automatically - session kept until {expires}. Log in again only if "
+                               f"the worker reports it expired.")
+                elif domain and session_store.logged_out_at(domain):
+                    logged_out = datetime.fromtimestamp(session_store.logged_out_at(domain)).strftime('%H:%M')
+                    st.error(f"Saved {domain} session expired")
+                    st.caption(f"The worker found it logged out at {logged_out} - log in again to start this test.")
+
                 # Check if this test is currently being authenticated
                 auth_in_progress = (
                         'auth_test_id' in st.session_state and
@@ -870,22 +1018,11 @@ def show_authentication_flow():
         st.error("Test not found")
         return
 
-    # Get first URL for authentication
+    # Get first URL for authentication - streams the upload and stops at the first valid row
     try:
-        file_path = f"uploads/{test_run.uploaded_filename}"
-        if os.path.exists(file_path):
-            if test_run.uploaded_filename.endswith('.csv'):
-                df = pd.read_csv(file_path)
-            else:
-                df = pd.read_excel(file_path)
-
-            # Get first valid URL
-            first_url = None
-            for idx, row in df.iterrows():
-                url = str(row[test_run.url_column])
-                if url and url != 'nan' and url.lower() != 'none' and url.startswith("http"):
-                    first_url = url
-                    break
+        source = open_url_source(test_run)
+        if source.exists():
+            first_url = source.first_valid_url()
 
             if not first_url:
                 st.error("No valid URL found for authentication")
@@ -973,7 +1110,7 @@ def show_authentication_flow():
             if 'temp_auth_driver' in st.session_state:
                 try:
                     page_title = st.session_state.temp_auth_driver.title.lower()
-                    if any(indicator in page_title for indicator in ['login', 'sign in', 'authenticate', 'invalid']):
+                    if looks_like_login(page_title):
                         st.warning(f"Still on login page: {page_title}")
                         st.warning("Please complete authentication before proceeding.")
                     else:
@@ -990,8 +1127,7 @@ def show_authentication_flow():
                     # Verify authentication one more time
                     if 'temp_auth_driver' in st.session_state:
                         page_title = st.session_state.temp_auth_driver.title.lower()
-                        if any(indicator in page_title for indicator in
-                               ['login', 'sign in', 'authenticate', 'invalid']):
+                        if looks_like_login(page_title):
                             st.error(" Still on login page. Please complete authentication first.")
                             return
 
@@ -1155,9 +1291,14 @@ def ensure_background_worker():
             st.error(" background_worker.py file not found in current directory")
             return False
 
-        # Check if worker is already running by looking for recent log activity
+        # A running worker answers on its metrics endpoint - idle workers still loop every 30s
+        last_loop = worker_last_loop()
+        if last_loop is not None and time.time() - last_loop < 120:
+            st.success(" Background worker is running")
+            return True
+
+        # Older workers without the endpoint - fall back to recent log activity
         if os.path.exists("worker.log"):
-            import time
             log_time = os.path.getmtime("worker.log")
             current_time = time.time()
             if current_time - log_time < 60:  # 1 minute
@@ -1203,6 +1344,10 @@ def show_test_history():
         st.info("No tests found. Create your first test in the 'New Test' tab.")
         return
 
+    active_runs = [t for t in test_runs if t.status in ACTIVE_STATUSES]
+    if active_runs:
+        show_live_progress(active_runs)
+
     # Initialize session state for selected tests if not exists
     if 'selected_tests' not in st.session_state:
         st.session_state.selected_tests = []
@@ -1215,7 +1360,7 @@ def show_test_history():
         selected_db = st.selectbox("Filter by Database", ["All"] + databases)
 
     with col2:
-        statuses = ["All", "completed", "running", "pending", "waiting_login", "failed"]
+        statuses = ["All", "completed", "running", "pending", "waiting_login", "parked", "failed"]
         selected_status = st.selectbox("Filter by Status", statuses)
 
     with col3:
@@ -1326,8 +1471,12 @@ def show_test_history():
 
     st.info(f"Showing {len(filtered_tests)} of {len(test_runs)} tests")
 
+    # Result counts for every run in one grouped query
+    result_counts = db_manager.get_result_status_counts(st.session_state.user_id)
+
     # Display tests with checkboxes
     for test in filtered_tests:
+        counts = result_counts.get(test.id, {'total': 0})
         with st.container():
             # Create columns: Checkbox, Test Info, Status, Date, Results, Action
             col1, col2, col3, col4, col5, col6 = st.columns([0.5, 3, 2, 2, 2, 1])
@@ -1352,22 +1501,27 @@ def show_test_history():
                 if test.status == 'running':
                     st.markdown(f'<div class="job-status-running">In-Progress ({test.progress:.0f}%)</div>',
                                 unsafe_allow_html=True)
+                    if (test.shard_count or 1) > 1:
+                        shards = db_manager.get_shards(test.id)
+                        st.caption(f"Shards: {sum(s.status == 'completed' for s in shards)}/{len(shards)} done, "
+                                   f"{sum(s.status == 'claimed' for s in shards)} running")
                 elif test.status == 'completed':
                     st.markdown(f'<div class="job-status-completed">Completed</div>', unsafe_allow_html=True)
                     if test.success_rate is not None:
                         st.caption(f"Success: {test.success_rate:.1f}%")
                 elif test.status == 'failed':
                     # Check if it has results but marked as failed
-                    results = db_manager.get_test_results(test.id)
-                    if results:
+                    if counts['total']:
                         st.markdown(f'<div class="job-status-completed">Completed</div>', unsafe_allow_html=True)
-                        passed = len([r for r in results if r.status == 'PASS'])
-                        failed = len([r for r in results if r.status == 'FAIL'])
-                        st.caption(f"P:{passed} F:{failed}")
+                        st.caption(f"P:{counts.get('PASS', 0)} F:{counts.get('FAIL', 0)}")
                     else:
                         st.markdown(f'<div class="job-status-failed">Failed</div>', unsafe_allow_html=True)
                 elif test.status == 'waiting_login':
                     st.markdown(f'<div class="job-status-waiting">Waiting Auth</div>', unsafe_allow_html=True)
+                elif test.status == 'parked':
+                    st.markdown(f'<div class="job-status-failed">Parked</div>', unsafe_allow_html=True)
+                    if test.status_reason:
+                        st.caption(test.status_reason)
                 else:
                     st.markdown(f'<div class="job-status-pending">Pending</div>', unsafe_allow_html=True)
 
@@ -1377,13 +1531,10 @@ def show_test_history():
 
             with col5:
                 # Show results summary
-                results = db_manager.get_test_results(test.id)
-                if results:
-                    passed = len([r for r in results if r.status == 'PASS'])
-                    failed = len([r for r in results if r.status == 'FAIL'])
-                    st.write(f"Processed: {len(results)}")
-                    st.caption(f"Passed: {passed}")
-                    st.caption(f"Failed: {failed}")
+                if counts['total']:
+                    st.write(f"Processed: {counts['total']}")
+                    st.caption(f"Passed: {counts.get('PASS', 0)}")
+                    st.caption(f"Failed: {counts.get('FAIL', 0)}")
                 elif test.status == 'completed':
                     st.write(f"Passed: {test.passed}")
                     st.write(f"Failed: {test.failed}")
@@ -1391,9 +1542,15 @@ def show_test_history():
                         st.caption(f"Skipped: {test.skipped}")
 
             with col6:
-                # Action button (View or Auth)
-                results = db_manager.get_test_results(test.id)
-                if results:
+                # Action button (Resume, View or Auth)
+                if test.status == 'parked':
+                    if st.button("Resume", key=f"resume_{test.id}", help="Test the remaining rows",
+                                 use_container_width=True):
+                        db_manager.resume_parked_run(test.id)
+                        st.success(f"Test will resume at row {(test.resume_from_row or 0) + 1}")
+                        time.sleep(1)
+                        st.rerun()
+                elif counts['total']:
                     if st.button("View", key=f"view_{test.id}", help="View Results", use_container_width=True):
                         st.session_state.selected_test_id = test.id
                         st.session_state.current_page = 'view_results'
@@ -1418,28 +1575,13 @@ def show_test_history():
 def show_view_results():
     """Enhanced results viewing with test selection capability"""
 
-    # Get all user's tests with results
+    # Get all user's tests with results - one grouped query instead of one per run
     user_tests = db_manager.get_user_test_runs(st.session_state.user_id)
-    tests_with_results = []
-
-    for test in user_tests:
-        try:
-            # Check if test has results
-            if hasattr(db_manager, 'get_test_results'):
-                results = db_manager.get_test_results(test.id)
-            else:
-                from database import TestResult
-                results = db_manager.session.query(TestResult).filter(
-                    TestResult.test_run_id == test.id
-                ).all()
-
-            if results and len(results) > 0:
-                tests_with_results.append({
-                    'test': test,
-                    'results_count': len(results)
-                })
-        except:
-            continue
+    result_counts = db_manager.get_result_status_counts(st.session_state.user_id)
+    tests_with_results = [
+        {'test': test, 'results_count': result_counts[test.id]['total']}
+        for test in user_tests if test.id in result_counts
+    ]
 
     if not tests_with_results:
         st.error("No tests with results found")
@@ -1499,16 +1641,15 @@ def show_view_results():
     st.info(
         f"**Viewing:** {test_run.test_name} | **Database:** {test_run.database_name} | **Date:** {test_run.created_date.strftime('%Y-%m-%d %H:%M')} | **Test ID:** {test_run.id}")
 
-    # Get results for the selected test
-    try:
-        if hasattr(db_manager, 'get_test_results'):
-            results = db_manager.get_test_results(selected_test_id)
-        else:
-            from database import TestResult
-            results = db_manager.session.query(TestResult).filter(
-                TestResult.test_run_id == selected_test_id
-            ).order_by(TestResult.row_number).all()
+    # Runs from before row metadata was stored at ingest get a one-time backfill
+    if not test_run.metadata_columns:
+        backfill_result_metadata(test_run)
 
+    # Everything below is served from the cache until the worker bumps the run version
+    try:
+        run_version = db_manager.get_run_version(selected_test_id)
+        frame = load_results_frame(db_manager, selected_test_id, run_version)
+        analytics = load_run_analytics(db_manager, selected_test_id, run_version)
     except Exception as e:
         st.error(f"Error retrieving results: {e}")
 
@@ -1517,600 +1658,476 @@ def show_view_results():
             st.write(f"Test ID: {selected_test_id}")
             st.write(f"Error: {str(e)}")
             st.write(f"Database Manager Type: {type(db_manager)}")
-
-            # Try to show available methods
-            try:
-                methods = [method for method in dir(db_manager) if not method.startswith('_')]
-                st.write(f"Available DB methods: {methods}")
-            except:
-                pass
-
-            # Try alternative query approach
-            try:
-                st.write("Attempting alternative query...")
-                all_results = db_manager.session.execute(
-                    "SELECT * FROM test_results WHERE test_run_id = ?",
-                    (selected_test_id,)
-                ).fetchall()
-                st.write(f"Found {len(all_results)} results using raw SQL")
-            except Exception as e2:
-                st.write(f"Raw SQL also failed: {e2}")
         return
 
-    if not results:
+    if frame.empty:
         st.warning(f"No results found for test ID {selected_test_id}")
         return
 
-    # Load original file for additional columns
-    original_df = None
-    try:
-        file_path = f"uploads/{test_run.uploaded_filename}"
-        if os.path.exists(file_path):
-            if test_run.uploaded_filename.endswith('.csv'):
-                original_df = pd.read_csv(file_path)
-            else:
-                original_df = pd.read_excel(file_path)
-    except Exception as e:
-        st.warning(f"Could not load original file: {e}")
-
-    # Verification: Ensure all results belong to selected test
-    results_test_ids = list(set([r.test_run_id for r in results]))
-    if len(results_test_ids) > 1 or (results_test_ids and results_test_ids[0] != selected_test_id):
-        st.error(f"Data integrity issue: Results contain data from multiple tests: {results_test_ids}")
-        st.error(f"Expected only test ID: {selected_test_id}")
-        return
-
     # Success message
-    st.success(f"Showing {len(results)} results for: {test_run.test_name}")
+    total = analytics['total']
+    st.success(f"Showing {total} results for: {test_run.test_name}")
 
     # Enhanced Statistics Dashboard
     col1, col2, col3, col4, col5 = st.columns(5)
 
-    passed_count = len([r for r in results if r.status == 'PASS'])
-    failed_count = len([r for r in results if r.status == 'FAIL'])
-    screenshot_count = len([r for r in results if r.screenshot_filename])
+    passed_count = analytics['passed']
+    failed_count = analytics['failed']
+    screenshot_count = analytics['screenshots']
 
     with col1:
-        st.metric("Total URLs", len(results))
+        st.metric("Total URLs", total)
     with col2:
-        st.metric("Passed", passed_count, delta=f"{(passed_count / len(results) * 100):.1f}%")
+        st.metric("Passed", passed_count, delta=f"{(passed_count / total * 100):.1f}%")
     with col3:
-        st.metric("Failed", failed_count, delta=f"{(failed_count / len(results) * 100):.1f}%")
+        st.metric("Failed", failed_count, delta=f"{(failed_count / total * 100):.1f}%")
     with col4:
-        st.metric("Screenshots", screenshot_count, delta=f"{(screenshot_count / len(results) * 100):.1f}%")
+        st.metric("Screenshots", screenshot_count, delta=f"{(screenshot_count / total * 100):.1f}%")
     with col5:
-        success_rate = (passed_count / len(results)) * 100 if results else 0
+        success_rate = (passed_count / total) * 100 if total else 0
         st.metric("Success Rate", f"{success_rate:.1f}%")
 
-    # Tabs for different views
-    tab1, tab2, tab3, tab4, tab5 = st.tabs(["Summary", "Analytics", "Screenshots", "Failed Analysis", "Downloads"])
-
-    with tab1:
-        # SUMMARY TAB CONTENT
-        st.subheader("Test Results Summary")
+    # Only the selected view is built - st.tabs would render every tab on each rerun
+    selected_view = st.radio(
+        "View",
+        ["Summary", "Analytics", "Screenshots", "Failed Analysis", "Downloads"],
+        horizontal=True,
+        key="results_view_tab",
+        label_visibility="collapsed"
+    )
 
-        # Create results dataframe for display
-        results_data = []
-        for result in results:
-            # Get additional data from original file
-            smenu_type = ""
-            caption = ""
-            if original_df is not None and result.row_number < len(original_df):
-                try:
-                    row_data = original_df.iloc[result.row_number]
-
-                    # Look for smenuType column variants
-                    smenu_cols = ['smenuType', 'sMenuType', 'MenuType', 'Type', 'smenuttype', 'menu_type']
-                    for col in smenu_cols:
-                        if col in original_df.columns and pd.notna(row_data[col]):
-                            smenu_type = str(row_data[col])
-                            break
-
-                    # Look for Caption column variants
-                    caption_cols = ['Caption', 'caption', 'Description', 'Name', 'Title']
-                    for col in caption_cols:
-                        if col in original_df.columns and pd.notna(row_data[col]):
-                            caption = str(row_data[col])
-                            break
-                except:
-                    pass
+    if selected_view == "Summary":
+        show_results_summary(frame)
+    elif selected_view == "Analytics":
+        show_results_analytics(analytics)
+    elif selected_view == "Screenshots":
+        show_screenshot_gallery(test_run, run_version, load_gallery_index(db_manager, selected_test_id, run_version))
+    elif selected_view == "Failed Analysis":
+        show_failed_analysis(test_run, frame)
+    elif selected_view == "Downloads":
+        show_result_downloads(test_run, run_version, analytics,
+                              load_gallery_index(db_manager, selected_test_id, run_version))
+
+
+def build_results_table(frame):
+    """Display table for the Summary tab, built with vectorised column operations"""
+    def truncate(series, length):
+        series = series.fillna("")
+        return series.where(series.str.len() <= length, series.str[:length] + "...")
+
+    return pd.DataFrame({
+        'Row': frame['row_number'] + 1,
+        'URL_Display': truncate(frame['url'], 80),
+        'Full_URL': frame['url'],
+        'Status': frame['status'],
+        'MenuType': frame['menu_type'].fillna(""),
+        'Caption': frame['caption'].fillna(""),
+        'Screenshot': frame['screenshot_filename'].fillna("No screenshot"),
+        'Error_Message': truncate(frame['error_message'], 100),
+        'Attempts': frame['attempts'].fillna(1).astype(int),
+        'HTTP': frame['http_status'].astype('Int64')
+    })
+
+
+def show_results_summary(frame):
+    """Summary tab"""
+    st.subheader("Test Results Summary")
+
+    df = build_results_table(frame)
+
+    # Filter options
+    col1, col2 = st.columns(2)
+    with col1:
+        status_filter = st.selectbox("Filter by Status", ["All", "PASS", "FAIL"])
+    with col2:
+        screenshot_filter = st.selectbox("Filter by Screenshot", ["All", "With Screenshots", "No Screenshots"])
+
+    # Apply filters
+    filtered_df = df
+    if status_filter != "All":
+        filtered_df = filtered_df[filtered_df['Status'] == status_filter]
+    if screenshot_filter == "With Screenshots":
+        filtered_df = filtered_df[filtered_df['Screenshot'] != "No screenshot"]
+    elif screenshot_filter == "No Screenshots":
+        filtered_df = filtered_df[filtered_df['Screenshot'] == "No screenshot"]
+
+    st.info(f"Showing {len(filtered_df)} of {len(df)} results")
+
+    # Display results table
+    display_df = filtered_df[
+        ['Row', 'Full_URL', 'Status', 'HTTP', 'MenuType', 'Caption', 'Screenshot', 'Error_Message', 'Attempts']].copy()
+
+    # Rename columns for better display
+    display_df.columns = ['Row #', 'Complete URL', 'Status', 'HTTP', 'Menu Type', 'Caption', 'Screenshot Filename',
+                          'Error Details', 'Attempts']
+
+    st.dataframe(
+        display_df,
+        use_container_width=True,
+        column_config={
+            "Row #": st.column_config.NumberColumn("Row #", width="small"),
+            "Complete URL": st.column_config.TextColumn("Complete URL", width="large"),
+            "Status": st.column_config.TextColumn("Status", width="small"),
+            "HTTP": st.column_config.NumberColumn("HTTP", width="small", format="%d"),
+            "Menu Type": st.column_config.TextColumn("Menu Type", width="medium"),
+            "Caption": st.column_config.TextColumn("Caption", width="medium"),
+            "Screenshot Filename": st.column_config.TextColumn("Screenshot Filename", width="medium"),
+            "Error Details": st.column_config.TextColumn("Error Details", width="large"),
+            "Attempts": st.column_config.NumberColumn("Attempts", width="small")
+        },
+        hide_index=True
+    )
 
-            # Screenshot filename display
-            screenshot_display = ""
-            if result.screenshot_filename:
-                screenshot_display = result.screenshot_filename
-            else:
-                screenshot_display = "No screenshot"
-
-            results_data.append({
-                'Row': result.row_number + 1,
-                'URL_Display': result.url[:80] + "..." if len(result.url) > 80 else result.url,
-                'Full_URL': result.url,
-                'Status': result.status,
-                'MenuType': smenu_type,
-                'Caption': caption,
-                'Screenshot': screenshot_display,
-                'Error_Message': result.error_message[:100] + "..." if result.error_message and len(
-                    result.error_message) > 100 else (result.error_message or ""),
-                'Page_Title': result.page_title[:50] + "..." if result.page_title and len(result.page_title) > 50 else (
-                        result.page_title or ""),
-                'Screenshot_Filename': result.screenshot_filename or ""
-            })
-
-        df = pd.DataFrame(results_data)
-
-        # Filter options
-        col1, col2 = st.columns(2)
-        with col1:
-            status_filter = st.selectbox("Filter by Status", ["All", "PASS", "FAIL"])
-        with col2:
-            screenshot_filter = st.selectbox("Filter by Screenshot", ["All", "With Screenshots", "No Screenshots"])
 
-        # Apply filters
-        filtered_df = df.copy()
-        if status_filter != "All":
-            filtered_df = filtered_df[filtered_df['Status'] == status_filter]
-        if screenshot_filter == "With Screenshots":
-            filtered_df = filtered_df[filtered_df['Screenshot'] != "No screenshot"]
-        elif screenshot_filter == "No Screenshots":
-            filtered_df = filtered_df[filtered_df['Screenshot'] == "No screenshot"]
+def show_results_analytics(analytics):
+    """Analytics tab"""
+    st.subheader("Test Analytics")
 
-        st.info(f"Showing {len(filtered_df)} of {len(df)} results")
+    total = analytics['total']
+    col1, col2 = st.columns(2)
 
-        # Display results table
-        display_df = filtered_df[
-            ['Row', 'Full_URL', 'Status', 'MenuType', 'Caption', 'Screenshot', 'Error_Message']].copy()
+    with col1:
+        st.markdown("#### Error Distribution")
 
-        # Rename columns for better display
-        display_df.columns = ['Row #', 'Complete URL', 'Status', 'Menu Type', 'Caption', 'Screenshot Filename',
-                              'Error Details']
+        if analytics['failed']:
+            for error_type, count in analytics['error_types'].items():
+                percentage = (count / analytics['failed']) * 100
+                st.write(f"**{error_type}**: {count} ({percentage:.1f}%)")
+        else:
+            st.success("No errors found!")
 
+    with col2:
+        st.markdown("#### Test Coverage")
+
+        screenshot_coverage = (analytics['screenshots'] / total) * 100 if total else 0
+        st.write(f"**Screenshot Coverage**: {screenshot_coverage:.1f}%")
+
+        for status, count in analytics['status_counts'].items():
+            percentage = (count / total) * 100
+            st.write(f"**{status}**: {count} ({percentage:.1f}%)")
+
+    # Menu Type Analysis (if available) - aggregated by the database
+    menu_breakdown = analytics['menu_breakdown']
+    if any(row['menu_type'] for row in menu_breakdown):
+        st.markdown("#### Menu Type Analysis")
+        for row in menu_breakdown:
+            success_rate = (row['passed'] / row['total']) * 100 if row['total'] > 0 else 0
+            st.write(f"**{row['menu_type'] or 'Unknown'}**: {row['total']} total, {success_rate:.1f}% success rate")
+
+    # Where per-URL time goes - recorded by the worker for every URL
+    phase_timings = analytics['phase_timings']
+    if phase_timings:
+        st.markdown("#### Time per URL by Phase")
         st.dataframe(
-            display_df,
+            pd.DataFrame([
+                {'Phase': phase.replace('_', ' ').title(), 'Avg (ms)': stats['avg'], 'P50 (ms)': stats['p50'],
+                 'P95 (ms)': stats['p95'], 'Share of time': f"{stats['share']:.1f}%", 'URLs': stats['count']}
+                for phase, stats in phase_timings.items()
+            ]),
             use_container_width=True,
-            column_config={
-                "Row #": st.column_config.NumberColumn("Row #", width="small"),
-                "Complete URL": st.column_config.TextColumn("Complete URL", width="large"),
-                "Status": st.column_config.TextColumn("Status", width="small"),
-                "Menu Type": st.column_config.TextColumn("Menu Type", width="medium"),
-                "Caption": st.column_config.TextColumn("Caption", width="medium"),
-                "Screenshot Filename": st.column_config.TextColumn("Screenshot Filename", width="medium"),
-                "Error Details": st.column_config.TextColumn("Error Details", width="large")
-            },
             hide_index=True
         )
 
-    with tab2:
-        # ANALYTICS TAB CONTENT
-        st.subheader("Test Analytics")
 
-        col1, col2 = st.columns(2)
+def paginate(total_items, per_page, key):
+    """Page selector - returns the (start, end) slice for the current page"""
+    total_pages = max(1, (total_items + per_page - 1) // per_page)
+    page_key = f"{key}_page"
+    if st.session_state.get(page_key, 1) > total_pages:
+        st.session_state[page_key] = 1
 
-        with col1:
-            st.markdown("#### Error Distribution")
-            error_results = [r for r in results if r.status == 'FAIL']
-
-            if error_results:
-                error_types = {}
-                for result in error_results:
-                    if result.error_message:
-                        error_msg = result.error_message.lower()
-                        if 'timeout' in error_msg:
-                            error_types['Timeout'] = error_types.get('Timeout', 0) + 1
-                        elif 'not found' in error_msg or '404' in error_msg:
-                            error_types['Page Not Found'] = error_types.get('Page Not Found', 0) + 1
-                        elif 'access denied' in error_msg or 'forbidden' in error_msg:
-                            error_types['Access Denied'] = error_types.get('Access Denied', 0) + 1
-                        elif 'invalid' in error_msg:
-                            error_types['Invalid Page'] = error_types.get('Invalid Page', 0) + 1
-                        else:
-                            error_types['Other'] = error_types.get('Other', 0) + 1
-                    else:
-                        error_types['Unknown'] = error_types.get('Unknown', 0) + 1
+    col1, col2, col3 = st.columns([1, 2, 1])
+    with col1:
+        if st.button("◀ Previous", key=f"{key}_prev", disabled=st.session_state.get(page_key, 1) <= 1,
+                     use_container_width=True):
+            st.session_state[page_key] = st.session_state.get(page_key, 1) - 1
+    with col3:
+        if st.button("Next ▶", key=f"{key}_next", disabled=st.session_state.get(page_key, 1) >= total_pages,
+                     use_container_width=True):
+            st.session_state[page_key] = st.session_state.get(page_key, 1) + 1
+    with col2:
+        page = st.number_input(f"Page (of {total_pages})", min_value=1, max_value=total_pages, step=1,
+                               key=page_key)
+
+    start = (page - 1) * per_page
+    return start, min(start + per_page, total_items)
+
+
+def screenshot_path_for(test_run_id, screenshot_filename):
+    return f"screenshots/test_{test_run_id}/{screenshot_filename}"
 
-                for error_type, count in error_types.items():
-                    percentage = (count / len(error_results)) * 100
-                    st.write(f"**{error_type}**: {count} ({percentage:.1f}%)")
-            else:
-                st.success("No errors found!")
 
+def show_full_screenshot(test_run, result, state_key):
+    """Full-resolution view of one screenshot, only loaded when the user asks for it"""
+    screenshot_path = screenshot_path_for(test_run.id, result['screenshot_filename'])
+    with st.container():
+        col1, col2 = st.columns([4, 1])
+        with col1:
+            st.markdown(f"**Row {result['row_number'] + 1} - {result['status']}** | {result['url']}")
         with col2:
-            st.markdown("#### Test Coverage")
+            if st.button("Close", key=f"{state_key}_close", use_container_width=True):
+                del st.session_state[state_key]
+                st.rerun()
 
-            screenshot_coverage = (len([r for r in results if r.screenshot_filename]) / len(results)) * 100
-            st.write(f"**Screenshot Coverage**: {screenshot_coverage:.1f}%")
+        if not os.path.exists(screenshot_path):
+            st.warning("Screenshot file not found")
+            return
 
-            status_dist = {}
-            for result in results:
-                status_dist[result.status] = status_dist.get(result.status, 0) + 1
+        download_name = f"screenshot_row_{result['row_number'] + 1}.png"
+        image_url = file_link(screenshot_path)
+        if image_url:
+            # The browser fetches the image and download directly - no bytes in the session
+            st.image(image_url, use_container_width=True)
+            st.link_button("Download", file_link(screenshot_path, download_name))
+        else:
+            st.image(screenshot_path, use_container_width=True)
+            with open(screenshot_path, 'rb') as f:
+                st.download_button(
+                    "Download",
+                    f.read(),
+                    file_name=download_name,
+                    mime="image/png",
+                    key=f"{state_key}_download"
+                )
 
-            for status, count in status_dist.items():
-                percentage = (count / len(results)) * 100
-                st.write(f"**{status}**: {count} ({percentage:.1f}%)")
 
-        # Menu Type Analysis (if available)
-        if original_df is not None:
-            st.markdown("#### Menu Type Analysis")
-            menu_analysis = {}
-            for result in results:
-                if result.row_number < len(original_df):
-                    try:
-                        row_data = original_df.iloc[result.row_number]
-                        smenu_cols = ['smenuType', 'sMenuType', 'MenuType', 'Type']
-                        menu_type = "Unknown"
-                        for col in smenu_cols:
-                            if col in original_df.columns and pd.notna(row_data[col]):
-                                menu_type = str(row_data[col])
-                                break
-
-                        if menu_type not in menu_analysis:
-                            menu_analysis[menu_type] = {'total': 0, 'passed': 0, 'failed': 0}
-
-                        menu_analysis[menu_type]['total'] += 1
-                        if result.status == 'PASS':
-                            menu_analysis[menu_type]['passed'] += 1
-                        else:
-                            menu_analysis[menu_type]['failed'] += 1
-                    except:
-                        pass
+def show_screenshot_thumbnail(thumb_path, result, state_key):
+    """Thumbnail card image - clicking 'View full size' opens the original"""
+    if thumb_path:
+        st.image(file_link(thumb_path) or thumb_path, use_container_width=True)
+    else:
+        st.warning("Screenshot file not found")
+        return
 
-            if menu_analysis:
-                for menu_type, stats in menu_analysis.items():
-                    success_rate = (stats['passed'] / stats['total']) * 100 if stats['total'] > 0 else 0
-                    st.write(f"**{menu_type}**: {stats['total']} total, {success_rate:.1f}% success rate")
+    if st.button("View full size", key=f"{state_key}_{result['id']}", use_container_width=True):
+        st.session_state[state_key] = result['id']
+        st.rerun()
 
-    with tab3:
-        # SCREENSHOTS TAB CONTENT
-        st.subheader("Screenshots Gallery")
 
-        screenshot_results = [r for r in results if r.screenshot_filename]
+def show_export_download(job, label, download_name, mime, key):
+    """Download control for a finished background export - linked, or streamed from disk"""
+    url = file_link(job.path, download_name)
+    if url:
+        st.link_button(label, url, use_container_width=True)
+    else:
+        with open(job.path, 'rb') as f:
+            st.download_button(label, f, file_name=download_name, mime=mime, key=key,
+                               use_container_width=True)
 
-        if not screenshot_results:
-            st.info("No screenshots were captured for this test.")
-        else:
-            # Gallery controls
-            col1, col2, col3 = st.columns([1, 1, 2])
 
-            with col1:
-                gallery_filter = st.selectbox("Show Screenshots", ["All", "PASS Only", "FAIL Only"],
-                                              key="gallery_filter")
+def show_background_export(job, label, download_name, mime, key, unit, start_export):
+    """Create / progress / download controls for one background export"""
+    status = job.status if job else 'missing'
 
-            with col2:
-                per_page = st.selectbox("Screenshots per page", [6, 12, 24], index=1)
+    if status == 'ready':
+        show_export_download(job, f"Download {label}", download_name, mime, key=f"{key}_download")
+    elif status == 'building':
+        st.info(f"Building {label}... {job.done}/{job.total} {unit}")
+        if st.button("Refresh", key=f"{key}_refresh", use_container_width=True):
+            st.rerun()
+    else:
+        if status == 'failed':
+            st.error(f"Error creating {label}: {job.error}")
+        if st.button(f"Create {label}", key=f"{key}_create", type="primary", use_container_width=True):
+            start_export()
+            st.rerun()
 
-            with col3:
-                if st.button("Download All Screenshots ZIP", type="primary"):
-                    try:
-                        zip_data = create_screenshots_zip_from_results(test_run.id, screenshot_results)
-                        st.download_button(
-                            label="Download ZIP File",
-                            data=zip_data,
-                            file_name=f"screenshots_test_{test_run.id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip",
-                            mime="application/zip"
-                        )
-                        st.success("ZIP file ready for download!")
-                    except Exception as e:
-                        st.error(f"Error creating ZIP: {e}")
 
-            # Filter screenshots
-            if gallery_filter == "PASS Only":
-                display_screenshots = [r for r in screenshot_results if r.status == 'PASS']
-            elif gallery_filter == "FAIL Only":
-                display_screenshots = [r for r in screenshot_results if r.status == 'FAIL']
-            else:
-                display_screenshots = screenshot_results
+def show_screenshot_zip_export(test_run, run_version, screenshot_results, key):
+    """Screenshots ZIP built in the background and cached per run version"""
+    show_background_export(
+        export_manager.get('screenshots', test_run.id, run_version, 'zip'),
+        "Screenshots ZIP", f"screenshots_test_{test_run.id}.zip", "application/zip", key, "screenshots",
+        lambda: export_manager.submit_screenshot_zip(test_run.id, run_version, screenshot_results)
+    )
 
-            st.info(f"Displaying {len(display_screenshots)} screenshots")
 
-            # Display screenshots in grid
-            if display_screenshots:
-                cols = st.columns(3)
-                for idx, result in enumerate(display_screenshots[:per_page]):
-                    col_idx = idx % 3
+def show_results_export(test_run, run_version, analytics, export_format, key):
+    """Results export streamed from the database in the chosen format"""
+    extension, mime, label = RESULT_EXPORT_FORMATS[export_format]
+    summary = {
+        'test_name': test_run.test_name,
+        'database_name': test_run.database_name,
+        'created_date': test_run.created_date.strftime('%Y-%m-%d %H:%M') if test_run.created_date else '',
+        'total': analytics['total'],
+        'passed': analytics['passed'],
+        'failed': analytics['failed'],
+        'screenshots': analytics['screenshots'],
+    }
+    show_background_export(
+        export_manager.get(f"results_{export_format}", test_run.id, run_version, extension),
+        label, f"test_results_{test_run.id}.{extension}", mime, key, "results",
+        lambda: export_manager.submit_results_export(db_manager, export_format, test_run.id, run_version, summary)
+    )
 
-                    with cols[col_idx]:
-                        if result.status == 'PASS':
-                            st.success(f"Row {result.row_number + 1} - PASS")
-                        else:
-                            st.error(f"Row {result.row_number + 1} - FAIL")
 
-                        st.caption(f"URL: {result.url[:50]}...")
+def show_screenshot_gallery(test_run, run_version, screenshot_results):
+    """Screenshots tab - paginated, thumbnails only"""
+    st.subheader("Screenshots Gallery")
 
-                        # Show menu type and caption if available
-                        if original_df is not None and result.row_number < len(original_df):
-                            try:
-                                row_data = original_df.iloc[result.row_number]
-                                smenu_cols = ['smenuType', 'sMenuType', 'MenuType', 'Type']
-                                for col in smenu_cols:
-                                    if col in original_df.columns and pd.notna(row_data[col]):
-                                        st.caption(f"**Type:** {row_data[col]}")
-                                        break
-
-                                caption_cols = ['Caption', 'caption', 'Description', 'Name']
-                                for col in caption_cols:
-                                    if col in original_df.columns and pd.notna(row_data[col]):
-                                        st.caption(f"**Caption:** {row_data[col]}")
-                                        break
-                            except:
-                                pass
-
-                        screenshot_path = f"screenshots/test_{test_run.id}/{result.screenshot_filename}"
-                        if os.path.exists(screenshot_path):
-                            try:
-                                image = Image.open(screenshot_path)
-                                st.image(image, use_container_width=True)
-
-                                with open(screenshot_path, 'rb') as f:
-                                    st.download_button(
-                                        "Download",
-                                        f.read(),
-                                        file_name=f"screenshot_row_{result.row_number + 1}.png",
-                                        mime="image/png",
-                                        key=f"dl_{result.id}"
-                                    )
-                            except Exception as e:
-                                st.error(f"Error loading screenshot: {e}")
-                        else:
-                            st.warning("Screenshot file not found")
+    if not screenshot_results:
+        st.info("No screenshots were captured for this test.")
+        return
 
-                        if result.status == 'FAIL' and result.error_message:
-                            with st.expander("Error Details"):
-                                st.text(result.error_message[:200])
+    # Gallery controls
+    col1, col2, col3 = st.columns([1, 1, 2])
 
-    with tab4:
-        # FAILED ANALYSIS TAB CONTENT
-        st.subheader("Failed Test Analysis")
+    with col1:
+        gallery_filter = st.selectbox("Show Screenshots", ["All", "PASS Only", "FAIL Only"],
+                                      key="gallery_filter")
 
-        failed_results = [r for r in results if r.status == 'FAIL']
-        if failed_results:
-            st.info(f"Found {len(failed_results)} failed tests")
+    with col2:
+        per_page = st.selectbox("Screenshots per page", [6, 12, 24, 48], index=1, key="gallery_per_page")
 
-            for i, failed_result in enumerate(failed_results, 1):
-                with st.expander(f"Failed Test #{i} - Row {failed_result.row_number + 1}"):
-                    st.write(f"**URL:** {failed_result.url}")
+    with col3:
+        show_screenshot_zip_export(test_run, run_version, screenshot_results, key="gallery_zip")
 
-                    # Show original file data
-                    if original_df is not None and failed_result.row_number < len(original_df):
-                        try:
-                            row_data = original_df.iloc[failed_result.row_number]
-
-                            smenu_cols = ['smenuType', 'sMenuType', 'MenuType', 'Type']
-                            for col in smenu_cols:
-                                if col in original_df.columns and pd.notna(row_data[col]):
-                                    st.write(f"**Menu Type:** {row_data[col]}")
-                                    break
-
-                            caption_cols = ['Caption', 'caption', 'Description', 'Name']
-                            for col in caption_cols:
-                                if col in original_df.columns and pd.notna(row_data[col]):
-                                    st.write(f"**Caption:** {row_data[col]}")
-                                    break
-                        except:
-                            pass
-
-                    if failed_result.error_message:
-                        st.write(f"**Error Details:** {failed_result.error_message}")
-
-                    if failed_result.page_title:
-                        st.write(f"**Page Title:** {failed_result.page_title}")
-
-                    if failed_result.screenshot_filename:
-                        st.write(f"**Screenshot:** Available")
-                        screenshot_path = f"screenshots/test_{test_run.id}/{failed_result.screenshot_filename}"
-                        if os.path.exists(screenshot_path):
-                            try:
-                                image = Image.open(screenshot_path)
-                                st.image(image, caption=f"Failed test screenshot", width=400)
-                            except Exception as e:
-                                st.error(f"Error loading screenshot: {e}")
-                    else:
-                        st.write("**Screenshot:** Not available")
+    # Filter screenshots
+    if gallery_filter == "PASS Only":
+        display_screenshots = [r for r in screenshot_results if r['status'] == 'PASS']
+    elif gallery_filter == "FAIL Only":
+        display_screenshots = [r for r in screenshot_results if r['status'] == 'FAIL']
+    else:
+        display_screenshots = screenshot_results
+
+    st.info(f"Displaying {len(display_screenshots)} screenshots")
+
+    if not display_screenshots:
+        return
+
+    # Full-size view of the clicked screenshot
+    full_id = st.session_state.get('gallery_full_id')
+    if full_id is not None:
+        selected = next((r for r in screenshot_results if r['id'] == full_id), None)
+        if selected:
+            show_full_screenshot(test_run, selected, 'gallery_full_id')
         else:
-            st.success("No failed tests found - all URLs passed!")
+            del st.session_state['gallery_full_id']
 
-    with tab5:
-        # DOWNLOADS TAB CONTENT
-        st.subheader("Download Options")
+    start, end = paginate(len(display_screenshots), per_page, key="gallery")
+    page_results = display_screenshots[start:end]
 
-        col1, col2, col3 = st.columns(3)
+    # Only this page's thumbnails are touched - older runs get theirs built here on first view
+    thumbnails = ensure_thumbnails(
+        [screenshot_path_for(test_run.id, r['screenshot_filename']) for r in page_results]
+    )
 
-        with col1:
-            # Download CSV
-            if 'df' in locals() and len(df) > 0:
-                # Create download dataframe with all complete information
-                download_df = df[
-                    ['Row', 'Full_URL', 'Status', 'MenuType', 'Caption', 'Screenshot_Filename', 'Error_Message',
-                     'Page_Title']].copy()
-
-                # Rename columns for CSV
-                download_df.columns = [
-                    'Row_Number',
-                    'Complete_URL',
-                    'Test_Status',
-                    'Menu_Type',
-                    'Caption',
-                    'Screenshot_Filename',
-                    'Error_Message',
-                    'Page_Title'
-                ]
-
-                csv_data = download_df.to_csv(index=False)
+    # Display screenshots in grid
+    cols = st.columns(3)
+    for idx, result in enumerate(page_results):
+        col_idx = idx % 3
 
-                st.download_button(
-                    "Download Results CSV",
-                    csv_data,
-                    file_name=f"test_results_{test_run.id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
-                    mime="text/csv",
-                    use_container_width=True,
-                    help="Download complete results with full URLs and screenshot filenames"
-                )
+        with cols[col_idx]:
+            if result['status'] == 'PASS':
+                st.success(f"Row {result['row_number'] + 1} - PASS")
             else:
-                st.error("No data available for download")
+                st.error(f"Row {result['row_number'] + 1} - FAIL")
 
-        with col2:
-            # Download Screenshots ZIP
-            if screenshot_results:
-                if st.button("Create Screenshots ZIP", use_container_width=True, type="primary"):
-                    try:
-                        zip_data = create_screenshots_zip_from_results(test_run.id, screenshot_results)
-                        st.download_button(
-                            "Download Screenshots ZIP",
-                            zip_data,
-                            file_name=f"screenshots_test_{test_run.id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip",
-                            mime="application/zip",
-                            help="Download ZIP containing all screenshot files",
-                            use_container_width=True
-                        )
-                        st.success("ZIP created successfully!")
-                    except Exception as e:
-                        st.error(f"Error creating ZIP: {e}")
-            else:
-                st.info("No screenshots to download")
+            st.caption(f"URL: {result['url'][:50]}...")
 
-        with col3:
-            # Generate Report
-            if st.button("Generate Enhanced Report", use_container_width=True, type="primary"):
-                try:
-                    # Use the existing simple report function
-                    report_content = generate_test_report_simple(test_run, results)
-                    st.download_button(
-                        "Download Test Report",
-                        report_content,
-                        file_name=f"test_report_{test_run.id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt",
-                        mime="text/plain",
-                        help="Download detailed test report",
-                        use_container_width=True
-                    )
-                    st.success("Report generated successfully!")
-                except Exception as e:
-                    st.error(f"Error generating report: {e}")
-
-
-def generate_test_report_simple(test_run, results):
-    """Generate simple test report"""
-    passed = len([r for r in results if r.status == 'PASS'])
-    failed = len([r for r in results if r.status == 'FAIL'])
-    screenshots = len([r for r in results if r.screenshot_filename])
-
-    report_lines = [
-        "TEST REPORT",
-        "=" * 50,
-        f"Test Name: {test_run.test_name}",
-        f"Database: {test_run.database_name}",
-        f"Date: {test_run.created_date}",
-        f"Status: {test_run.status}",
-        "",
-        "SUMMARY",
-        "-" * 20,
-        f"Total URLs: {len(results)}",
-        f"Passed: {passed}",
-        f"Failed: {failed}",
-        f"Screenshots: {screenshots}",
-        f"Success Rate: {(passed / len(results) * 100):.1f}%",
-        "",
-        "DETAILED RESULTS",
-        "-" * 30
-    ]
+            # Show menu type and caption if available
+            if result['menu_type']:
+                st.caption(f"**Type:** {result['menu_type']}")
+            if result['caption']:
+                st.caption(f"**Caption:** {result['caption']}")
 
-    for result in results:
-        report_lines.extend([
-            f"Row {result.row_number + 1}: {result.status}",
-            f"URL: {result.url}",
-        ])
+            screenshot_path = screenshot_path_for(test_run.id, result['screenshot_filename'])
+            show_screenshot_thumbnail(thumbnails.get(screenshot_path), result, 'gallery_full_id')
 
-        if result.screenshot_filename:
-            report_lines.append(f"Screenshot: {result.screenshot_filename}")
+            if result['status'] == 'FAIL' and result['error_message']:
+                with st.expander("Error Details"):
+                    st.text(result['error_message'][:200])
 
-        if result.error_message:
-            report_lines.append(f"Error: {result.error_message}")
+    st.caption(f"Showing {start + 1}-{end} of {len(display_screenshots)}")
 
-        if result.page_title:
-            report_lines.append(f"Title: {result.page_title}")
 
-        report_lines.append("-" * 50)
+def show_failed_analysis(test_run, frame):
+    """Failed Analysis tab - paginated, thumbnails only"""
+    st.subheader("Failed Test Analysis")
 
-    report_lines.extend([
-        "",
-        f"Report generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
-    ])
+    failed_results = frame[frame['status'] == 'FAIL']
+    if failed_results.empty:
+        st.success("No failed tests found - all URLs passed!")
+        return
 
-    return "\n".join(report_lines)
-
-def generate_enhanced_test_report(test_run, results, original_df):
-    """Generate a comprehensive test report with original file data"""
-    error_count = sum(1 for r in results if r.status == 'FAIL' and r.error_message)
-
-    report_lines = [
-        "=" * 70,
-        f"YARDI URL TESTER - ENHANCED TEST REPORT",
-        "=" * 70,
-        "",
-        f"Test Name: {test_run.test_name}",
-        f"Database: {test_run.database_name}",
-        f"Test Date: {test_run.created_date.strftime('%Y-%m-%d %H:%M:%S')}",
-        f"Completion Date: {test_run.completed_date.strftime('%Y-%m-%d %H:%M:%S') if test_run.completed_date else 'N/A'}",
-        "",
-        "SUMMARY:",
-        f"- Total URLs Tested: {test_run.total_urls}",
-        f"- Passed: {test_run.passed}",
-        f"- Failed: {test_run.failed}",
-        f"- Skipped: {test_run.skipped}",
-        f"- Success Rate: {test_run.success_rate:.1f}%",
-        f"- Error Details Captured: {error_count}",
-        "",
-        "DETAILED RESULTS:",
-        "-" * 70,
-    ]
+    st.info(f"Found {len(failed_results)} failed tests")
 
-    for result in results:
-        # Get original file data
-        smenu_type = ""
-        caption = ""
-        if original_df is not None and result.row_number < len(original_df):
-            try:
-                row_data = original_df.iloc[result.row_number]
-
-                # Get smenuType
-                smenu_cols = ['smenuType', 'sMenuType', 'MenuType', 'Type']
-                for col in smenu_cols:
-                    if col in original_df.columns and pd.notna(row_data[col]):
-                        smenu_type = str(row_data[col])
-                        break
-
-                # Get Caption
-                caption_cols = ['Caption', 'caption', 'Description', 'Name']
-                for col in caption_cols:
-                    if col in original_df.columns and pd.notna(row_data[col]):
-                        caption = str(row_data[col])
-                        break
-            except:
-                pass
-
-        report_lines.extend([
-            f"Row {result.row_number + 1}: {result.status}",
-            f"URL: {result.url}",
-            f"Menu Type: {smenu_type or 'N/A'}",
-            f"Caption: {caption or 'N/A'}",
-            f"Screenshot: screenshot{result.row_number + 1}.png" if result.screenshot_filename else "None",
-        ])
-
-        if result.status == 'FAIL' and result.error_message:
-            # Clean error message
-            clean_error = result.error_message
-            clean_error = clean_error.replace('EXTRACTED:', '').replace('Browser Error:', '').strip()
-            if clean_error:
-                report_lines.append(f"Error: {clean_error}")
-
-        report_lines.append("-" * 50)
-
-    report_lines.extend([
-        "",
-        f"Report generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}",
-        f"Error Detection: Fast browser-based detection with Playwright",
-        "=" * 70
+    full_id = st.session_state.get('failed_full_id')
+    if full_id is not None:
+        selected = failed_results[failed_results['id'] == full_id]
+        if not selected.empty and pd.notna(selected.iloc[0]['screenshot_filename']):
+            show_full_screenshot(test_run, selected.iloc[0].to_dict(), 'failed_full_id')
+        else:
+            del st.session_state['failed_full_id']
+
+    per_page = st.selectbox("Failures per page", [10, 25, 50], index=0, key="failed_per_page")
+    start, end = paginate(len(failed_results), per_page, key="failed")
+    page_results = failed_results.iloc[start:end]
+
+    thumbnails = ensure_thumbnails([
+        screenshot_path_for(test_run.id, name) for name in page_results['screenshot_filename'] if pd.notna(name)
     ])
 
-    return "\n".join(report_lines)
+    for i, failed_result in enumerate(page_results.itertuples(index=False), start + 1):
+        with st.expander(f"Failed Test #{i} - Row {failed_result.row_number + 1}"):
+            st.write(f"**URL:** {failed_result.url}")
+
+            # Show original file data
+            if failed_result.menu_type:
+                st.write(f"**Menu Type:** {failed_result.menu_type}")
+            if failed_result.caption:
+                st.write(f"**Caption:** {failed_result.caption}")
+
+            if failed_result.error_message:
+                st.write(f"**Error Details:** {failed_result.error_message}")
+
+            if failed_result.page_title:
+                st.write(f"**Page Title:** {failed_result.page_title}")
+
+            if pd.notna(failed_result.screenshot_filename):
+                st.write(f"**Screenshot:** Available")
+                screenshot_path = screenshot_path_for(test_run.id, failed_result.screenshot_filename)
+                col1, _ = st.columns([1, 2])
+                with col1:
+                    show_screenshot_thumbnail(thumbnails.get(screenshot_path), failed_result._asdict(),
+                                              'failed_full_id')
+            else:
+                st.write("**Screenshot:** Not available")
+
+            if test_run.capture_snapshots and st.checkbox("Show captured page text",
+                                                          key=f"failed_snapshot_{failed_result.id}"):
+                snapshot = load_snapshot(db_manager, test_run.id, failed_result.row_number)
+                if snapshot:
+                    st.text_area("Visible text", snapshot.get('body_text', ''), height=200, disabled=True,
+                                 key=f"failed_snapshot_text_{failed_result.id}")
+                else:
+                    st.write("No snapshot was captured for this page")
+
+
+def show_result_downloads(test_run, run_version, analytics, screenshot_results):
+    """Downloads tab"""
+    st.subheader("Download Options")
+
+    col1, col2 = st.columns(2)
+
+    with col1:
+        # Results export - full error messages and metadata, streamed from the database
+        export_format = st.selectbox(
+            "Results format",
+            list(RESULT_EXPORT_FORMATS),
+            format_func=lambda f: RESULT_EXPORT_FORMATS[f][2],
+            key="results_export_format",
+            help="Complete results with full URLs, error messages and screenshot filenames"
+        )
+        show_results_export(test_run, run_version, analytics, export_format,
+                            key=f"results_export_{export_format}")
+
+    with col2:
+        # Download Screenshots ZIP
+        if screenshot_results:
+            show_screenshot_zip_export(test_run, run_version, screenshot_results, key="downloads_zip")
+        else:
+            st.info("No screenshots to download")
 
 
 # =============================================================================
@@ -2404,54 +2421,6 @@ def show_sql_download():
         - **Structured Output**: Organized by MenuSet, Type, and Order
         """)
 
-# =============================================================================
-# HELPER FUNCTIONS
-# =============================================================================
-
-def create_screenshots_zip_from_results(test_run_id, screenshot_results):
-    """Create ZIP file from test results"""
-    zip_buffer = BytesIO()
-
-    with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-        screenshot_count = 0
-
-        for result in screenshot_results:
-            screenshot_path = f"screenshots/test_{test_run_id}/{result.screenshot_filename}"
-
-            if os.path.exists(screenshot_path):
-                # Clean URL for filename
-                clean_url = "".join(c for c in result.url if c.isalnum() or c in ('-', '_', '.'))[:50]
-                zip_filename = f"row_{result.row_number + 1}_{result.status}_{clean_url}.png"
-
-                zip_file.write(screenshot_path, zip_filename)
-                screenshot_count += 1
-
-        # Add summary
-        summary = f"""Test Results Summary
-===================
-Test ID: {test_run_id}
-Screenshots: {screenshot_count}
-Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
-
-Status Legend:
-PASS - Page loaded successfully
-FAIL - Page failed to load (may include extracted error text)
-SKIP - Page was skipped
-
-Features:
-- Smart Error Detection: Failed pages have error text extracted from screenshots
-- Complete URL Testing: All URLs tested with screenshots
-- Enhanced Error Analysis: Browser errors + extracted text
-
-File Naming Convention:
-row_[NUMBER]_[STATUS]_[URL_SNIPPET].png
-"""
-        zip_file.writestr("README.txt", summary)
-
-    zip_buffer.seek(0)
-    return zip_buffer.getvalue()
-
-
 # =============================================================================
 # MAIN APPLICATION
 # =============================================================================
@@ -0,0 +1,313 @@
+import os
+import time
+import urllib.request
+import bisect
+import logging
+import threading
+from collections import deque
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+logger = logging.getLogger(__name__)
+
+METRICS_HOST = os.environ.get("WORKER_METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.environ.get("WORKER_METRICS_PORT", "9108"))
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds - from a fast DB write up to a slow page load
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+BATCH_SIZE_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def header(self):
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._values = {}
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+    def render(self):
+        with self._lock:
+            values = dict(self._values)
+        if not values and not self.labelnames:
+            values = {(): 0}
+        return self.header() + [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(v)}"
+                                for key, v in sorted(values.items())]
+
+
+class Gauge(_Metric):
+    """Gauge set from the hot path, or computed at scrape time by a callback returning {labels: value}"""
+
+    kind = "gauge"
+
+    def __init__(self, name, documentation, labelnames=(), callback=None):
+        super().__init__(name, documentation, labelnames)
+        self._values = {}
+        self.callback = callback
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def render(self):
+        if self.callback is not None:
+            try:
+                result = self.callback()
+                values = result if isinstance(result, dict) else {(): result}
+            except Exception as e:
+                logger.debug(f"Metric callback for {self.name} failed: {e}")
+                values = {}
+        else:
+            with self._lock:
+                values = dict(self._values)
+        return self.header() + [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(v)}"
+                                for key, v in sorted(values.items())]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # labels -> [bucket counts..., +Inf count, sum]
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+
+    def render(self):
+        with self._lock:
+            snapshot = {key: list(series) for key, series in self._series.items()}
+
+        lines = self.header()
+        for key, series in sorted(snapshot.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), series[:-1]):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, [('le', _format_value(bound))])} "
+                             f"{cumulative}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(series[-1])}")
+        return lines
+
+
+class RateWindow:
+    """Events per second over a sliding window - record() is a deque append"""
+
+    def __init__(self, window_seconds=60, maxlen=100000):
+        self.window_seconds = window_seconds
+        self._events = deque(maxlen=maxlen)
+
+    def record(self):
+        self._events.append(time.monotonic())
+
+    def rate(self):
+        cutoff = time.monotonic() - self.window_seconds
+        events = list(self._events)
+        recent = len(events) - bisect.bisect_left(events, cutoff)
+        return recent / self.window_seconds
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=(), callback=None):
+        return self.register(Gauge(name, documentation, labelnames, callback))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        logger.debug(f"📈 {self.address_string()} - {format % args}")
+
+    def do_GET(self):
+        if self.path.split('?')[0] not in ('/metrics', '/'):
+            self.send_error(404)
+            return
+        body = self.server.registry.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class MetricsServer:
+    """Serves a registry in Prometheus text format on /metrics from a daemon thread"""
+
+    def __init__(self, registry, host=METRICS_HOST, port=METRICS_PORT):
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self._httpd = None
+
+    def start(self):
+        try:
+            httpd = ThreadingHTTPServer((self.host, self.port), _MetricsHandler)
+        except OSError as e:
+            logger.warning(f"⚠️ Metrics endpoint could not bind {self.host}:{self.port}: {e}")
+            return False
+
+        httpd.daemon_threads = True
+        httpd.registry = self.registry
+        self.port = httpd.server_address[1]
+        self._httpd = httpd
+        threading.Thread(target=httpd.serve_forever, name="metrics", daemon=True).start()
+        logger.info(f"📈 Metrics available at http://{self.host}:{self.port}/metrics")
+        return True
+
+    def stop(self):
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+
+
+def worker_last_loop(host=METRICS_HOST, port=METRICS_PORT, timeout=0.5):
+    """Unix time of the worker's last loop from its metrics endpoint, or None if it isn't answering"""
+    host = "127.0.0.1" if host in ("0.0.0.0", "") else host
+    try:
+        with urllib.request.urlopen(f"http://{host}:{port}/metrics", timeout=timeout) as response:
+            for line in response.read().decode('utf-8').splitlines():
+                if line.startswith("yardi_worker_last_loop_timestamp_seconds "):
+                    return float(line.split()[1])
+    except Exception:
+        return None
+    return None
+
+
+class WorkerMetrics:
+    """Everything the background worker publishes"""
+
+    def __init__(self, queue_depth=None, active_browsers=None, browser_memory=None):
+        self.registry = MetricsRegistry()
+        r = self.registry
+        self.url_rate = RateWindow()
+
+        self.urls_processed = r.counter("yardi_worker_urls_processed_total", "URLs tested, by result status",
+                                        ["status"])
+        self.urls_per_second = r.gauge("yardi_worker_urls_per_second",
+                                       "URLs tested per second over the last minute", callback=self.url_rate.rate)
+        self.phase_seconds = r.histogram("yardi_worker_phase_seconds", "Per-URL time spent in each phase",
+                                         ["phase"])
+        self.url_seconds = r.histogram("yardi_worker_url_seconds", "Total processing time per URL")
+        self.queue_depth = r.gauge("yardi_worker_queue_depth", "Test runs by status", ["status"],
+                                   callback=queue_depth)
+        self.active_browsers = r.gauge("yardi_worker_active_browsers", "Browser processes currently open",
+                                       callback=active_browsers)
+        self.browser_memory = r.gauge("yardi_worker_browser_memory_bytes",
+                                      "Resident memory of the browsers' process trees at the last sample",
+                                      callback=browser_memory)
+        self.browser_capacity = r.gauge("yardi_worker_browser_capacity", "Browsers the memory budget has room for")
+        self.governor_actions = r.counter("yardi_worker_governor_actions_total",
+                                          "Memory governor decisions (refused, closed, recycled)", ["action"])
+        self.browsers_started = r.counter("yardi_worker_browsers_started_total", "Browsers launched")
+        self.browser_restarts = r.counter("yardi_worker_browser_restarts_total",
+                                          "Browsers replaced because they died or lost their session")
+        self.db_flush_seconds = r.histogram("yardi_worker_db_flush_seconds", "Time to write one result batch")
+        self.db_batch_size = r.histogram("yardi_worker_db_batch_size", "Results written per batch",
+                                         buckets=BATCH_SIZE_BUCKETS)
+        self.session_keepalives = r.counter("yardi_worker_session_keepalives_total",
+                                            "Keep-alive requests to tenants, by result", ["result"])
+        self.session_expirations = r.counter("yardi_worker_session_expirations_total",
+                                             "Runs paused because the session expired mid-run")
+        self.url_retries = r.counter("yardi_worker_url_retries_total",
+                                     "Transient page load failures, by what happened to the row", ["outcome"])
+        self.http_responses = r.counter("yardi_worker_http_responses_total",
+                                        "Main-document responses of tested URLs, by status class", ["status_class"])
+        self.circuit_breaker_trips = r.counter("yardi_worker_circuit_breaker_trips_total",
+                                               "Failure streaks that stopped a run, by canary outcome", ["outcome"])
+        self.runs_finished = r.counter("yardi_worker_runs_finished_total", "Test runs finished, by outcome",
+                                       ["status"])
+        self.last_loop = r.gauge("yardi_worker_last_loop_timestamp_seconds",
+                                 "Unix time of the worker's last scheduling loop")
+
+    def record_url(self, status, durations, total_seconds):
+        """Hot path: one call per URL"""
+        self.urls_processed.inc(status=status)
+        self.url_rate.record()
+        self.url_seconds.observe(total_seconds)
+        for phase, seconds in durations.items():
+            self.phase_seconds.observe(seconds, phase=phase)
+
+    def record_flush(self, seconds, batch_size):
+        self.db_flush_seconds.observe(seconds)
+        self.db_batch_size.observe(batch_size)
+        # Each URL in the batch is charged its share, matching test_results.db_flush_ms
+        share = seconds / batch_size if batch_size else seconds
+        for _ in range(max(batch_size, 1)):
+            self.phase_seconds.observe(share, phase='db_flush')
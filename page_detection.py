@@ -0,0 +1,367 @@
+import re
+import json
+import hashlib
+import logging
+from html.parser import HTMLParser
+
+logger = logging.getLogger(__name__)
+
+# Text that marks a Yardi page as failed, wherever it shows up
+FAIL_CRITERIA = [
+    'invalid select file',
+    'page does not exist',
+    'an exception has occurred',
+    'access denied',
+    'your request did not complete',
+    'exception messages:',
+    'please try your request again',
+]
+
+# Class fragments / roles the worker treats as modal or dialog containers
+MODAL_CLASS_HINTS = ('modal', 'dialog', 'popup', 'alert')
+MODAL_ROLES = ('dialog', 'alertdialog')
+
+TITLE_ERROR_PATTERNS = ['error', 'invalid', 'denied', 'unauthorized', '404', '403', '500']
+
+_VOID_TAGS = {'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta', 'param', 'source',
+              'track', 'wbr'}
+_BLOCK_TAGS = {'p', 'div', 'br', 'tr', 'li', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'table', 'ul', 'ol', 'section'}
+_ALERT_CALL = re.compile(r"""\balert\(\s*(['"])(.*?)(?<!\\)\1\s*\)""", re.DOTALL)
+_HIDDEN_STYLE = re.compile(r"display\s*:\s*none|visibility\s*:\s*hidden", re.IGNORECASE)
+
+
+def rules_version():
+    """Short fingerprint of the fail criteria - stored with re-scored verdicts to tell rule sets apart"""
+    payload = json.dumps({'fail_criteria': FAIL_CRITERIA}, sort_keys=True).encode('utf-8')
+    return hashlib.sha1(payload).hexdigest()[:12]
+
+
+def alert_from_reason(reason):
+    """Alert text recorded in a fail reason by evaluate_alert, or None"""
+    for prefix in ("Alert: ", "Access denied alert: "):
+        if reason and reason.startswith(prefix):
+            return reason[len(prefix):]
+    return None
+
+
+def match_fail_criteria(text):
+    """First fail criterion contained in text (case-insensitive), or None"""
+    if not text:
+        return None
+    text_lower = text.lower()
+    for criteria in FAIL_CRITERIA:
+        if criteria in text_lower:
+            return criteria
+    return None
+
+
+def evaluate_alert(alert_text):
+    """Fail verdict for a JavaScript alert's text, or None if the alert is harmless"""
+    alert_text = (alert_text or '').strip()
+    if not alert_text:
+        return None
+
+    criteria = match_fail_criteria(alert_text)
+    if criteria:
+        return {'is_fail': True, 'reason': f"Alert: {alert_text}", 'criteria': criteria}
+
+    # Even if no specific criteria match, "denied" in an alert should fail
+    if 'denied' in alert_text.lower():
+        return {'is_fail': True, 'reason': f"Access denied alert: {alert_text}", 'criteria': 'access denied'}
+    return None
+
+
+def evaluate_http_status(http_status):
+    """Fail verdict for a main document's HTTP status - any 4xx/5xx fails without looking at the page"""
+    if http_status is None or http_status < 400:
+        return None
+    return {'is_fail': True, 'reason': f"HTTP {http_status}", 'criteria': f"http {http_status // 100}xx"}
+
+
+class PageSnapshot:
+    """What the worker looks at on a loaded page, captured live or parsed from saved HTML"""
+
+    def __init__(self, url=None, page_source='', body_text='', title='', alert_text=None, modal_texts=None):
+        self.url = url
+        self.page_source = page_source or ''
+        self.body_text = body_text or ''
+        self.title = title or ''
+        self.alert_text = alert_text
+        self.modal_texts = list(modal_texts or [])
+
+    @classmethod
+    def from_html(cls, html, url=None, alert_text=None):
+        """Build a snapshot from saved HTML without a browser.
+
+        Visible text skips <script>/<style> and inline-hidden elements, modal text is
+        collected from elements the worker's modal selectors would match, and an
+        alert("...") call in an inline script stands in for a live alert unless one
+        was captured.
+        """
+        parser = _SnapshotParser()
+        parser.feed(html or '')
+        parser.close()
+
+        if alert_text is None:
+            alerts = [m.group(2) for script in parser.scripts for m in _ALERT_CALL.finditer(script)]
+            alert_text = alerts[0] if alerts else None
+
+        return cls(url=url, page_source=html, body_text=parser.body_text, title=parser.title,
+                   alert_text=alert_text, modal_texts=parser.modal_texts)
+
+    def to_dict(self):
+        return {'url': self.url, 'page_source': self.page_source, 'body_text': self.body_text,
+                'title': self.title, 'alert_text': self.alert_text, 'modal_texts': self.modal_texts}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**{k: data.get(k) for k in ('url', 'page_source', 'body_text', 'title', 'alert_text',
+                                              'modal_texts')})
+
+
+def evaluate_snapshot(snapshot):
+    """Fail-criteria verdict for a snapshot - same checks, same order as the worker.
+
+    Returns {'is_fail': bool, 'reason': str|None, 'criteria': str|None}.
+    """
+    verdict = evaluate_alert(snapshot.alert_text)
+    if verdict:
+        return verdict
+
+    criteria = match_fail_criteria(snapshot.page_source)
+    if criteria:
+        return {'is_fail': True, 'reason': f"Found in page: {criteria}", 'criteria': criteria}
+
+    criteria = match_fail_criteria(snapshot.body_text)
+    if criteria:
+        return {'is_fail': True, 'reason': f"Found in body: {criteria}", 'criteria': criteria}
+
+    for modal_text in snapshot.modal_texts:
+        criteria = match_fail_criteria(modal_text)
+        if criteria:
+            return {'is_fail': True, 'reason': f"Found in modal: {criteria}", 'criteria': criteria}
+
+    return {'is_fail': False, 'reason': None, 'criteria': None}
+
+
+def is_error_content(text):
+    """Enhanced error detection with specific focus on 'Invalid select file'"""
+    if not text:
+        logger.debug("❌ No text to analyze")
+        return False
+
+    text_lower = text.lower()
+    logger.debug(f"🔍 Analyzing text for errors... Length: {len(text)} chars")
+
+    # HIGHEST PRIORITY: Your specific error (exact match)
+    critical_patterns = [
+        'invalid select file:',
+        'invalid select file',
+        'invalid file:',
+        'invalid file',
+        'invalid select'
+    ]
+
+    for pattern in critical_patterns:
+        if pattern in text_lower:
+            logger.info(f"🚨 CRITICAL ERROR DETECTED: Found '{pattern}' in text")
+            return True
+
+    # HIGH PRIORITY: Authentication errors
+    auth_patterns = [
+        'access denied',
+        'unauthorized',
+        'permission denied',
+        'forbidden',
+        'session expired',
+        'login required',
+        'authentication failed'
+    ]
+
+    for pattern in auth_patterns:
+        if pattern in text_lower:
+            logger.info(f"🔐 AUTH ERROR DETECTED: Found '{pattern}' in text")
+            return True
+
+    # MEDIUM PRIORITY: System errors
+    system_patterns = [
+        'error occurred',
+        'exception occurred',
+        'not found',
+        'database error',
+        'connection error',
+        'timeout',
+        'service unavailable',
+        '404', '403', '500', '502', '503'
+    ]
+
+    for pattern in system_patterns:
+        if pattern in text_lower:
+            logger.info(f"⚙️ SYSTEM ERROR DETECTED: Found '{pattern}' in text")
+            return True
+
+    logger.debug("✅ No error patterns detected in text")
+    return False
+
+
+def extract_error_detail(text):
+    """Extract specific error details from text with enhanced logic"""
+    if not text:
+        return "No error text found"
+
+    text_lower = text.lower()
+
+    # Check for specific error types and return appropriate message
+    if 'invalid select file:' in text_lower:
+        return "Invalid select file error (with colon)"
+    elif 'invalid select file' in text_lower:
+        return "Invalid select file error"
+    elif 'invalid file:' in text_lower:
+        return "Invalid file error (with colon)"
+    elif 'invalid file' in text_lower:
+        return "Invalid file error"
+    elif 'access denied' in text_lower:
+        return "Access denied error"
+    elif 'session expired' in text_lower:
+        return "Session expired error"
+    elif 'not found' in text_lower:
+        return "Page not found error"
+    elif 'unauthorized' in text_lower:
+        return "Unauthorized access error"
+    elif 'database error' in text_lower:
+        return "Database error"
+    else:
+        # Look for lines containing error keywords
+        lines = text.split('\n')
+        for line in lines:
+            line_clean = line.strip()
+            if line_clean and any(err in line_clean.lower() for err in ['error', 'failed', 'invalid', 'denied']):
+                return line_clean[:150]  # Return first meaningful error line
+
+        # Fallback - return first non-empty line
+        for line in lines:
+            if line.strip():
+                return line.strip()[:100]
+
+        return "Error detected but no specific details found"
+
+
+def modal_content_text(snapshot):
+    """Text the content analysis reads - the offline equivalent of extract_all_modal_and_dialog_content"""
+    parts = []
+    if snapshot.alert_text:
+        parts.append(f"JS_ALERT: {snapshot.alert_text}")
+    parts.extend(f"MODAL_CONTAINER: {text}" for text in snapshot.modal_texts if len(text) > 3)
+    for line in snapshot.body_text.split('\n'):
+        if match_fail_criteria(line):
+            parts.append(f"FAIL_CRITERIA_FOUND: {line.strip()}")
+    return "\n".join(parts)
+
+
+def evaluate_content(snapshot):
+    """Content-analysis verdict (status, reason, confidence) - what content_text_detection decides"""
+    page_content = modal_content_text(snapshot)
+    if is_error_content(page_content):
+        return "FAIL", extract_error_detail(page_content), 98
+
+    title = snapshot.title.lower()
+    for pattern in TITLE_ERROR_PATTERNS:
+        if pattern in title:
+            return "FAIL", f"Error in page title: {snapshot.title}", 90
+
+    return "PASS", "No errors detected", 85
+
+
+class _SnapshotParser(HTMLParser):
+    """Collects title, visible body text, modal text and inline scripts from HTML"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.title = ''
+        self.scripts = []
+        self._stack = []  # (tag, hidden, modal_index)
+        self._body_parts = []
+        self._modal_parts = []
+        self._in_title = False
+        self._raw_tag = None
+        self._raw_parts = []
+
+    @property
+    def body_text(self):
+        return _normalise(''.join(self._body_parts))
+
+    @property
+    def modal_texts(self):
+        return [text for text in (_normalise(''.join(parts)) for parts in self._modal_parts) if text]
+
+    def _hidden(self):
+        return bool(self._stack) and self._stack[-1][1]
+
+    def _modal(self):
+        return self._stack[-1][2] if self._stack else None
+
+    def handle_starttag(self, tag, attrs):
+        if tag in ('script', 'style'):
+            self._raw_tag = tag
+            self._raw_parts = []
+            return
+        if tag == 'title':
+            self._in_title = True
+            return
+
+        attrs = dict(attrs)
+        hidden = self._hidden() or bool(_HIDDEN_STYLE.search(attrs.get('style') or '')) or 'hidden' in attrs
+        modal = self._modal()
+        classes = (attrs.get('class') or '').lower()
+        if modal is None and not hidden and (any(hint in classes for hint in MODAL_CLASS_HINTS)
+                                             or (attrs.get('role') or '').lower() in MODAL_ROLES):
+            self._modal_parts.append([])
+            modal = len(self._modal_parts) - 1
+
+        if tag in _BLOCK_TAGS:
+            self._text('\n', hidden, modal)
+        if tag not in _VOID_TAGS:
+            self._stack.append((tag, hidden, modal))
+
+    def handle_startendtag(self, tag, attrs):
+        if tag in _BLOCK_TAGS:
+            self._text('\n', self._hidden(), self._modal())
+
+    def handle_endtag(self, tag):
+        if tag == self._raw_tag:
+            if tag == 'script':
+                self.scripts.append(''.join(self._raw_parts))
+            self._raw_tag = None
+            return
+        if tag == 'title':
+            self._in_title = False
+            return
+
+        # Tolerate mis-nested markup: close back to the matching open tag if there is one
+        for i in range(len(self._stack) - 1, -1, -1):
+            if self._stack[i][0] == tag:
+                _, hidden, modal = self._stack[i]
+                del self._stack[i:]
+                if tag in _BLOCK_TAGS:
+                    self._text('\n', hidden, modal)
+                return
+
+    def handle_data(self, data):
+        if self._raw_tag:
+            self._raw_parts.append(data)
+        elif self._in_title:
+            self.title += data.strip()
+        else:
+            self._text(data, self._hidden(), self._modal())
+
+    def _text(self, data, hidden, modal):
+        if hidden:
+            return
+        self._body_parts.append(data)
+        if modal is not None:
+            self._modal_parts[modal].append(data)
+
+
+def _normalise(text):
+    lines = (' '.join(line.split()) for line in text.split('\n'))
+    return '\n'.join(line for line in lines if line)
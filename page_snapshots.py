@@ -0,0 +1,232 @@
+import os
+import json
+import gzip
+import uuid
+import queue
+import shutil
+import logging
+import threading
+from datetime import datetime
+
+try:
+    import zstandard
+
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOTS_DIR = "snapshots"
+
+# Segments roll over at this size so no single file grows without bound
+SEGMENT_MAX_BYTES = 256 * 1024 * 1024
+
+# Index rows are written in batches of up to this many snapshots
+INDEX_BATCH_SIZE = 50
+
+DEFAULT_CODEC = 'zstd' if ZSTD_AVAILABLE else 'gzip'
+
+
+def compress(data, codec=DEFAULT_CODEC):
+    if codec == 'zstd':
+        return zstandard.ZstdCompressor(level=6).compress(data)
+    return gzip.compress(data, compresslevel=6)
+
+
+def decompress(data, codec):
+    if codec == 'zstd':
+        if not ZSTD_AVAILABLE:
+            raise RuntimeError("Snapshot was written with zstd - install zstandard to read it")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return gzip.decompress(data)
+
+
+def run_snapshot_dir(test_run_id, snapshots_dir=SNAPSHOTS_DIR):
+    return os.path.join(snapshots_dir, f"test_{test_run_id}")
+
+
+def capture_snapshot(driver):
+    """What the page said - live DOM source, visible text and title"""
+    from selenium.webdriver.common.by import By
+
+    try:
+        body_text = driver.find_element(By.TAG_NAME, "body").text
+    except Exception:
+        body_text = ''
+    return {
+        'page_source': driver.page_source,
+        'body_text': body_text,
+        'title': driver.title or '',
+        'current_url': driver.current_url,
+    }
+
+
+class SnapshotWriter:
+    """Compresses snapshots and appends them to per-run segment files on a background thread.
+
+    Each snapshot is compressed on its own, so an index row's (segment, offset, length)
+    is enough to read it back without touching the rest of the segment. Index rows are
+    only written once their bytes are on disk. Segment names carry the writer's own id,
+    so worker processes testing shards of the same run never append to each other's files.
+    """
+
+    def __init__(self, db_manager, snapshots_dir=SNAPSHOTS_DIR, codec=DEFAULT_CODEC, max_queue=500):
+        self.db_manager = db_manager
+        self.snapshots_dir = snapshots_dir
+        self.codec = codec
+        self._queue = queue.Queue(maxsize=max_queue)
+        self.writer_id = uuid.uuid4().hex[:8]
+        self._segments = {}  # test_run_id -> [segment number, open file]
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, test_run_id, row_number, url, snapshot):
+        """Queue a snapshot (dict from capture_snapshot) - blocks only if the writer is far behind"""
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="snapshot-writer", daemon=True)
+                self._thread.start()
+        self._queue.put((test_run_id, row_number, url, snapshot, datetime.utcnow()))
+
+    def flush(self):
+        """Wait until every queued snapshot is on disk and indexed"""
+        if self._thread is not None:
+            self._queue.join()
+
+    def shutdown(self):
+        self.flush()
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join(timeout=10)
+            self._thread = None
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is None:
+                self._queue.task_done()
+                break
+
+            batch = [item]
+            while len(batch) < INDEX_BATCH_SIZE:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    # Finish this batch, then stop
+                    self._queue.task_done()
+                    stopping = True
+                    break
+                batch.append(item)
+
+            try:
+                self._write_batch(batch)
+            except Exception as e:
+                logger.error(f"💥 Failed to write {len(batch)} page snapshots: {e}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+            if self._queue.empty():
+                self._close_segments()
+
+        self._close_segments()
+
+    def _write_batch(self, batch):
+        entries = []
+        for test_run_id, row_number, url, snapshot, captured_at in batch:
+            raw = json.dumps({'url': url, **snapshot}).encode('utf-8')
+            data = compress(raw, self.codec)
+            segment, f = self._segment_for(test_run_id, len(data))
+            offset = f.tell()
+            f.write(data)
+            entries.append({
+                'test_run_id': test_run_id,
+                'row_number': row_number,
+                'url': url,
+                'segment': segment,
+                'offset': offset,
+                'length': len(data),
+                'raw_size': len(raw),
+                'codec': self.codec,
+                'captured_at': captured_at,
+            })
+
+        for _, f in self._segments.values():
+            if f is not None:
+                f.flush()
+        self.db_manager.add_page_snapshots(entries)
+
+    def _segment_for(self, test_run_id, size):
+        current = self._segments.get(test_run_id)
+        if current is None:
+            os.makedirs(run_snapshot_dir(test_run_id, self.snapshots_dir), exist_ok=True)
+            current = self._segments[test_run_id] = [0, None]
+        elif current[1] is not None and current[1].tell() + size > SEGMENT_MAX_BYTES:
+            current[1].close()
+            current[0], current[1] = current[0] + 1, None
+
+        segment = f"segment_{self.writer_id}_{current[0]:04d}.bin"
+        if current[1] is None:
+            current[1] = open(os.path.join(run_snapshot_dir(test_run_id, self.snapshots_dir), segment), 'ab')
+        return segment, current[1]
+
+    def _close_segments(self):
+        """Close idle segment files - numbering is kept so the next write appends to the same segment"""
+        for current in self._segments.values():
+            if current[1] is not None:
+                try:
+                    current[1].close()
+                except Exception:
+                    pass
+                current[1] = None
+
+
+def read_snapshot(entry, snapshots_dir=SNAPSHOTS_DIR):
+    """Decode one snapshot from its index entry (mapping with test_run_id/segment/offset/length/codec)"""
+    path = os.path.join(run_snapshot_dir(entry['test_run_id'], snapshots_dir), entry['segment'])
+    with open(path, 'rb') as f:
+        f.seek(entry['offset'])
+        data = f.read(entry['length'])
+    return json.loads(decompress(data, entry['codec']))
+
+
+def iter_run_snapshots(db_manager, test_run_id, snapshots_dir=SNAPSHOTS_DIR):
+    """Yield (entry, snapshot) for a run in row order, keeping one segment file open at a time"""
+    handles = {}
+    try:
+        for entry in db_manager.get_page_snapshot_entries(test_run_id):
+            f = handles.get(entry['segment'])
+            if f is None:
+                for handle in handles.values():
+                    handle.close()
+                handles.clear()
+                path = os.path.join(run_snapshot_dir(test_run_id, snapshots_dir), entry['segment'])
+                f = handles[entry['segment']] = open(path, 'rb')
+            f.seek(entry['offset'])
+            yield entry, json.loads(decompress(f.read(entry['length']), entry['codec']))
+    finally:
+        for handle in handles.values():
+            handle.close()
+
+
+def load_snapshot(db_manager, test_run_id, row_number, snapshots_dir=SNAPSHOTS_DIR):
+    """Latest snapshot captured for one row, or None"""
+    entries = db_manager.get_page_snapshot_entries(test_run_id, row_numbers=[row_number])
+    if not entries:
+        return None
+    try:
+        return read_snapshot(entries[-1], snapshots_dir)
+    except Exception as e:
+        logger.warning(f"⚠️ Could not read snapshot for test {test_run_id} row {row_number}: {e}")
+        return None
+
+
+def remove_run_snapshots(db_manager, test_run_id, snapshots_dir=SNAPSHOTS_DIR):
+    db_manager.delete_page_snapshots(test_run_id)
+    run_dir = run_snapshot_dir(test_run_id, snapshots_dir)
+    if os.path.exists(run_dir):
+        shutil.rmtree(run_dir, ignore_errors=True)
@@ -0,0 +1,64 @@
+import time
+from contextlib import contextmanager
+
+# Where a URL's time goes, in the order the worker spends it
+PHASES = ('queue_wait', 'navigation', 'readiness', 'detection', 'snapshot', 'screenshot', 'db_flush')
+
+# TestResult column holding each phase, in milliseconds
+PHASE_COLUMNS = {phase: f"{phase}_ms" for phase in PHASES}
+
+
+class PhaseTimer:
+    """Accumulates wall-clock time per phase for one URL"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.durations = {}
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def add(self, name, seconds):
+        self.durations[name] = self.durations.get(name, 0.0) + seconds
+
+    @property
+    def total_ms(self):
+        return round((time.perf_counter() - self.started) * 1000, 1)
+
+    def as_ms(self):
+        """{phase: milliseconds} for the phases that ran"""
+        return {name: round(seconds * 1000, 1) for name, seconds in self.durations.items()}
+
+    def columns(self):
+        """TestResult column values for the recorded phases"""
+        return {PHASE_COLUMNS[name]: ms for name, ms in self.as_ms().items() if name in PHASE_COLUMNS}
+
+
+def summarize_phases(frame):
+    """Per-phase avg/p50/p95/total (ms) and share of time from a results frame"""
+    summary = {}
+    grand_total = 0.0
+    for phase, column in PHASE_COLUMNS.items():
+        if column not in frame:
+            continue
+        values = frame[column].dropna()
+        if values.empty:
+            continue
+        total = float(values.sum())
+        grand_total += total
+        summary[phase] = {
+            'count': int(values.count()),
+            'avg': round(float(values.mean()), 1),
+            'p50': round(float(values.quantile(0.5)), 1),
+            'p95': round(float(values.quantile(0.95)), 1),
+            'total': round(total, 1),
+        }
+
+    for stats in summary.values():
+        stats['share'] = round(stats['total'] / grand_total * 100, 1) if grand_total else 0.0
+    return summary
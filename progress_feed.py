@@ -0,0 +1,41 @@
+import os
+
+# Seconds between refreshes of the live progress panel while a run is active
+PROGRESS_POLL_SECONDS = float(os.environ.get("PROGRESS_POLL_SECONDS", "2"))
+
+# Runs the progress panel follows
+ACTIVE_STATUSES = ('pending', 'waiting_login', 'running')
+
+
+class ProgressFeed:
+    """A user's run_progress rows as the UI last saw them.
+
+    Each poll fetches only the rows written since the previous one, so refreshing the
+    panel costs one small indexed query however many runs and results there are.
+    """
+
+    def __init__(self, db_manager, user_id):
+        self.db_manager = db_manager
+        self.user_id = user_id
+        self.rows = {}  # run id -> status, progress, processed, passed, failed, skipped, updated_at
+        self.cursor = None  # Newest updated_at seen
+
+    def poll(self):
+        """Fetch what changed; returns the ids of runs whose status moved on since the last poll"""
+        changed = self.db_manager.get_progress_since(self.user_id, self.cursor)
+        if not changed:
+            return set()
+
+        moved = {run_id for run_id, row in changed.items()
+                 if run_id in self.rows and self.rows[run_id]['status'] != row['status']}
+        self.rows.update(changed)
+        self.cursor = max(row['updated_at'] for row in changed.values())
+        return moved
+
+    def get(self, test_run):
+        """Latest counters for a run - from the feed, or from the run itself before it has any"""
+        row = self.rows.get(test_run.id)
+        if row is not None:
+            return row
+        return {'status': test_run.status, 'progress': test_run.progress or 0.0, 'processed': None,
+                'passed': test_run.passed or 0, 'failed': test_run.failed or 0, 'skipped': test_run.skipped or 0}
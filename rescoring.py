@@ -0,0 +1,178 @@
+"""Re-score finished runs with the current detection rules, from their page snapshots.
+
+Nothing is loaded in a browser: each stored snapshot is decompressed and evaluated
+in a process pool, and every result gets a new verdict version in result_verdicts.
+With --apply the new verdicts also replace the results' status.
+
+    python rescoring.py 41 42 --processes 8
+    python rescoring.py --all --apply --json rescore.json
+"""
+import json
+import time
+import logging
+import argparse
+from datetime import datetime
+from multiprocessing import Pool
+
+from page_detection import PageSnapshot, evaluate_snapshot, evaluate_http_status, alert_from_reason, rules_version
+from page_snapshots import SNAPSHOTS_DIR, read_snapshot
+
+logger = logging.getLogger(__name__)
+
+RESULT_COLUMNS = ['id', 'row_number', 'url', 'status', 'error_message', 'http_status']
+
+
+def score_entry(task):
+    """Verdict for one snapshot index entry - runs in a pool process and reads the segment itself"""
+    entry, original_reason, http_status, snapshots_dir = task
+
+    # An error response fails whatever the page says - the page isn't even read
+    verdict = evaluate_http_status(http_status)
+    if verdict:
+        return entry['row_number'], 'FAIL', verdict['reason'], verdict['criteria']
+
+    try:
+        data = read_snapshot(entry, snapshots_dir)
+    except Exception as e:
+        return entry['row_number'], None, f"Unreadable snapshot: {e}", None
+
+    # Alerts are accepted during detection, so the snapshot can't show them - reuse the recorded text
+    snapshot = PageSnapshot.from_html(data.get('page_source', ''), url=data.get('url'),
+                                      alert_text=alert_from_reason(original_reason) or '')
+    if data.get('body_text') is not None:
+        snapshot.body_text = data['body_text']
+    snapshot.title = data.get('title') or snapshot.title
+
+    verdict = evaluate_snapshot(snapshot)
+    status = 'FAIL' if verdict['is_fail'] else 'PASS'
+    return entry['row_number'], status, verdict['reason'], verdict['criteria']
+
+
+def rescore_run(db_manager, test_run_id, pool=None, apply=False, snapshots_dir=SNAPSHOTS_DIR, chunksize=32):
+    """Write a new verdict version for every snapshotted result of a run and report what changed"""
+    started = time.perf_counter()
+    results = {row['row_number']: row for row in db_manager.iter_test_results(test_run_id, columns=RESULT_COLUMNS)}
+
+    # Latest snapshot per row
+    entries = {}
+    for entry in db_manager.get_page_snapshot_entries(test_run_id):
+        if entry['row_number'] in results:
+            entries[entry['row_number']] = entry
+
+    previous_version = db_manager.get_latest_verdict_version(test_run_id)
+    previous = db_manager.get_verdicts(test_run_id, previous_version) if previous_version else {}
+    version = previous_version + 1
+    rules = rules_version()
+
+    tasks = [(entry, results[row]['error_message'], results[row]['http_status'], snapshots_dir)
+             for row, entry in entries.items()]
+    scored = pool.imap(score_entry, tasks, chunksize=chunksize) if pool else map(score_entry, tasks)
+
+    verdicts, changed, unreadable = [], [], 0
+    scored_at = datetime.utcnow()
+    for row_number, status, reason, criteria in scored:
+        if status is None:
+            unreadable += 1
+            logger.warning(f"⚠️ Test {test_run_id} row {row_number}: {reason}")
+            continue
+
+        result = results[row_number]
+        previous_status = previous.get(row_number, (result['status'], None))[0]
+        verdict = {
+            'test_run_id': test_run_id,
+            'row_number': row_number,
+            'result_id': result['id'],
+            'version': version,
+            'rules_version': rules,
+            'status': status,
+            'reason': reason,
+            'criteria': criteria,
+            'previous_status': previous_status,
+            'changed': status != previous_status,
+            'scored_at': scored_at,
+        }
+        verdicts.append(verdict)
+        if verdict['changed']:
+            changed.append({'row_number': row_number, 'url': result['url'], 'from': previous_status,
+                            'to': status, 'reason': reason})
+
+    db_manager.add_result_verdicts(verdicts)
+
+    # Applying compares against what the results say now, which an earlier dry run doesn't change
+    applied = [v for v in verdicts if v['status'] != results[v['row_number']]['status']] if apply else []
+    if applied:
+        db_manager.apply_verdicts(test_run_id, applied)
+
+    report = {
+        'test_run_id': test_run_id,
+        'version': version,
+        'rules_version': rules,
+        'results': len(results),
+        'scored': len(verdicts),
+        'no_snapshot': len(results) - len(entries),
+        'unreadable': unreadable,
+        'changed': len(changed),
+        'pass_to_fail': sum(c['to'] == 'FAIL' for c in changed),
+        'fail_to_pass': sum(c['to'] == 'PASS' for c in changed),
+        'applied': len(applied),
+        'seconds': round(time.perf_counter() - started, 2),
+        'changes': sorted(changed, key=lambda c: c['row_number']),
+    }
+    logger.info(f"🔁 Test {test_run_id} re-scored as verdict v{version} (rules {rules}): {len(verdicts)} scored, "
+                f"{len(changed)} changed ({report['pass_to_fail']} PASS→FAIL, {report['fail_to_pass']} FAIL→PASS)")
+    return report
+
+
+def rescore_runs(db_manager, test_run_ids, processes=None, apply=False, snapshots_dir=SNAPSHOTS_DIR):
+    """Re-score several runs with one shared process pool"""
+    if processes == 1:
+        return [rescore_run(db_manager, run_id, None, apply, snapshots_dir) for run_id in test_run_ids]
+    with Pool(processes=processes) as pool:
+        return [rescore_run(db_manager, run_id, pool, apply, snapshots_dir) for run_id in test_run_ids]
+
+
+def print_report(reports, show_changes=20):
+    for r in reports:
+        applied = f", {r['applied']} results updated" if r['applied'] else ""
+        print(f"Test {r['test_run_id']}: verdict v{r['version']} (rules {r['rules_version']}) - "
+              f"{r['scored']}/{r['results']} scored, {r['no_snapshot']} without snapshot, "
+              f"{r['changed']} changed ({r['pass_to_fail']} PASS→FAIL, {r['fail_to_pass']} FAIL→PASS)"
+              f"{applied} in {r['seconds']}s")
+        for change in r['changes'][:show_changes]:
+            print(f"  row {change['row_number'] + 1}: {change['from']} → {change['to']} "
+                  f"({change['reason'] or 'no fail criteria'}) - {change['url']}")
+        if len(r['changes']) > show_changes:
+            print(f"  ... and {len(r['changes']) - show_changes} more")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-score finished test runs from their page snapshots")
+    parser.add_argument("test_run_ids", nargs="*", type=int, help="Test run IDs to re-score")
+    parser.add_argument("--all", action="store_true", help="Re-score every run that has snapshots")
+    parser.add_argument("--apply", action="store_true", help="Replace result statuses with the new verdicts")
+    parser.add_argument("--processes", type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument("--db", default="yardi_tester.db", help="Database file")
+    parser.add_argument("--json", dest="json_path", help="Also write the reports to this JSON file")
+    parser.add_argument("--show-changes", type=int, default=20)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    # Imported here so pool processes don't open the database when they import this module
+    from database import DatabaseManager
+
+    db_manager = DatabaseManager(args.db)
+    test_run_ids = db_manager.get_snapshot_run_ids() if args.all else args.test_run_ids
+    if not test_run_ids:
+        parser.error("give test run IDs or --all")
+
+    reports = rescore_runs(db_manager, test_run_ids, args.processes, args.apply)
+    print_report(reports, args.show_changes)
+
+    if args.json_path:
+        with open(args.json_path, 'w') as f:
+            json.dump(reports, f, indent=2)
+    db_manager.close()
+
+
+if __name__ == "__main__":
+    main()
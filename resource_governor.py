@@ -0,0 +1,121 @@
+import os
+import time
+import logging
+import weakref
+
+try:
+    import psutil
+
+    PSUTIL_AVAILABLE = True
+except ImportError:
+    PSUTIL_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+MB = 1024 * 1024
+
+# Memory the worker's browsers may use between them, in MB (0 turns the governor off)
+MEMORY_BUDGET_MB = float(os.environ.get("WORKER_MEMORY_BUDGET_MB", "0"))
+
+# What a fresh browser is assumed to take until one has been measured
+BROWSER_MEMORY_ESTIMATE_MB = float(os.environ.get("BROWSER_MEMORY_ESTIMATE_MB", "400"))
+
+# Seconds between samples of the browsers' memory
+MEMORY_SAMPLE_SECONDS = float(os.environ.get("MEMORY_SAMPLE_SECONDS", "15"))
+
+
+def driver_process(driver):
+    """The chromedriver process behind a driver, or None once it has exited"""
+    try:
+        process = driver.service.process
+    except AttributeError:
+        return None
+    return process if process is not None and process.poll() is None else None
+
+
+def process_tree_rss(pid):
+    """Resident memory in bytes of a process and everything it started - chromedriver, Chrome and its renderers"""
+    root = psutil.Process(pid)
+    total = 0
+    for process in [root] + root.children(recursive=True):
+        try:
+            total += process.memory_info().rss
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            pass
+    return total
+
+
+class ResourceGovernor:
+    """Keeps the worker's browsers within a memory budget.
+
+    Each browser's process tree is sampled for resident memory. The average browser
+    sets how many fit in the budget, a new browser is refused when it wouldn't fit,
+    and when the browsers outgrow the budget the heaviest are closed or recycled first.
+    """
+
+    def __init__(self, budget_mb=MEMORY_BUDGET_MB, estimate_mb=BROWSER_MEMORY_ESTIMATE_MB,
+                 sample_seconds=MEMORY_SAMPLE_SECONDS):
+        self.budget = int(budget_mb * MB)
+        self.estimate = int(estimate_mb * MB)
+        self.sample_seconds = sample_seconds
+        self.enabled = self.budget > 0 and PSUTIL_AVAILABLE
+        self.refusals = 0
+        self._usage = weakref.WeakKeyDictionary()  # driver -> RSS bytes at the last sample
+        self._last_sample = 0.0
+
+        if self.budget > 0 and not PSUTIL_AVAILABLE:
+            logger.warning("⚠️ WORKER_MEMORY_BUDGET_MB is set but psutil is not installed - no memory governor")
+
+    def due(self):
+        return self.enabled and time.monotonic() - self._last_sample >= self.sample_seconds
+
+    def sample(self, drivers):
+        """Measure every live browser; returns {driver: bytes}"""
+        self._last_sample = time.monotonic()
+        self._usage = weakref.WeakKeyDictionary()
+        for driver in drivers:
+            process = driver_process(driver)
+            if process is None:
+                continue
+            try:
+                self._usage[driver] = process_tree_rss(process.pid)
+            except psutil.Error:
+                pass
+        return dict(self._usage)
+
+    def forget(self, driver):
+        self._usage.pop(driver, None)
+
+    @property
+    def total(self):
+        return sum(rss for driver, rss in self._usage.items() if driver_process(driver) is not None)
+
+    def browser_cost(self):
+        """Bytes one browser is expected to take - the measured average, never below the estimate"""
+        sizes = list(self._usage.values())
+        return max(self.estimate, sum(sizes) // len(sizes)) if sizes else self.estimate
+
+    def capacity(self):
+        """Browsers that fit in the budget (at least one), or None without a budget"""
+        if not self.enabled:
+            return None
+        return max(1, int(self.budget // self.browser_cost()))
+
+    def can_spawn(self):
+        """Room in the budget for one more browser"""
+        if not self.enabled:
+            return True
+        return self.total + self.browser_cost() <= self.budget
+
+    def refuse(self, reason):
+        self.refusals += 1
+        logger.warning(f"🧠 Not starting a browser - {reason} "
+                       f"({self.total / MB:.0f} of {self.budget / MB:.0f} MB in use)")
+
+    def over_budget(self):
+        """Bytes the browsers are over the budget by - 0 or less when within it"""
+        return self.total - self.budget if self.enabled else 0
+
+    def heaviest_first(self):
+        return sorted(((driver, rss) for driver, rss in self._usage.items() if driver_process(driver) is not None),
+                      key=lambda item: -item[1])
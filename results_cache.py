@@ -0,0 +1,61 @@
+import streamlit as st
+
+from phase_timing import summarize_phases
+
+# Cached entries are keyed by (test_run_id, run_version). The worker bumps the
+# version whenever it writes results, so stale entries are never served - they
+# simply age out of the bounded cache.
+CACHE_MAX_ENTRIES = 16
+CACHE_TTL_SECONDS = 3600
+
+GALLERY_COLUMNS = ['id', 'row_number', 'url', 'status', 'screenshot_filename', 'error_message',
+                   'menu_type', 'caption']
+
+
+def categorize_error(error_message):
+    """Bucket an error message for the error distribution chart"""
+    if not error_message:
+        return 'Unknown'
+
+    error_msg = error_message.lower()
+    if 'timeout' in error_msg:
+        return 'Timeout'
+    elif 'not found' in error_msg or '404' in error_msg:
+        return 'Page Not Found'
+    elif 'access denied' in error_msg or 'forbidden' in error_msg:
+        return 'Access Denied'
+    elif 'invalid' in error_msg:
+        return 'Invalid Page'
+    return 'Other'
+
+
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES, ttl=CACHE_TTL_SECONDS, show_spinner=False)
+def load_results_frame(_db_manager, test_run_id, run_version):
+    """Results of a run as a DataFrame"""
+    return _db_manager.get_test_results_frame(test_run_id)
+
+
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES, ttl=CACHE_TTL_SECONDS, show_spinner=False)
+def load_run_analytics(_db_manager, test_run_id, run_version):
+    """Counters and distributions shown in the stats row and Analytics tab"""
+    frame = load_results_frame(_db_manager, test_run_id, run_version)
+    failed = frame[frame['status'] == 'FAIL']
+
+    return {
+        'total': len(frame),
+        'passed': int((frame['status'] == 'PASS').sum()),
+        'failed': len(failed),
+        'screenshots': int(frame['screenshot_filename'].notna().sum()),
+        'status_counts': frame['status'].value_counts().to_dict(),
+        'error_types': failed['error_message'].map(categorize_error).value_counts().to_dict(),
+        'menu_breakdown': _db_manager.get_menu_type_breakdown(test_run_id),
+        'phase_timings': summarize_phases(frame),
+    }
+
+
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES, ttl=CACHE_TTL_SECONDS, show_spinner=False)
+def load_gallery_index(_db_manager, test_run_id, run_version):
+    """Lightweight records for every result that has a screenshot"""
+    frame = load_results_frame(_db_manager, test_run_id, run_version)
+    with_screenshots = frame[frame['screenshot_filename'].notna()]
+    return with_screenshots[GALLERY_COLUMNS].to_dict('records')
@@ -0,0 +1,88 @@
+import os
+import time
+import heapq
+
+# Page loads a URL gets before a transient error is recorded as its result
+RETRY_MAX_ATTEMPTS = int(os.environ.get("RETRY_MAX_ATTEMPTS", "3"))
+
+# Wait before the first retry of a URL - doubles with every further attempt
+RETRY_BACKOFF_SECONDS = float(os.environ.get("RETRY_BACKOFF_SECONDS", "10"))
+
+# Error text that means the load failed on the way, not that the page is broken
+TRANSIENT_ERROR_MARKERS = [
+    'timeout', 'timed out', 'err_timed_out', 'err_connection_reset', 'err_connection_closed',
+    'err_connection_aborted', 'err_network_changed', 'err_internet_disconnected', 'err_empty_response',
+    'err_http2_protocol_error', 'tab crashed', 'renderer', 'target window already closed',
+    'disconnected', 'invalid session id', 'chrome not reachable',
+]
+
+# Of those, the ones after which the browser itself has to be replaced
+BROWSER_LOST_MARKERS = ['tab crashed', 'disconnected', 'invalid session id', 'chrome not reachable',
+                        'target window already closed']
+
+
+class TransientNavigationError(Exception):
+    """A page load failed in a way that is likely to work on another attempt"""
+
+
+def is_transient_error(error):
+    """True for timeouts, dropped connections and crashed renderers"""
+    if type(error).__name__ == 'TimeoutException':
+        return True
+    message = str(error).lower()
+    return any(marker in message for marker in TRANSIENT_ERROR_MARKERS)
+
+
+def is_browser_lost(error):
+    message = str(error).lower()
+    return any(marker in message for marker in BROWSER_LOST_MARKERS)
+
+
+class RetryQueue:
+    """Rows whose page load failed transiently, each due again after an exponential backoff.
+
+    interleave() slots due retries in between a run's rows, so a retry never holds up the
+    URLs behind it. Once the rows run out, the rest are taken with pop_due() as they come
+    due - nothing here waits for them.
+    """
+
+    def __init__(self, max_attempts=RETRY_MAX_ATTEMPTS, backoff_seconds=RETRY_BACKOFF_SECONDS):
+        self.max_attempts = max_attempts
+        self.backoff_seconds = backoff_seconds
+        self._heap = []  # (due time, row number, url, metadata, next attempt)
+
+    def __len__(self):
+        return len(self._heap)
+
+    def defer(self, row_number, url, metadata, attempt):
+        """Queue another attempt after a transient failure; False once the row is out of attempts"""
+        if attempt >= self.max_attempts:
+            return False
+        due = time.monotonic() + self.backoff_seconds * 2 ** (attempt - 1)
+        heapq.heappush(self._heap, (due, row_number, url, metadata, attempt + 1))
+        return True
+
+    def first_row(self):
+        """Lowest row number still waiting for a retry, or None"""
+        return min((item[1] for item in self._heap), default=None)
+
+    def next_due(self):
+        """time.monotonic() at which the next retry is due, or None when none are queued"""
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due(self):
+        """(row number, url, metadata, attempt) of a retry that is due now, or None"""
+        if not self._heap or self._heap[0][0] > time.monotonic():
+            return None
+        _, row_number, url, metadata, attempt = heapq.heappop(self._heap)
+        return row_number, url, metadata, attempt
+
+    def interleave(self, rows):
+        """Yield (row number, url, metadata, attempt) for rows (attempt 1), with retries slotted in as they come due"""
+        for row_number, url, metadata in rows:
+            while True:
+                retry = self.pop_due()
+                if retry is None:
+                    break
+                yield retry
+            yield row_number, url, metadata, 1
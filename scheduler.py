@@ -0,0 +1,150 @@
+import os
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Page loads a run gets before the scheduler looks at the other runs again
+CHUNK_SIZE = int(os.environ.get("SCHEDULER_CHUNK_SIZE", "25"))
+
+# Runs interleaved at once - each needs a session, and runs on different tenants need their own browser
+MAX_ACTIVE_RUNS = int(os.environ.get("SCHEDULER_MAX_ACTIVE_RUNS", "8"))
+
+# A shard claim whose worker hasn't reported for this long can be taken over by another worker
+SHARD_LEASE_SECONDS = int(os.environ.get("SHARD_LEASE_SECONDS", "300"))
+
+# Most shards a run can be split into from the UI
+MAX_SHARDS = int(os.environ.get("MAX_SHARDS", "16"))
+
+# Shards of the same run one worker process holds at once - the rest are left for other processes
+SHARDS_PER_WORKER = int(os.environ.get("SHARDS_PER_WORKER", "1"))
+
+# Share of a user's time each run gets, by priority
+PRIORITY_WEIGHTS = {'low': 1, 'normal': 2, 'high': 4}
+PRIORITIES = list(PRIORITY_WEIGHTS)
+DEFAULT_PRIORITY = 'normal'
+
+
+def parse_user_weights(spec):
+    """'alice=2,bob=0.5' -> {'alice': 2.0, 'bob': 0.5} - users not listed weigh 1"""
+    weights = {}
+    for item in (spec or '').split(','):
+        name, _, weight = item.partition('=')
+        try:
+            if name.strip():
+                weights[name.strip()] = max(float(weight), 0.01)
+        except ValueError:
+            logger.warning(f"⚠️ Ignoring scheduler weight '{item}'")
+    return weights
+
+
+USER_WEIGHTS = parse_user_weights(os.environ.get("SCHEDULER_USER_WEIGHTS", ""))
+
+
+def shard_rows(rows, start_row, end_row=None):
+    """Only the rows of a shard's range from a run's (row, url, metadata) stream"""
+    for row in rows:
+        if row[0] < start_row:
+            continue
+        if end_row is not None and row[0] >= end_row:
+            return
+        yield row
+
+
+class RunContext:
+    """Everything an active run carries between chunks"""
+
+    def __init__(self, test_run, driver, source, rows, screenshot_dir, metadata_fields, capture_snapshots,
+                 breaker, retries, resume_from=0, user_weight=1.0, shard=None):
+        self.test_run = test_run
+        self.shard = shard  # TestShard when only a row range of the run is ours
+        self.driver = driver
+        self.source = source
+        self.rows = rows  # Generator of (row, url, metadata, attempt) - resumed by each chunk
+        self.screenshot_dir = screenshot_dir
+        self.metadata_fields = metadata_fields
+        self.capture_snapshots = capture_snapshots
+        self.breaker = breaker
+        self.retries = retries
+        self.resume_from = resume_from
+        self.total_urls = test_run.total_urls or 0
+        self.passed = self.failed = self.skipped = self.processed = 0
+        self.next_row = resume_from  # Every row below this has been dispatched at least once
+        self.in_flight = set()  # Rows loading in a browser tab right now
+        self.canary = None  # {'attempt', 'resume_row'} while a tripped circuit breaker is probing the target
+        self.not_before = 0.0  # time.monotonic() before which the run has nothing due - backed-off retries or canary
+        self.last_url_done = time.perf_counter()
+        self.stopped = None  # completed, waiting_login, parked, failed or released once the run leaves the worker
+        self._marks = {}  # periodic task -> processed count it last ran at
+
+        self.user_id = test_run.user_id
+        self.user_weight = user_weight
+        self.priority = test_run.priority if test_run.priority in PRIORITY_WEIGHTS else DEFAULT_PRIORITY
+        self.vtime = 0.0  # Page loads served, divided by the priority weight
+
+    @property
+    def key(self):
+        return (self.test_run.id, self.shard.shard_index if self.shard is not None else None)
+
+    @property
+    def label(self):
+        if self.shard is None:
+            return str(self.test_run.id)
+        return f"{self.test_run.id} shard {self.shard.shard_index + 1}/{self.test_run.shard_count}"
+
+    @property
+    def progress(self):
+        return min(self.processed / self.total_urls * 100, 100.0) if self.total_urls else 0
+
+    def every(self, task, interval):
+        """True when processed has grown by interval since task last ran - retry outcomes don't move it"""
+        if self.processed - self._marks.get(task, 0) < interval:
+            return False
+        self._marks[task] = self.processed
+        return True
+
+    def first_pending_row(self):
+        """Lowest dispatched row without a result yet - waiting for a retry or still loading - or None"""
+        return min([row for row in (self.retries.first_row(), *self.in_flight) if row is not None], default=None)
+
+    def resume_row(self):
+        """Row a stopped run should continue from - the earliest one not finished"""
+        first_pending = self.first_pending_row()
+        return self.next_row if first_pending is None else min(self.next_row, first_pending)
+
+
+class FairShareScheduler:
+    """Decides which active run gets the next chunk.
+
+    Users share the worker in proportion to their weight, whatever number of runs each has
+    queued. Within a user, runs share that user's time in proportion to their priority.
+    Both are tracked as virtual time (page loads / weight), and the lowest goes next.
+    """
+
+    def __init__(self, user_weights=None):
+        self.user_weights = USER_WEIGHTS if user_weights is None else user_weights
+        self._user_vtime = {}  # user id -> page loads / user weight
+
+    def weight_for(self, username):
+        return self.user_weights.get(username, 1.0)
+
+    def admit(self, ctx, active):
+        """Start a run level with what's active now, so idle time isn't banked as credit"""
+        siblings = [c.vtime for c in active if c.user_id == ctx.user_id]
+        ctx.vtime = min(siblings) if siblings else 0.0
+
+        if not siblings:
+            others = [self._user_vtime.get(c.user_id, 0.0) for c in active]
+            floor = min(others) if others else 0.0
+            self._user_vtime[ctx.user_id] = max(self._user_vtime.get(ctx.user_id, 0.0), floor)
+
+    def pick(self, active):
+        if not active:
+            return None
+        user_id = min({c.user_id for c in active}, key=lambda u: (self._user_vtime.get(u, 0.0), u))
+        runs = [c for c in active if c.user_id == user_id]
+        return min(runs, key=lambda c: (c.vtime, c.test_run.created_date))
+
+    def charge(self, ctx, page_loads):
+        ctx.vtime += page_loads / PRIORITY_WEIGHTS[ctx.priority]
+        self._user_vtime[ctx.user_id] = self._user_vtime.get(ctx.user_id, 0.0) + page_loads / ctx.user_weight
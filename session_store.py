@@ -0,0 +1,331 @@
+import os
+import re
+import json
+import time
+import logging
+import threading
+import urllib.error
+import urllib.request
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+STORE_DIR = os.path.join("sessions", "store")
+
+# How long a captured SSO session is offered to new jobs before a fresh login is asked for
+SESSION_TTL_SECONDS = int(os.environ.get("SESSION_STORE_TTL_MINUTES", "480")) * 60
+
+# Warm browsers kept per tenant domain, and how long one may sit unused
+BROWSER_POOL_SIZE = int(os.environ.get("BROWSER_POOL_SIZE", "2"))
+BROWSER_IDLE_SECONDS = int(os.environ.get("BROWSER_POOL_IDLE_MINUTES", "30")) * 60
+
+# Seconds between keep-alive requests to each tenant with a stored session
+KEEPALIVE_SECONDS = int(os.environ.get("SESSION_KEEPALIVE_SECONDS", "300"))
+
+# Page titles that mean we are looking at a login page, not the tenant
+LOGIN_INDICATORS = ['login', 'sign in', 'authenticate', 'invalid']
+
+
+class SessionExpired(Exception):
+    """The tenant sent a tested URL to a login page - the session ran out mid-run"""
+
+
+def domain_for_url(url):
+    """Host a session belongs to - sessions are shared between jobs on the same tenant host"""
+    if not url:
+        return None
+    return (urlsplit(url if '://' in url else f"https://{url}").hostname or '').lower() or None
+
+
+def looks_like_login(title, url=None):
+    """True if a page title (or its URL path) says the session is gone"""
+    title = (title or '').lower()
+    if any(indicator in title for indicator in LOGIN_INDICATORS):
+        return True
+    path = urlsplit(url).path.lower() if url else ''
+    return any(marker in path for marker in ('login', 'signin'))
+
+
+def is_login_redirect(requested_url, current_url, title):
+    """True if loading requested_url ended on a login page somewhere else - the session has expired.
+
+    Requiring a redirect keeps tested pages whose own title happens to contain a
+    login indicator (e.g. "Invalid ...") from pausing the run.
+    """
+    if not current_url or not requested_url:
+        return False
+    requested, current = urlsplit(requested_url), urlsplit(current_url)
+    if (requested.hostname, requested.path.lower()) == (current.hostname, current.path.lower()):
+        return False
+    return looks_like_login(title, current_url)
+
+
+def probe_session(driver, probe_url):
+    """Load a page the session should reach and check we weren't sent to a login page"""
+    try:
+        driver.get(probe_url)
+        time.sleep(1)
+        return not looks_like_login(driver.title, driver.current_url)
+    except Exception as e:
+        logger.debug(f"Session probe failed for {probe_url}: {e}")
+        return False
+
+
+class SessionStore:
+    """Captured SSO sessions on disk, one per tenant domain, with an expiry"""
+
+    def __init__(self, store_dir=STORE_DIR, ttl_seconds=SESSION_TTL_SECONDS):
+        self.store_dir = store_dir
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+
+    def _path(self, domain):
+        return os.path.join(self.store_dir, f"{domain}.json")
+
+    def _write(self, entry):
+        """Replace a domain's file in one step - other processes never read a half-written one"""
+        os.makedirs(self.store_dir, exist_ok=True)
+        path = self._path(entry['domain'])
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with self._lock:
+            # Cookies are credentials - keep the file private to this user
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, 'w') as f:
+                json.dump(entry, f)
+            os.replace(tmp_path, path)
+
+    def save(self, session_data, domain=None):
+        """Store a session captured in the UI; returns the domain it was filed under"""
+        domain = domain or session_data.get('domain') or domain_for_url(session_data.get('current_url'))
+        domain = domain_for_url(domain)
+        if not domain:
+            return None
+
+        now = time.time()
+        entry = {'domain': domain, 'captured_at': now, 'expires_at': now + self.ttl_seconds,
+                 'last_validated_at': now, 'session': session_data}
+        self._write(entry)
+        logger.info(f"🔑 Stored session for {domain} (valid for {self.ttl_seconds // 60} min)")
+        return domain
+
+    def _read(self, domain):
+        domain = domain_for_url(domain)
+        if not domain:
+            return None
+        try:
+            with open(self._path(domain)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def entry(self, domain):
+        """Stored entry for a domain if it hasn't expired or been found logged out, else None"""
+        entry = self._read(domain)
+        if entry is None or entry.get('expires_at', 0) <= time.time() or entry.get('logged_out_at'):
+            return None
+        return entry
+
+    def mark_logged_out(self, domain):
+        """The tenant sent a request with this session to a login page - stop offering it until a new login"""
+        entry = self.entry(domain)
+        if entry is None:
+            return
+        entry['logged_out_at'] = time.time()
+        self._write(entry)
+        logger.warning(f"🔒 Stored session for {entry['domain']} was logged out - a new login is needed")
+
+    def logged_out_at(self, domain):
+        """When the stored session for a domain was found logged out, or None"""
+        entry = self._read(domain)
+        return entry.get('logged_out_at') if entry else None
+
+    def get(self, domain):
+        entry = self.entry(domain)
+        return entry['session'] if entry else None
+
+    def mark_valid(self, domain):
+        """Record a successful probe - the expiry itself is not extended"""
+        entry = self.entry(domain)
+        if entry is None:
+            return
+        entry['last_validated_at'] = time.time()
+        self._write(entry)
+
+    def update_cookies(self, domain, cookies):
+        """Refresh a stored session's cookies from a browser that is still logged in"""
+        entry = self.entry(domain)
+        if entry is None or not cookies:
+            return
+        entry['session']['cookies'] = cookies
+        entry['last_validated_at'] = time.time()
+        self._write(entry)
+
+    def domains(self):
+        """Domains with an unexpired stored session"""
+        if not os.path.isdir(self.store_dir):
+            return []
+        names = [name[:-5] for name in os.listdir(self.store_dir) if name.endswith('.json')]
+        return [domain for domain in names if self.entry(domain) is not None]
+
+    def invalidate(self, domain):
+        domain = domain_for_url(domain)
+        try:
+            os.remove(self._path(domain))
+            logger.info(f"🔒 Stored session for {domain} discarded")
+        except OSError:
+            pass
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    """Don't follow redirects - they would carry the tenant's cookies to the SSO host"""
+
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+
+def _cookie_header(cookies, domain):
+    pairs = []
+    for cookie in cookies or []:
+        cookie_domain = (cookie.get('domain') or domain).lstrip('.').lower()
+        if domain == cookie_domain or domain.endswith(f".{cookie_domain}"):
+            pairs.append(f"{cookie['name']}={cookie['value']}")
+    return "; ".join(pairs)
+
+
+class SessionKeepAlive:
+    """Background thread that touches every tenant with a stored session so it doesn't idle out.
+
+    Requests use the stored cookies without the browser, so they never compete with the
+    worker for the WebDriver. A ping that is sent to a login page reports the session as
+    expired through on_ping(domain, alive).
+    """
+
+    def __init__(self, store, interval=KEEPALIVE_SECONDS, timeout=15, on_ping=None):
+        self.store = store
+        self.interval = interval
+        self.timeout = timeout
+        self.on_ping = on_ping
+        self.last_ping = {}  # domain -> (unix time, alive)
+        self._opener = urllib.request.build_opener(_NoRedirect)
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None and self.interval > 0:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="session-keepalive", daemon=True)
+            self._thread.start()
+            logger.info(f"💓 Session keep-alive every {self.interval}s")
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.timeout + 1)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            for domain in self.store.domains():
+                if self._stop.is_set():
+                    return
+                self.ping(domain)
+
+    def ping(self, domain):
+        """Touch one tenant; returns True/False for alive/expired, None if it couldn't be reached"""
+        entry = self.store.entry(domain)
+        if entry is None:
+            return None
+
+        session = entry['session']
+        url = session.get('current_url') or f"https://{domain}/"
+        if domain_for_url(url) != entry['domain']:
+            url = f"https://{entry['domain']}/"
+        request = urllib.request.Request(url, headers={
+            'Cookie': _cookie_header(session.get('cookies'), entry['domain']),
+            'User-Agent': "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko)",
+        })
+
+        try:
+            with self._opener.open(request, timeout=self.timeout) as response:
+                body = response.read(65536).decode('utf-8', errors='replace')
+            match = re.search(r"<title[^>]*>(.*?)</title>", body, re.IGNORECASE | re.DOTALL)
+            alive = not looks_like_login(match.group(1).strip() if match else '', url)
+        except urllib.error.HTTPError as e:
+            if 300 <= e.code < 400:
+                location = e.headers.get('Location', '')
+                alive = not looks_like_login('', location) and domain_for_url(location) in (None, entry['domain'])
+            else:
+                alive = e.code not in (401, 403)
+        except Exception as e:
+            logger.debug(f"Keep-alive for {domain} failed: {e}")
+            return None
+
+        self.last_ping[entry['domain']] = (time.time(), alive)
+        if alive:
+            logger.debug(f"💓 Session for {entry['domain']} still alive")
+        else:
+            logger.warning(f"⚠️ Keep-alive for {entry['domain']} was sent to a login page - session looks expired")
+        if self.on_ping is not None:
+            self.on_ping(entry['domain'], alive)
+        return alive
+
+
+class WarmBrowserPool:
+    """Authenticated browsers kept open between jobs, keyed by tenant domain"""
+
+    def __init__(self, max_size=BROWSER_POOL_SIZE, idle_seconds=BROWSER_IDLE_SECONDS):
+        self.max_size = max_size
+        self.idle_seconds = idle_seconds
+        self._browsers = {}  # domain -> [driver, last used]
+
+    def get(self, domain):
+        item = self._browsers.get(domain)
+        if item is None:
+            return None
+        item[1] = time.time()
+        return item[0]
+
+    def put(self, domain, driver):
+        current = self._browsers.get(domain)
+        if current is not None and current[0] is not driver:
+            self._quit(current[0])
+        self._browsers[domain] = [driver, time.time()]
+
+        # Over capacity - drop the least recently used tenant
+        while len(self._browsers) > self.max_size:
+            oldest = min(self._browsers, key=lambda d: self._browsers[d][1])
+            self.discard(oldest)
+
+    def owns(self, driver):
+        return any(item[0] is driver for item in self._browsers.values())
+
+    def has(self, domain):
+        return domain in self._browsers
+
+    def domain_of(self, driver):
+        return next((domain for domain, item in self._browsers.items() if item[0] is driver), None)
+
+    def discard(self, domain):
+        item = self._browsers.pop(domain, None)
+        if item is not None:
+            self._quit(item[0])
+
+    def close_idle(self):
+        cutoff = time.time() - self.idle_seconds
+        for domain in [d for d, item in self._browsers.items() if item[1] < cutoff]:
+            logger.info(f"🧹 Closing browser for {domain} - idle for {self.idle_seconds // 60} min")
+            self.discard(domain)
+
+    def close_all(self):
+        for domain in list(self._browsers):
+            self.discard(domain)
+
+    def __len__(self):
+        return len(self._browsers)
+
+    @staticmethod
+    def _quit(driver):
+        try:
+            driver.quit()
+        except Exception:
+            pass
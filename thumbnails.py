@@ -0,0 +1,74 @@
+import os
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+THUMBNAIL_DIRNAME = "thumbs"
+THUMBNAIL_SIZE = (400, 300)
+THUMBNAIL_QUALITY = 70
+
+
+def thumbnail_path(screenshot_path):
+    """screenshots/test_1/shot.png -> screenshots/test_1/thumbs/shot.jpg"""
+    directory, filename = os.path.split(screenshot_path)
+    stem = os.path.splitext(filename)[0]
+    return os.path.join(directory, THUMBNAIL_DIRNAME, f"{stem}.jpg")
+
+
+def create_thumbnail(screenshot_path):
+    """Write a small JPEG next to the screenshot. Returns the thumbnail path or None."""
+    thumb_path = thumbnail_path(screenshot_path)
+    try:
+        os.makedirs(os.path.dirname(thumb_path), exist_ok=True)
+        with Image.open(screenshot_path) as image:
+            image.thumbnail(THUMBNAIL_SIZE, reducing_gap=2.0)
+            # Write to a temp name first so the gallery never reads a half-written file
+            tmp_path = f"{thumb_path}.tmp"
+            image.convert('RGB').save(tmp_path, 'JPEG', quality=THUMBNAIL_QUALITY, optimize=True)
+        os.replace(tmp_path, thumb_path)
+        return thumb_path
+    except Exception as e:
+        logger.debug(f"Thumbnail failed for {screenshot_path}: {e}")
+        return None
+
+
+def ensure_thumbnail(screenshot_path):
+    """Thumbnail for a screenshot, generated on demand for runs captured before thumbnails existed"""
+    thumb_path = thumbnail_path(screenshot_path)
+    if os.path.exists(thumb_path):
+        return thumb_path
+    if not os.path.exists(screenshot_path):
+        return None
+    return create_thumbnail(screenshot_path)
+
+
+def ensure_thumbnails(screenshot_paths, max_workers=4):
+    """Thumbnails for one gallery page - missing ones are built in parallel"""
+    missing = [p for p in screenshot_paths if not os.path.exists(thumbnail_path(p))]
+    if len(missing) > 1:
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            list(pool.map(ensure_thumbnail, missing))
+    elif missing:
+        ensure_thumbnail(missing[0])
+
+    return {p: (thumbnail_path(p) if os.path.exists(thumbnail_path(p)) else None) for p in screenshot_paths}
+
+
+class ThumbnailWriter:
+    """Builds thumbnails off the worker's hot path as screenshots are written"""
+
+    def __init__(self, max_workers=2):
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="thumbs")
+
+    def submit(self, screenshot_path):
+        try:
+            return self._pool.submit(create_thumbnail, screenshot_path)
+        except RuntimeError:
+            # Pool already shut down - the gallery will build it lazily instead
+            return None
+
+    def shutdown(self, wait=True):
+        self._pool.shutdown(wait=wait)
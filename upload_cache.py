@@ -0,0 +1,252 @@
+import os
+import hashlib
+import logging
+import tempfile
+
+from url_source import UrlSource, UPLOADS_DIR, DEFAULT_CHUNK_SIZE, is_valid_url
+
+# pyarrow is optional - without it every reader falls back to streaming the raw upload
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+PARSED_PREFIX = "parsed_"
+PARSED_SUFFIX = ".arrow"
+
+
+def content_hash(file_or_path):
+    """SHA-256 of an upload (path on disk or file-like object), read in blocks"""
+    digest = hashlib.sha256()
+    if isinstance(file_or_path, str):
+        with open(file_or_path, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(block)
+    else:
+        file_or_path.seek(0)
+        for block in iter(lambda: file_or_path.read(1024 * 1024), b''):
+            digest.update(block)
+        file_or_path.seek(0)
+    return digest.hexdigest()
+
+
+def parsed_filename_for(digest):
+    return f"{PARSED_PREFIX}{digest[:32]}{PARSED_SUFFIX}"
+
+
+def build_parsed_upload(file_or_path, file_name=None, uploads_dir=UPLOADS_DIR, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Convert an upload into an uncompressed Arrow IPC file next to the raw uploads.
+
+    The file is keyed by content hash, so uploading the same export again reuses
+    the existing conversion. Returns the parsed filename, or None if pyarrow is
+    not installed or conversion failed.
+    """
+    if not PYARROW_AVAILABLE:
+        return None
+
+    try:
+        digest = content_hash(file_or_path)
+        parsed_filename = parsed_filename_for(digest)
+        parsed_path = os.path.join(uploads_dir, parsed_filename)
+
+        if os.path.exists(parsed_path):
+            logger.info(f"♻️ Reusing parsed upload {parsed_filename}")
+            return parsed_filename
+
+        os.makedirs(uploads_dir, exist_ok=True)
+        source = UrlSource(file_or_path, chunk_size=chunk_size, file_name=file_name)
+        schema = pa.schema([(name, pa.string()) for name in source.columns()],
+                           metadata={'source_file': os.path.basename(file_name or str(file_or_path)),
+                                     'sha256': digest})
+
+        # Write to a temp file first so readers never see a half-written cache
+        fd, tmp_path = tempfile.mkstemp(dir=uploads_dir, suffix=PARSED_SUFFIX + '.tmp')
+        os.close(fd)
+        try:
+            rows = 0
+            with pa.OSFile(tmp_path, 'wb') as sink, pa.ipc.new_file(sink, schema) as writer:
+                for chunk in source.iter_chunks():
+                    chunk = chunk.reindex(columns=schema.names)
+                    writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+                    rows += len(chunk)
+            os.replace(tmp_path, parsed_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+        logger.info(f"📦 Parsed upload cached as {parsed_filename} ({rows} rows)")
+        return parsed_filename
+
+    except Exception as e:
+        logger.error(f"Failed to build parsed upload: {e}")
+        return None
+
+
+class ParsedUpload:
+    """Memory-mapped view of a parsed upload - columns are loaded on demand without copying"""
+
+    def __init__(self, path):
+        self.path = path
+        self._table = None
+
+    @property
+    def table(self):
+        if self._table is None:
+            # Uncompressed IPC + memory map means read_all() only maps buffers, nothing is parsed
+            self._table = pa.ipc.open_file(pa.memory_map(self.path, 'r')).read_all()
+        return self._table
+
+    @property
+    def columns(self):
+        return list(self.table.column_names)
+
+    @property
+    def num_rows(self):
+        return self.table.num_rows
+
+    def select(self, columns):
+        """Arrow table restricted to the requested columns that exist"""
+        return self.table.select([c for c in columns if c in self.table.column_names])
+
+    def read_columns(self, columns):
+        selected = self.select(columns)
+        if selected.num_columns == 0:
+            return None
+        return selected.to_pandas()
+
+    def head(self, n=5):
+        return self.table.slice(0, n).to_pandas()
+
+    def count_valid_urls(self, url_column):
+        """Number of testable URLs, computed on the Arrow column without building Python objects"""
+        if url_column not in self.table.column_names:
+            return 0
+        mask = pc.starts_with(pc.utf8_trim_whitespace(self.table.column(url_column)), 'http')
+        return pc.sum(pc.fill_null(mask, False)).as_py() or 0
+
+    def valid_urls(self, url_column, limit=None):
+        if url_column not in self.table.column_names:
+            return []
+        column = self.table.column(url_column)
+        mask = pc.fill_null(pc.starts_with(pc.utf8_trim_whitespace(column), 'http'), False)
+        urls = pc.filter(column, mask)
+        if limit is not None:
+            urls = urls.slice(0, limit)
+        return [u for u in urls.to_pylist() if is_valid_url(u)]
+
+
+class ArrowUrlSource:
+    """UrlSource backed by a parsed upload - same interface, constant-time row access"""
+
+    def __init__(self, path, url_column=None, chunk_size=DEFAULT_CHUNK_SIZE):
+        self.file_path = path
+        self.url_column = url_column
+        self.chunk_size = chunk_size
+        self.parsed = ParsedUpload(path)
+
+    def exists(self):
+        return os.path.exists(self.file_path)
+
+    def columns(self):
+        return self.parsed.columns
+
+    def iter_chunks(self, columns=None):
+        table = self.parsed.select(columns) if columns else self.parsed.table
+        offset = 0
+        for batch in table.to_batches(max_chunksize=self.chunk_size):
+            chunk = batch.to_pandas()
+            chunk.index = range(offset, offset + len(chunk))
+            offset += len(chunk)
+            yield chunk
+
+    def iter_rows(self, metadata_columns=None):
+        if self.url_column not in self.parsed.columns:
+            raise KeyError(f"URL column '{self.url_column}' not found in upload")
+
+        if metadata_columns is None:
+            names = [c for c in self.parsed.columns if c != self.url_column]
+        else:
+            names = [c for c in metadata_columns if c in self.parsed.columns and c != self.url_column]
+
+        table = self.parsed.select([self.url_column] + names)
+        offset = 0
+        for batch in table.to_batches(max_chunksize=self.chunk_size):
+            data = batch.to_pydict()
+            urls = data[self.url_column]
+            for i, url in enumerate(urls):
+                if url is not None:
+                    yield offset + i, url, {name: data[name][i] for name in names}
+            offset += batch.num_rows
+
+    def first_valid_url(self):
+        urls = self.parsed.valid_urls(self.url_column, limit=1)
+        return urls[0] if urls else None
+
+    def get_row(self, row_number):
+        if row_number < 0 or row_number >= self.parsed.num_rows:
+            return None
+        return self.parsed.table.slice(row_number, 1).to_pylist()[0]
+
+    def read_columns(self, columns):
+        return self.parsed.read_columns(columns)
+
+
+def open_url_source(test_run, uploads_dir=UPLOADS_DIR, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Best available URL source for a run - the parsed cache if present, else the raw upload"""
+    parsed_filename = getattr(test_run, 'parsed_filename', None)
+    if PYARROW_AVAILABLE and parsed_filename:
+        parsed_path = os.path.join(uploads_dir, parsed_filename)
+        if os.path.exists(parsed_path):
+            return ArrowUrlSource(parsed_path, test_run.url_column, chunk_size)
+        logger.warning(f"⚠️ Parsed upload {parsed_filename} missing - reading raw upload")
+
+    return UrlSource.for_test_run(test_run, uploads_dir, chunk_size)
+
+
+class FrameUpload:
+    """In-memory stand-in for ParsedUpload when pyarrow isn't available"""
+
+    def __init__(self, df):
+        self.df = df
+
+    @property
+    def columns(self):
+        return [str(c) for c in self.df.columns]
+
+    @property
+    def num_rows(self):
+        return len(self.df)
+
+    def read_columns(self, columns):
+        selected = [c for c in columns if c in self.df.columns]
+        return self.df[selected] if selected else None
+
+    def head(self, n=5):
+        return self.df.head(n)
+
+    def valid_urls(self, url_column, limit=None):
+        if url_column not in self.df.columns:
+            return []
+        urls = [u for u in self.df[url_column].dropna() if is_valid_url(u)]
+        return urls[:limit] if limit is not None else urls
+
+    def count_valid_urls(self, url_column):
+        return len(self.valid_urls(url_column))
+
+
+def open_upload_preview(file_or_path, file_name=None, uploads_dir=UPLOADS_DIR):
+    """Parse an upload once (deduplicated by content) and return (parsed_filename, preview reader)"""
+    parsed_filename = build_parsed_upload(file_or_path, file_name, uploads_dir)
+    if parsed_filename:
+        return parsed_filename, ParsedUpload(os.path.join(uploads_dir, parsed_filename))
+
+    import pandas as pd
+
+    chunks = list(UrlSource(file_or_path, file_name=file_name).iter_chunks())
+    df = pd.concat(chunks) if chunks else pd.DataFrame(columns=UrlSource(file_or_path, file_name=file_name).columns())
+    return None, FrameUpload(df)
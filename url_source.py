@@ -0,0 +1,254 @@
+import os
+import logging
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+UPLOADS_DIR = "uploads"
+DEFAULT_CHUNK_SIZE = 5000
+
+# Column name variants seen in Yardi menu exports
+MENU_SET_COLUMNS = ['MenuSet', 'sMenuSet', 'smenuset', 'menu_set']
+MENU_TYPE_COLUMNS = ['smenuType', 'sMenuType', 'MenuType', 'Type', 'smenuttype', 'menu_type']
+CAPTION_COLUMNS = ['Caption', 'caption', 'Description', 'Name', 'Title']
+METADATA_COLUMN_CANDIDATES = MENU_SET_COLUMNS + MENU_TYPE_COLUMNS + CAPTION_COLUMNS
+
+# Result field -> candidate upload columns, in priority order
+METADATA_FIELDS = {
+    'menu_set': MENU_SET_COLUMNS,
+    'menu_type': MENU_TYPE_COLUMNS,
+    'caption': CAPTION_COLUMNS,
+}
+
+# Cache of first valid URL per (file, mtime, column) - the auth flow asks on every rerun
+_FIRST_URL_CACHE = {}
+
+
+def is_valid_url(url):
+    """Check that a cell value looks like a testable http(s) URL"""
+    if url is None:
+        return False
+    url = str(url).strip()
+    return bool(url) and url != 'nan' and url.lower() != 'none' and url.startswith('http')
+
+
+def resolve_metadata_columns(columns, exclude=None):
+    """Map result metadata fields to upload columns, e.g. {'menu_type': 'smenuType', ...}.
+
+    Exact names win, then case-insensitive matches. Fields with no matching
+    column map to None. The URL column is never used as metadata.
+    """
+    available = [c for c in columns if c != exclude]
+    by_lower = {}
+    for column in available:
+        by_lower.setdefault(column.lower(), column)
+
+    mapping = {}
+    for field, candidates in METADATA_FIELDS.items():
+        match = next((c for c in candidates if c in available), None)
+        if match is None:
+            match = next((by_lower[c.lower()] for c in candidates if c.lower() in by_lower), None)
+        mapping[field] = match
+    return mapping
+
+
+def _clean_value(value):
+    """Normalise a cell value - empty cells become None, everything else a string"""
+    if value is None:
+        return None
+    try:
+        if pd.isna(value):
+            return None
+    except (TypeError, ValueError):
+        pass
+    return str(value)
+
+
+class UrlSource:
+    """Lazily reads URL rows from an uploaded CSV/Excel file with bounded memory.
+
+    Row numbers are 0-based positions of data rows in the file (header excluded),
+    which is what the worker has always stored as TestResult.row_number.
+    """
+
+    def __init__(self, file_path, url_column=None, chunk_size=DEFAULT_CHUNK_SIZE, file_name=None):
+        self.file_path = file_path  # Path on disk or a file-like object (e.g. a Streamlit upload)
+        self.url_column = url_column
+        self.chunk_size = chunk_size
+        self.file_name = file_name or (file_path if isinstance(file_path, str) else getattr(file_path, 'name', ''))
+
+    @classmethod
+    def for_test_run(cls, test_run, uploads_dir=UPLOADS_DIR, chunk_size=DEFAULT_CHUNK_SIZE):
+        """Build a source for the file uploaded with a test run"""
+        return cls(os.path.join(uploads_dir, test_run.uploaded_filename), test_run.url_column, chunk_size)
+
+    @property
+    def is_csv(self):
+        return self.file_name.lower().endswith('.csv')
+
+    @property
+    def is_xlsx(self):
+        return self.file_name.lower().endswith(('.xlsx', '.xlsm'))
+
+    def exists(self):
+        if not isinstance(self.file_path, str):
+            return True
+        return os.path.exists(self.file_path)
+
+    def _rewind(self):
+        if hasattr(self.file_path, 'seek'):
+            self.file_path.seek(0)
+
+    # ------------------------------------------------------------------
+    # Chunk iteration
+    # ------------------------------------------------------------------
+
+    def columns(self):
+        """Column names from the header row only"""
+        self._rewind()
+        if self.is_csv:
+            return [str(c) for c in pd.read_csv(self.file_path, dtype=str, nrows=0).columns]
+        if self.is_xlsx:
+            workbook, worksheet = self._open_workbook()
+            try:
+                for header in worksheet.iter_rows(min_row=1, max_row=1, values_only=True):
+                    return self._header_names(header)
+                return []
+            finally:
+                workbook.close()
+        return [str(c) for c in pd.read_excel(self.file_path, dtype=str, nrows=0).columns]
+
+    def iter_chunks(self, columns=None):
+        """Yield DataFrames of at most chunk_size rows, indexed by row number.
+
+        All values are read as strings. When columns is given only those that
+        exist in the file are parsed.
+        """
+        self._rewind()
+        if self.is_csv:
+            usecols = (lambda c: c in columns) if columns else None
+            reader = pd.read_csv(self.file_path, dtype=str, chunksize=self.chunk_size, usecols=usecols)
+            for chunk in reader:
+                yield chunk
+        elif self.is_xlsx:
+            yield from self._iter_xlsx_chunks(columns)
+        else:
+            # Legacy .xls can't be streamed by openpyxl - parse once and slice
+            df = pd.read_excel(self.file_path, dtype=str)
+            if columns:
+                df = df[[c for c in df.columns if c in columns]]
+            for start in range(0, len(df), self.chunk_size):
+                yield df.iloc[start:start + self.chunk_size]
+
+    def _open_workbook(self):
+        from openpyxl import load_workbook
+
+        workbook = load_workbook(self.file_path, read_only=True, data_only=True)
+        return workbook, workbook.worksheets[0]
+
+    @staticmethod
+    def _header_names(header):
+        return [str(h) if h is not None else f"Unnamed: {i}" for i, h in enumerate(header)]
+
+    def _iter_xlsx_chunks(self, columns=None):
+        workbook, worksheet = self._open_workbook()
+        try:
+            rows = worksheet.iter_rows(values_only=True)
+            header = next(rows, None)
+            if header is None:
+                return
+            names = self._header_names(header)
+            keep = [i for i, name in enumerate(names) if not columns or name in columns]
+            keep_names = [names[i] for i in keep]
+
+            buffer = []
+            start = 0
+            for values in rows:
+                buffer.append([_clean_value(values[i]) if i < len(values) else None for i in keep])
+                if len(buffer) >= self.chunk_size:
+                    yield pd.DataFrame(buffer, columns=keep_names, index=range(start, start + len(buffer)))
+                    start += len(buffer)
+                    buffer = []
+            if buffer:
+                yield pd.DataFrame(buffer, columns=keep_names, index=range(start, start + len(buffer)))
+        finally:
+            workbook.close()
+
+    # ------------------------------------------------------------------
+    # Row access
+    # ------------------------------------------------------------------
+
+    def iter_rows(self, metadata_columns=None):
+        """Yield (row_number, url, metadata) for every row with a non-empty URL cell.
+
+        metadata holds the other requested columns (all columns by default).
+        Validation of the URL itself is left to the caller so skips can be counted.
+        """
+        columns = None
+        if metadata_columns is not None:
+            columns = set(metadata_columns) | {self.url_column}
+
+        for chunk in self.iter_chunks(columns):
+            if self.url_column not in chunk.columns:
+                raise KeyError(f"URL column '{self.url_column}' not found in upload")
+
+            names = list(chunk.columns)
+            url_pos = names.index(self.url_column)
+            for row in chunk.itertuples(index=True, name=None):
+                row_number, values = row[0], row[1:]
+                url = _clean_value(values[url_pos])
+                if url is None:
+                    continue
+                metadata = {name: _clean_value(values[i]) for i, name in enumerate(names) if i != url_pos}
+                yield row_number, url, metadata
+
+    def first_valid_url(self):
+        """First testable URL in the file - stops reading as soon as one is found"""
+        cache_key = None
+        if isinstance(self.file_path, str) and os.path.exists(self.file_path):
+            cache_key = (os.path.abspath(self.file_path), os.path.getmtime(self.file_path), self.url_column)
+            if cache_key in _FIRST_URL_CACHE:
+                return _FIRST_URL_CACHE[cache_key]
+
+        first_url = None
+        for _, url, _ in self.iter_rows(metadata_columns=[]):
+            if is_valid_url(url):
+                first_url = url
+                break
+
+        if cache_key is not None:
+            _FIRST_URL_CACHE[cache_key] = first_url
+        return first_url
+
+    def get_row(self, row_number):
+        """Read a single row as a dict without parsing the rest of the file"""
+        self._rewind()
+        if self.is_csv:
+            df = pd.read_csv(self.file_path, dtype=str, skiprows=range(1, row_number + 1), nrows=1)
+            if df.empty:
+                return None
+            return {str(k): _clean_value(v) for k, v in df.iloc[0].items()}
+
+        if self.is_xlsx:
+            workbook, worksheet = self._open_workbook()
+            try:
+                header = next(worksheet.iter_rows(min_row=1, max_row=1, values_only=True), None)
+                values = next(worksheet.iter_rows(min_row=row_number + 2, max_row=row_number + 2,
+                                                  values_only=True), None)
+                if header is None or values is None:
+                    return None
+                return {name: _clean_value(v) for name, v in zip(self._header_names(header), values)}
+            finally:
+                workbook.close()
+
+        for chunk in self.iter_chunks():
+            if row_number in chunk.index:
+                return {str(k): _clean_value(v) for k, v in chunk.loc[row_number].items()}
+        return None
+
+    def read_columns(self, columns):
+        """Load only the given columns (those that exist) as a DataFrame indexed by row number"""
+        chunks = [chunk for chunk in self.iter_chunks(set(columns)) if len(chunk.columns) > 0]
+        if not chunks:
+            return None
+        return pd.concat(chunks)